@@ -0,0 +1,36 @@
+"""
+Format penyimpanan hasil analisis (SessionAnalysis.result).
+
+Isi blob = body JSON response /analyze untuk hasil tersimpan, di-gzip. Cache hit
+cukup mengirim bytes ini apa adanya (Content-Encoding: gzip) tanpa json.loads /
+jsonify ulang. RESULT_FORMAT dinaikkan kalau struktur JSON berubah; row dengan
+format lama dianggap basi dan dianalisis ulang.
+"""
+import gzip
+import json
+
+RESULT_FORMAT = 1
+
+
+def pack_result(document, level=6):
+    # mtime=0: blob (dan ETag-nya) hanya bergantung pada isi
+    body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def unpack_result(blob):
+    return json.loads(gzip.decompress(blob))
+
+
+def result_body(blob):
+    """Body JSON tanpa kompresi, untuk client yang tidak menerima gzip"""
+    return gzip.decompress(blob)
+
+
+def result_etag(blob, gzipped=False):
+    """
+    ETag dari trailer gzip (CRC32 + panjang isi), tanpa decompress.
+    gzipped: ETag untuk body gzip apa adanya, beda dengan body JSON hasil result_body
+    """
+    etag = f"r{RESULT_FORMAT}-{blob[-8:].hex()}"
+    return f"{etag}-gz" if gzipped else etag
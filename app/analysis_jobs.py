@@ -0,0 +1,95 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from . import db
+
+
+class AnalysisJobQueue:
+    """
+    Jalankan analisis percakapan di thread pool lokal, supaya request /analyze
+    langsung kembali dengan job id (= SessionAnalysis.id) dan web worker tetap bebas.
+    Progress dibaca dari kolom SessionAnalysis.status.
+    """
+
+    def __init__(self, workers=2, job_timeout=600):
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = set()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get("ANALYSIS_WORKERS", self.workers)
+        self.job_timeout = app.config.get("ANALYSIS_JOB_TIMEOUT", self.job_timeout)
+        app.extensions["analysis_jobs"] = self
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(self.workers)),
+                    thread_name_prefix="analysis-job"
+                )
+            return self._executor
+
+    def submit(self, analysis_id):
+        with self._lock:
+            if analysis_id in self._active:
+                return
+            self._active.add(analysis_id)
+        self._get_executor().submit(self._run, analysis_id)
+
+    def is_stale(self, analysis):
+        """Job pending/running yang tidak dikerjakan proses mana pun (mis. worker restart)"""
+        if analysis.status not in ("pending", "running"):
+            return False
+        if analysis.id in self._active:
+            return False
+        started = analysis.job_started_at or 0
+        return time.time() - started > self.job_timeout
+
+    def _run(self, analysis_id):
+        from .analysis_service import run_analysis, load_user_messages
+        from .models import SessionAnalysis
+
+        try:
+            with self.app.app_context():
+                analysis = db.session.get(SessionAnalysis, analysis_id)
+                if analysis is None or analysis.status != "pending":
+                    return
+
+                analysis.status = "running"
+                analysis.job_started_at = time.time()
+                db.session.commit()
+
+                try:
+                    run_analysis(
+                        analysis.session,
+                        analysis,
+                        load_user_messages(analysis.session_id),
+                        generate_insights=not self.app.config.get("GEMINI_STREAMING", False)
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    traceback.print_exc()
+                    db.session.rollback()
+                    analysis = db.session.get(SessionAnalysis, analysis_id)
+                    analysis.status = "failed"
+                    analysis.error = str(e)
+                    db.session.commit()
+        finally:
+            with self._lock:
+                self._active.discard(analysis_id)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+analysis_jobs = AnalysisJobQueue()
@@ -0,0 +1,487 @@
+"""
+Pipeline analisis percakapan (dulu langsung di route /analyze).
+Dipakai oleh route (mode sinkron) dan oleh AnalysisJobQueue (mode async).
+"""
+import json
+import logging
+import threading
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from . import db
+from .analysis_blob import RESULT_FORMAT, pack_result, unpack_result
+from .fingerprint import extend_fingerprint, messages_fingerprint
+from .genai_analyzer import is_unavailable_text
+from .model_registry import model_registry
+from .models import ChatMessages
+from .prompt_builder import build_context, phrase_weights
+from .resilience import Deadline
+from .stage_graph import StageGraph
+from .text_preprocessor import text_stats
+
+logger = logging.getLogger(__name__)
+
+MessageRow = namedtuple("MessageRow", ["content", "created_at", "phrases", "clean_content"])
+
+# Awalan teks insights kalau pemanggilan analyzer melempar exception
+INSIGHTS_ERROR = "Gagal generate AI insights"
+
+# Bagian hasil analisis yang disimpan di SessionAnalysis.result (selain field turunan)
+RESULT_KEYS = (
+    "attachment_style", "phrase_analysis", "emotion_analysis", "bert_features",
+    "text_statistics", "timeline", "ai_insights", "rule_scores", "stage_timings",
+)
+
+_stage_executor = None
+_stage_executor_lock = threading.Lock()
+
+
+class AnalysisError(Exception):
+    """Analisis gagal, pesan error ditampilkan ke user"""
+
+
+class StoredResultError(Exception):
+    """Blob result tersimpan rusak / format lama, tidak bisa diupdate incremental"""
+
+
+def stage_executor(workers=4):
+    """Thread pool bersama untuk stage analisis (lihat StageGraph)"""
+    global _stage_executor
+    with _stage_executor_lock:
+        if _stage_executor is None:
+            _stage_executor = ThreadPoolExecutor(
+                max_workers=max(1, int(workers)),
+                thread_name_prefix="analysis-stage"
+            )
+        return _stage_executor
+
+
+def load_user_messages(session_id):
+    return ChatMessages.query.filter_by(
+        session_id=session_id,
+        sender="user"
+    ).order_by(ChatMessages.created_at, ChatMessages.id).all()
+
+def validate_messages(messages):
+    """Return pesan error kalau percakapan belum bisa dianalisis"""
+    if not messages:
+        return "Belum ada percakapan untuk dianalisis"
+    if len(messages) < 5:
+        return "Percakapan terlalu singkat. Minimal 5 pesan untuk analisis yang akurat."
+    return None
+
+def preprocess_message(msg):
+    """Simpan hasil preprocessing pesan user di row ChatMessages"""
+    service = model_registry.chatbot_service
+    msg.normalized_content = service.normalize_text(msg.content)
+    msg.clean_content = service.clean_normalized_text(msg.normalized_content)
+    msg.phrases = json.dumps(service.extract_phrases(msg.clean_content))
+
+def conversation_normalized_text(messages):
+    """Gabungkan normalized_content semua pesan, backfill row yang belum diproses"""
+    for msg in messages:
+        if msg.normalized_content is None:
+            preprocess_message(msg)
+    return ' '.join(msg.normalized_content for msg in messages if msg.normalized_content)
+
+
+def message_rows(messages):
+    """
+    Salin data pesan ke tuple biasa sebelum dibagi ke thread stage
+    (objek ORM tidak aman diakses dari thread lain)
+    """
+    return [
+        MessageRow(
+            msg.content,
+            msg.created_at,
+            json.loads(msg.phrases) if msg.phrases else [],
+            msg.clean_content
+        )
+        for msg in messages
+    ]
+
+def count_phrases(rows):
+    """Frekuensi tiap frasa di semua pesan + total frasa terekstraksi"""
+    phrase_frequency = {}
+    total_extracted = 0
+    for row in rows:
+        for phrase in row.phrases:
+            phrase_frequency[phrase] = phrase_frequency.get(phrase, 0) + 1
+        total_extracted += len(row.phrases)
+    return phrase_frequency, total_extracted
+
+def top_phrases(phrase_frequency, limit=20):
+    return sorted(
+        phrase_frequency.items(),
+        key=lambda x: x[1],
+        reverse=True
+    )[:limit]
+
+def build_phrase_analysis(phrase_frequency, total_extracted, n_messages, phrase_scores):
+    phrases_with_full_data = []
+    for phrase, freq in top_phrases(phrase_frequency):
+        tfidf_score = phrase_scores.get(phrase, 0)
+        phrases_with_full_data.append({
+            "phrase": phrase,
+            "frequency": freq,
+            "percentage": round((freq / n_messages) * 100, 1),
+            "tfidf_score": round(tfidf_score, 3) if tfidf_score > 0 else None,
+            "importance": "high" if freq >= 3 else "medium" if freq >= 2 else "low"
+        })
+
+    return {
+        "top_phrases": phrases_with_full_data,
+        "total_unique_phrases": len(phrase_frequency),
+        "total_phrases_extracted": total_extracted
+    }
+
+def build_timeline(rows, phrase_scores):
+    """Detail per pesan + frasa dengan skor TF-IDF tertinggi"""
+    message_details = []
+    for row in rows:
+        msg_phrases_with_scores = []
+        if row.phrases and phrase_scores:
+            for phrase in row.phrases:
+                score = phrase_scores.get(phrase, 0)
+                if score > 0:
+                    msg_phrases_with_scores.append({
+                        "phrase": phrase,
+                        "score": round(score, 3)
+                    })
+
+        message_details.append({
+            "content": row.content[:100] + "..." if len(row.content) > 100 else row.content,
+            "timestamp": row.created_at.strftime("%H:%M"),
+            "word_count": len(row.content.split()),
+            "phrases": msg_phrases_with_scores[:3]
+        })
+    return message_details
+
+def build_emotion_analysis(bert_result):
+    emotion_data = {
+        "scores": bert_result.get("emotion_scores", {}),
+        "dominant": None
+    }
+
+    if emotion_data["scores"]:
+        dominant_emotion = max(
+            emotion_data["scores"].items(),
+            key=lambda x: x[1]
+        )
+        emotion_data["dominant"] = {
+            "name": dominant_emotion[0],
+            "score": round(dominant_emotion[1], 3)
+        }
+    return emotion_data
+
+def build_bert_features(bert_result):
+    bert_features_data = bert_result.get("bert_summary", {})
+    return {
+        "embedding_dimension": bert_features_data.get("embedding_dim", 768),
+        "statistics": {
+            "mean": round(bert_features_data.get("embedding_mean", 0), 4),
+            "std": round(bert_features_data.get("embedding_std", 0), 4),
+            "max": round(bert_features_data.get("embedding_max", 0), 4),
+            "min": round(bert_features_data.get("embedding_min", 0), 4)
+        }
+    }
+
+def build_text_statistics(rows, bert_result):
+    text_stats = bert_result.get("text_stats", {})
+    return {
+        "total_messages": len(rows),
+        "avg_message_length": round(
+            sum(len(row.content.split()) for row in rows) / len(rows), 1
+        ),
+        "word_count": text_stats.get("word_count", 0),
+        "sentence_count": text_stats.get("sentence_count", 0),
+        "clean_text_length": text_stats.get("clean_text_length", 0)
+    }
+
+def build_rule_scores(bert_result):
+    return {
+        "secure": bert_result["probabilities"].get("secure", 0),
+        "anxious": bert_result["probabilities"].get("anxious", 0),
+        "avoidant": bert_result["probabilities"].get("avoidant", 0)
+    }
+
+def build_statistics(rows, bert_result, phrase_counts):
+    phrase_frequency, total_extracted = phrase_counts
+    return {
+        "phrase_analysis": build_phrase_analysis(
+            phrase_frequency, total_extracted, len(rows), bert_result.get("phrase_scores", {})
+        ),
+        "emotion_analysis": build_emotion_analysis(bert_result),
+        "bert_features": build_bert_features(bert_result),
+        "text_statistics": build_text_statistics(rows, bert_result),
+    }
+
+def analysis_values(bert_result, stats, timeline):
+    """Kolom prediksi SessionAnalysis + isi result dari hasil model (tanpa ai_insights & status)"""
+    return {
+        "attachment_style": bert_result["prediction"],
+        "confidence": bert_result["confidence"],
+        "result": {
+            "attachment_style": {
+                "prediction": bert_result["prediction"],
+                "confidence": round(bert_result["confidence"] * 100, 1),
+                "probabilities": {
+                    k: round(v * 100, 1)
+                    for k, v in bert_result["probabilities"].items()
+                },
+            },
+            "phrase_analysis": stats["phrase_analysis"],
+            "emotion_analysis": stats["emotion_analysis"],
+            "bert_features": stats["bert_features"],
+            "text_statistics": stats["text_statistics"],
+            "timeline": timeline,
+            "rule_scores": {
+                k: round(v * 100, 1)
+                for k, v in build_rule_scores(bert_result).items()
+            },
+        },
+    }
+
+def result_document(result, analyzed_at, model_version):
+    """Body response /analyze untuk hasil tersimpan (cache hit), lihat analysis_blob"""
+    document = {
+        "cached": True,
+        "status": "done",
+        "analyzed_at": analyzed_at,
+    }
+    document.update((key, result.get(key)) for key in RESULT_KEYS)
+    # True = insights belum ada, client perlu membuka stream SSE
+    document["insights_pending"] = document["ai_insights"] is None
+    document["model_version"] = model_version
+    return document
+
+def store_result(analysis, result):
+    analyzed_at = analysis.created_at.strftime("%Y-%m-%d %H:%M:%S") if analysis.created_at else None
+    analysis.result = pack_result(result_document(result, analyzed_at, analysis.model_version))
+    analysis.result_format = RESULT_FORMAT
+
+def load_result(analysis):
+    """Isi SessionAnalysis.result (dict), None kalau belum ada"""
+    return unpack_result(analysis.result) if analysis.result else None
+
+def analysis_insights(analysis):
+    result = load_result(analysis)
+    return result.get("ai_insights") if result else None
+
+def build_summary_message(prediction, confidence, gemini_summary):
+    return f""" **Analisis Percakapan Selesai!**
+
+        Attachment Style Anda: **{prediction.upper()}** ({round(confidence * 100, 1)}% confidence)
+
+        ---
+
+        {gemini_summary}
+
+        ---
+
+         *Lihat detail lengkap dengan klik tombol "Analisis Percakapan" di atas.*"""
+
+
+def summary_context(rows, phrase_frequency, phrase_scores, max_tokens):
+    """Konteks percakapan untuk prompt ringkasan, dibatasi max_tokens (PROMPT_SUMMARY_TOKENS)"""
+    text, info = build_context(rows, max_tokens, phrase_weights(phrase_frequency, phrase_scores))
+    logger.info("Konteks ringkasan: %s", info)
+    return text
+
+def insight_inputs(analysis, messages):
+    """Argumen summarize_conversation dari analisis yang sudah tersimpan"""
+    result = load_result(analysis)
+    phrase_analysis_data = result["phrase_analysis"]
+    rows = message_rows(messages)
+    phrase_scores = {
+        p["phrase"]: p["tfidf_score"] or 0 for p in phrase_analysis_data["top_phrases"]
+    }
+    return {
+        "conversation_text": summary_context(
+            rows, count_phrases(rows)[0], phrase_scores, current_app.config.get("PROMPT_SUMMARY_TOKENS", 3000)
+        ),
+        "key_phrases": [p["phrase"] for p in phrase_analysis_data["top_phrases"][:15]],
+        "rule_scores": {k: v / 100 for k, v in result["rule_scores"].items()},
+    }
+
+def insights_error_text(error):
+    return f"{INSIGHTS_ERROR}: {error}"
+
+def is_transient_insights(text):
+    """Fallback lokal / pesan error: ditampilkan saja, tidak disimpan sebagai ai_insights"""
+    return text.startswith(INSIGHTS_ERROR) or is_unavailable_text(text)
+
+def save_insights(session, analysis, gemini_summary):
+    """Simpan AI insights + kirim ringkasan ke chat sebagai pesan bot"""
+    result = load_result(analysis)
+    result["ai_insights"] = gemini_summary
+    store_result(analysis, result)
+    db.session.add(ChatMessages(
+        session_id=session.id,
+        sender="bot",
+        content=build_summary_message(analysis.attachment_style, analysis.confidence, gemini_summary)
+    ))
+
+
+def run_analysis(session, analysis, messages, generate_insights=True):
+    """
+    Jalankan pipeline lengkap dan isi row SessionAnalysis + pesan ringkasan bot.
+    Dengan generate_insights=False langkah Gemini dilewati (ai_insights tetap None),
+    insights di-stream belakangan lewat SSE.
+    Return teks insights sementara (fallback lokal / error) yang tidak disimpan, None kalau tidak ada.
+    Commit diserahkan ke pemanggil. Raise AnalysisError kalau model gagal.
+    """
+    # Budget waktu seluruh analisis; panggilan Gemini memakai sisanya
+    deadline = Deadline(current_app.config.get("ANALYSIS_DEADLINE", 45))
+    # Stage jalan di thread pool tanpa app context, config dibaca di sini
+    summary_tokens = current_app.config.get("PROMPT_SUMMARY_TOKENS", 3000)
+
+    # ===== 1. PREPARE FULL CONVERSATION TEXT =====
+    conversation_text = "\n".join([msg.content for msg in messages])
+    normalized_text = conversation_normalized_text(messages)
+    rows = message_rows(messages)
+
+    # ===== 2. STAGE GRAPH =====
+    # predict & phrase_counts jalan bersamaan; gemini (network) overlap dengan
+    # timeline & statistics yang hanya butuh hasil predict
+    def predict():
+        bert_result = model_registry.chatbot_service.predict(conversation_text, normalized_text=normalized_text)
+        if "error" in bert_result:
+            raise AnalysisError(f"Model prediction failed: {bert_result['error']}")
+        return bert_result
+
+    def gemini(predict, phrase_counts):
+        try:
+            return model_registry.gemini_analyzer.summarize_conversation(
+                conversation_text=summary_context(
+                    rows, phrase_counts[0], predict.get("phrase_scores", {}), summary_tokens
+                ),
+                key_phrases=[phrase for phrase, _ in top_phrases(phrase_counts[0], 15)],
+                rule_scores=build_rule_scores(predict),
+                deadline=deadline
+            )
+        except Exception as e:
+            return insights_error_text(e)
+
+    graph = StageGraph(stage_executor(current_app.config.get("ANALYSIS_STAGE_WORKERS", 4)))
+    graph.add("predict", predict)
+    graph.add("phrase_counts", lambda: count_phrases(rows))
+    if generate_insights:
+        graph.add("gemini", gemini, deps=["predict", "phrase_counts"])
+    graph.add("timeline", lambda predict: build_timeline(rows, predict.get("phrase_scores", {})), deps=["predict"])
+    graph.add(
+        "statistics",
+        lambda predict, phrase_counts: build_statistics(rows, predict, phrase_counts),
+        deps=["predict", "phrase_counts"]
+    )
+
+    results = graph.run()
+    gemini_summary = results.get("gemini")
+
+    # ===== 5. SAVE TO DATABASE =====
+    values = analysis_values(results["predict"], results["statistics"], results["timeline"])
+    analysis.attachment_style = values["attachment_style"]
+    analysis.confidence = values["confidence"]
+    stamp_analysis(analysis, messages)
+    store_result(analysis, {**values["result"], "ai_insights": None, "stage_timings": graph.timings})
+    analysis.status = "done"
+    analysis.error = None
+    logger.info("Analisis session %s selesai: %s", session.id, graph.timings)
+
+    unsaved_insights = None
+    if gemini_summary is not None:
+        if is_transient_insights(gemini_summary):
+            # ai_insights tetap kosong (insights_pending): cache hit / stream SSE berikutnya
+            # mencoba Gemini lagi, fallback tidak dikirim ke chat sebagai ringkasan
+            logger.warning("AI insights session %s tidak tersedia, tidak disimpan", session.id)
+            unsaved_insights = gemini_summary
+        else:
+            save_insights(session, analysis, gemini_summary)
+    session.status = 'analyzed'
+    return unsaved_insights
+
+
+def stamp_analysis(analysis, messages, fingerprint=None, predicted=True):
+    """
+    Catat pesan & versi model yang dipakai analisis (lihat analysis_freshness).
+    predicted=False: attachment_style tidak dihitung ulang, prediction_fingerprint tetap.
+    """
+    analysis.messages_fingerprint = fingerprint or messages_fingerprint(messages)
+    if predicted:
+        analysis.prediction_fingerprint = analysis.messages_fingerprint
+    analysis.last_message_id = max((msg.id for msg in messages), default=None)
+    analysis.model_version = model_registry.model_version
+
+
+def analysis_freshness(analysis, messages):
+    """
+    "fresh"    model & pesan sama, hasil tersimpan bisa langsung dipakai
+    "appended" model sama, hanya ada pesan baru setelah last_message_id
+    "stale"    model / format result berubah, pesan lama berubah atau dihapus -> analisis ulang penuh
+    """
+    if analysis.status != "done" or analysis.model_version != model_registry.model_version:
+        return "stale"
+    if analysis.result is None or analysis.result_format != RESULT_FORMAT:
+        return "stale"
+    if analysis.last_message_id is None:
+        return "stale"
+
+    previous = [msg for msg in messages if msg.id <= analysis.last_message_id]
+    if messages_fingerprint(previous) != analysis.messages_fingerprint:
+        return "stale"
+    return "fresh" if len(previous) == len(messages) else "appended"
+
+
+def stored_phrase_scores(result):
+    """Skor TF-IDF frasa dari hasil tersimpan (top phrases + timeline)"""
+    scores = {}
+    for entry in result["timeline"]:
+        for item in entry["phrases"]:
+            scores[item["phrase"]] = item["score"]
+    for item in result["phrase_analysis"]["top_phrases"]:
+        if item["tfidf_score"]:
+            scores[item["phrase"]] = item["tfidf_score"]
+    return scores
+
+
+def run_incremental_analysis(analysis, messages):
+    """
+    Pesan baru ditambahkan sejak analisis terakhir (model sama): hitung ulang
+    frekuensi frasa, timeline & statistik teks dari preprocessing per pesan.
+    Prediksi, fitur BERT, rule scores & AI insights tetap dari analisis terakhir.
+    Commit diserahkan ke pemanggil. StoredResultError kalau blob result tidak bisa dipakai.
+    """
+    new_messages = [msg for msg in messages if msg.id > analysis.last_message_id]
+    conversation_text = "\n".join(msg.content for msg in messages)
+    clean_text = model_registry.chatbot_service.clean_normalized_text(conversation_normalized_text(messages))
+
+    rows = message_rows(messages)
+    try:
+        result = load_result(analysis)
+        phrase_scores = stored_phrase_scores(result)
+    except (OSError, EOFError, zlib.error, ValueError, KeyError, TypeError) as e:
+        # gzip/JSON rusak, result kosong, atau struktur dari format lama
+        raise StoredResultError(f"Result session {analysis.session_id} tidak bisa dibaca: {e!r}") from e
+    phrase_frequency, total_extracted = count_phrases(rows)
+
+    # Entry timeline pesan lama tidak berubah, cukup tambahkan pesan baru
+    result["timeline"] += build_timeline(message_rows(new_messages), phrase_scores)
+    result["phrase_analysis"] = build_phrase_analysis(phrase_frequency, total_extracted, len(rows), phrase_scores)
+    result["text_statistics"] = build_text_statistics(
+        rows, {"text_stats": text_stats(conversation_text, clean_text)}
+    )
+    stamp_analysis(
+        analysis, messages, extend_fingerprint(analysis.messages_fingerprint, new_messages), predicted=False
+    )
+    store_result(analysis, result)
+    return analysis
+
+
+def analysis_payload(analysis):
+    """Response JSON hasil analisis dari row SessionAnalysis (untuk response non-cache)"""
+    payload = load_result(analysis)
+    payload.pop("cached", None)
+    return payload
@@ -0,0 +1,63 @@
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+
+class BertMicroBatcher:
+    """
+    Kumpulkan request encode dari banyak thread, lalu jalankan satu forward pass.
+    Request dikumpulkan selama `window_ms` atau sampai `max_batch_size` tercapai.
+    """
+
+    def __init__(self, encode_batch_fn, max_batch_size=8, window_ms=10):
+        self.encode_batch_fn = encode_batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+
+        self._queue = Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="bert-micro-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, text):
+        """Masukkan text ke antrian, return Future berisi CLS embedding"""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text, timeout=None):
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self):
+        # Blok sampai ada request pertama, lalu tunggu sisa window
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+
+            try:
+                embeddings = self.encode_batch_fn(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
@@ -1,44 +1,128 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app, url_for, Response, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 from .models import ChatSessions, ChatMessages, SessionAnalysis
 from . import db
-from .chatbot_service import ChatbotService
-from .intent_classifier import ConversationEngine
-from .genai_analyzer import GeminiAnalyzer
+from .analysis_blob import result_body, result_etag
+from .analysis_jobs import analysis_jobs
+from .analysis_service import (
+    AnalysisError,
+    StoredResultError,
+    analysis_freshness,
+    analysis_insights,
+    analysis_payload,
+    conversation_normalized_text,
+    count_phrases,
+    insight_inputs,
+    insights_error_text,
+    load_user_messages,
+    message_rows,
+    preprocess_message,
+    run_analysis,
+    run_incremental_analysis,
+    save_insights,
+    validate_messages,
+)
+from .conversation_store import conversation_store
+from .explanation_cache import explanation_cache
+from .fingerprint import messages_fingerprint
+from .genai_analyzer import is_unavailable_text
+from .model_registry import model_registry
+from .prompt_builder import build_context, phrase_weights
+from .resilience import Deadline
 import json
+import logging
+import time
 
 
-chat_message = Blueprint('chat_message', __name__)
+logger = logging.getLogger(__name__)
 
-chatbot_service = ChatbotService(model_path="app/model/")
-conversation_engines = {}
-gemini_analyzer = GeminiAnalyzer()
+chat_message = Blueprint('chat_message', __name__)
 
 
 def get_conversation_engine(session_id):
-    """Get or create conversation engine for session"""
-    if session_id not in conversation_engines:
-        conversation_engines[session_id] = ConversationEngine()
-    return conversation_engines[session_id]
+    """Get conversation engine for session, dibangun ulang dari DB kalau tidak ada di cache"""
+    turn_count = ChatMessages.query.filter_by(
+        session_id=session_id,
+        sender="user"
+    ).count()
+
+    def load_recent_messages(limit):
+        recent = ChatMessages.query.filter_by(
+            session_id=session_id,
+            sender="user"
+        ).order_by(ChatMessages.id.desc()).limit(limit).all()
+        return [msg.content for msg in reversed(recent)]
+
+    return conversation_store.get(session_id, turn_count, load_recent_messages)
 
 @chat_message.route('/<int:session_id>/read')
 @login_required
 def read_messages(session_id):
+    """
+    Satu halaman pesan, cursor berdasarkan id:
+        ?limit=N                 halaman terbaru
+        ?before_id=X&limit=N     pesan lebih lama dari X (scroll ke atas)
+        ?after_id=X              pesan baru setelah X
+    ETag dari (id terakhir, jumlah pesan) session -> 304 kalau tidak berubah.
+    """
     session = ChatSessions.query.filter_by(
         id=session_id,
         user_id=current_user.id
     ).first_or_404()
 
-    messages = ChatMessages.query.filter_by(session_id=session.id).order_by(ChatMessages.created_at).all()
-
-    messages_data = [{
-        "id": msg.id,
-        "sender": msg.sender,
-        "content": msg.content,
-        "created_at": msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
-    } for msg in messages]
-
-    return jsonify(messages_data)
+    before_id = request.args.get('before_id', type=int)
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', current_app.config.get("MESSAGES_PAGE_SIZE", 50), type=int)
+    limit = max(1, min(limit, current_app.config.get("MESSAGES_PAGE_MAX", 200)))
+
+    last_id, total, user_count = db.session.query(
+        func.max(ChatMessages.id),
+        func.count(ChatMessages.id),
+        func.sum(case((ChatMessages.sender == "user", 1), else_=0))
+    ).filter(ChatMessages.session_id == session.id).one()
+
+    etag = f"{session.id}-{last_id or 0}-{total}-{before_id or ''}-{after_id or ''}-{limit}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    query = ChatMessages.query.options(
+        load_only(ChatMessages.id, ChatMessages.sender, ChatMessages.content, ChatMessages.created_at)
+    ).filter(ChatMessages.session_id == session.id)
+
+    if after_id is not None:
+        # Pesan baru, urut lama -> baru
+        rows = query.filter(ChatMessages.id > after_id).order_by(ChatMessages.id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        messages = rows[:limit]
+    else:
+        if before_id is not None:
+            query = query.filter(ChatMessages.id < before_id)
+        rows = query.order_by(ChatMessages.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        messages = list(reversed(rows[:limit]))
+
+    response = jsonify({
+        "messages": [{
+            "id": msg.id,
+            "sender": msg.sender,
+            "content": msg.content,
+            "created_at": msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
+        } for msg in messages],
+        # after_id: masih ada pesan yang lebih baru; selain itu: masih ada yang lebih lama
+        "has_more": has_more,
+        "last_id": last_id,
+        "total": total,
+        "user_count": int(user_count or 0),
+    })
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
 # Send Message for both User and Bot
 @chat_message.route('/<int:session_id>/send', methods=['POST'])
@@ -52,15 +136,20 @@ def send_message(session_id):
     content = request.form.get('message')
     sender = request.form.get('sender')
 
+    # Ambil engine sebelum pesan baru ditambahkan ke session (turn_count dari DB)
+    conv_engine = get_conversation_engine(session.id)
+
     user_msg = ChatMessages(
         session_id=session.id,
         sender=sender,
         content=content
     )
+    # Kalau model belum siap, preprocessing di-backfill saat analisis
+    if sender == "user" and model_registry.is_loaded("chatbot_service"):
+        preprocess_message(user_msg)
     
     db.session.add(user_msg)
 
-    conv_engine = get_conversation_engine(session_id)
     bot_reply = conv_engine.respond(content)
 
     # Save bot message
@@ -74,7 +163,9 @@ def send_message(session_id):
 
     return jsonify({
         "user": content,
-        "bot": bot_reply
+        "bot": bot_reply,
+        "user_id": user_msg.id,
+        "bot_id": bot_msg.id
     })
 
 
@@ -89,233 +180,249 @@ def analyze_conversation(session_id):
 
 
     existing_analysis = SessionAnalysis.query.filter_by(session_id=session_id).first()
-    
-    if existing_analysis:
-        # Return cached analysis!
-        return jsonify({
-            "cached": True,
-            "analyzed_at": existing_analysis.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            "attachment_style": {
-                "prediction": existing_analysis.attachment_style,
-                "confidence": round(existing_analysis.confidence * 100, 1),
-                "probabilities": json.loads(existing_analysis.probabilities)
-            },
-            "phrase_analysis": json.loads(existing_analysis.phrase_analysis),
-            "emotion_analysis": json.loads(existing_analysis.emotion_analysis),
-            "bert_features": json.loads(existing_analysis.bert_features),
-            "text_statistics": json.loads(existing_analysis.text_statistics),
-            "timeline": json.loads(existing_analysis.timeline_data),
-            "ai_insights": existing_analysis.ai_insights,
-            "rule_scores": json.loads(existing_analysis.rule_scores)
-        })
 
+    if (existing_analysis and existing_analysis.status in ("pending", "running")
+            and not analysis_jobs.is_stale(existing_analysis)):
+        # Job masih jalan, client cukup polling status
+        return jsonify(analysis_job_response(existing_analysis)), 202
 
-    # Get all user messages
-    messages = ChatMessages.query.filter_by(
-        session_id=session.id,
-        sender="user"
-    ).order_by(ChatMessages.created_at).all()
-
-    if not messages:
-        return jsonify({"error": "Belum ada percakapan untuk dianalisis"}), 400
-
-    if len(messages) < 5:
-        return jsonify({
-            "error": "Percakapan terlalu singkat. Minimal 5 pesan untuk analisis yang akurat."
-        }), 400
 
-    # ===== 1. PREPARE FULL CONVERSATION TEXT =====
-    conversation_text = "\n".join([msg.content for msg in messages])
+    # Get all user messages
+    messages = load_user_messages(session.id)
+
+    if existing_analysis and existing_analysis.status == "done":
+        freshness = analysis_freshness(existing_analysis, messages)
+        if freshness == "fresh":
+            # Return cached analysis!
+            return cached_result_response(existing_analysis)
+
+        if freshness == "appended":
+            # Hanya ada pesan baru: update frasa, timeline & statistik tanpa memanggil model
+            try:
+                run_incremental_analysis(existing_analysis, messages)
+                db.session.commit()
+                return jsonify({
+                    "cached": False,
+                    "incremental": True,
+                    "status": "done",
+                    **analysis_payload(existing_analysis)
+                })
+            except StoredResultError as e:
+                # Blob lama/rusak: analisis penuh di bawah menimpa result
+                logger.warning("Update incremental gagal, analisis ulang: %s", e)
+                db.session.rollback()
+
+    error = validate_messages(messages)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Row SessionAnalysis sekaligus jadi job (id = job id), dipakai ulang kalau job sebelumnya gagal
+    analysis = existing_analysis or SessionAnalysis(session_id=session.id)
+    analysis.status = "pending"
+    analysis.error = None
+    analysis.job_started_at = time.time()
+    db.session.add(analysis)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Request /analyze lain untuk session ini baru saja membuat row-nya
+        # (session_id unique), ikut polling job itu
+        db.session.rollback()
+        analysis = SessionAnalysis.query.filter_by(session_id=session.id).one()
+        return jsonify(analysis_job_response(analysis)), 202
+
+    if current_app.config.get("ANALYSIS_ASYNC", True):
+        analysis_jobs.submit(analysis.id)
+        return jsonify(analysis_job_response(analysis)), 202
 
-    # ===== 2. RUN MAIN MODEL PREDICTION (IndoBERT + All Features) =====
     try:
-        bert_result = chatbot_service.predict(conversation_text)
-        
-        if "error" in bert_result:
-            return jsonify({
-                "error": f"Model prediction failed: {bert_result['error']}"
-            }), 500
+        unsaved_insights = run_analysis(
+            session,
+            analysis,
+            messages,
+            generate_insights=not current_app.config.get("GEMINI_STREAMING", False)
+        )
+        db.session.commit()
     except Exception as e:
         import traceback
         traceback.print_exc()
+        db.session.rollback()
+        analysis.status = "failed"
+        analysis.error = str(e)
+        db.session.commit()
+        if isinstance(e, AnalysisError):
+            return jsonify({"error": str(e)}), 500
         return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
 
-    # ===== 3. EXTRACT & SCORE PHRASES FROM INDIVIDUAL MESSAGES =====
-    all_phrases = []
-    phrase_frequency = {}
-    message_details = []
-    
-    for msg in messages:
-        clean_text = chatbot_service.preprocess_text(msg.content)
-        phrases = chatbot_service.extract_phrases(clean_text)
-        
-        for phrase in phrases:
-            phrase_frequency[phrase] = phrase_frequency.get(phrase, 0) + 1
-            all_phrases.append(phrase)
-        
-        msg_phrases_with_scores = []
-        if phrases and bert_result.get("phrase_scores"):
-            for phrase in phrases:
-                score = bert_result["phrase_scores"].get(phrase, 0)
-                if score > 0:
-                    msg_phrases_with_scores.append({
-                        "phrase": phrase,
-                        "score": round(score, 3)
-                    })
-        
-        message_details.append({
-            "content": msg.content[:100] + "..." if len(msg.content) > 100 else msg.content,
-            "timestamp": msg.created_at.strftime("%H:%M"),
-            "word_count": len(msg.content.split()),
-            "phrases": msg_phrases_with_scores[:3]
-        })
-
-    top_phrases = sorted(
-        phrase_frequency.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )[:20]
-
-    phrases_with_full_data = []
-    for phrase, freq in top_phrases:
-        tfidf_score = bert_result.get("phrase_scores", {}).get(phrase, 0)
-        phrases_with_full_data.append({
-            "phrase": phrase,
-            "frequency": freq,
-            "percentage": round((freq / len(messages)) * 100, 1),
-            "tfidf_score": round(tfidf_score, 3) if tfidf_score > 0 else None,
-            "importance": "high" if freq >= 3 else "medium" if freq >= 2 else "low"
-        })
-
-    # ===== 4. EMOTION ANALYSIS =====
-    emotion_data = {
-        "scores": bert_result.get("emotion_scores", {}),
-        "dominant": None
-    }
-    
-    if emotion_data["scores"]:
-        dominant_emotion = max(
-            emotion_data["scores"].items(),
-            key=lambda x: x[1]
-        )
-        emotion_data["dominant"] = {
-            "name": dominant_emotion[0],
-            "score": round(dominant_emotion[1], 3)
-        }
-
-    # ===== 5. BERT FEATURES =====
-    bert_features_data = bert_result.get("bert_summary", {})
-    bert_features = {
-        "embedding_dimension": bert_features_data.get("embedding_dim", 768),
-        "statistics": {
-            "mean": round(bert_features_data.get("embedding_mean", 0), 4),
-            "std": round(bert_features_data.get("embedding_std", 0), 4),
-            "max": round(bert_features_data.get("embedding_max", 0), 4),
-            "min": round(bert_features_data.get("embedding_min", 0), 4)
-        }
+    payload = analysis_payload(analysis)
+    response = {
+        "cached": False,
+        "status": "done",
+        "summary_sent_to_chat": payload["ai_insights"] is not None,
+        **payload
     }
+    if unsaved_insights is not None:
+        # Fallback / error hanya untuk response ini; ai_insights tersimpan tetap kosong
+        response["ai_insights_fallback"] = unsaved_insights
+    return jsonify(response)
 
-    # ===== 6. TEXT STATISTICS =====
-    text_stats = bert_result.get("text_stats", {})
-    text_statistics = {
-        "total_messages": len(messages),
-        "avg_message_length": round(
-            sum(len(m.content.split()) for m in messages) / len(messages), 1
-        ),
-        "word_count": text_stats.get("word_count", 0),
-        "sentence_count": text_stats.get("sentence_count", 0),
-        "clean_text_length": text_stats.get("clean_text_length", 0)
-    }
+@chat_message.route('/<int:session_id>/analyze/status')
+@login_required
+def analyze_status(session_id):
+    """Status job analisis; hasil lengkap ikut dikirim kalau sudah selesai"""
+    session = ChatSessions.query.filter_by(
+        id=session_id,
+        user_id=current_user.id
+    ).first_or_404()
 
-    # ===== 7. GENERATE AI INSIGHTS WITH GEMINI =====
-    rule_scores = {
-        "secure": bert_result["probabilities"].get("secure", 0),
-        "anxious": bert_result["probabilities"].get("anxious", 0),
-        "avoidant": bert_result["probabilities"].get("avoidant", 0)
+    analysis = SessionAnalysis.query.filter_by(session_id=session.id).first_or_404()
+
+    if analysis.status in ("pending", "running") and analysis_jobs.is_stale(analysis):
+        analysis.status = "failed"
+        analysis.error = "Job analisis terhenti, silakan coba lagi"
+        db.session.commit()
+
+    response = analysis_job_response(analysis)
+    if analysis.status == "done":
+        response.update(analysis_payload(analysis))
+        response["summary_sent_to_chat"] = response["ai_insights"] is not None
+    return jsonify(response)
+
+def cached_result_response(analysis):
+    """
+    Hasil tersimpan dikirim langsung dari blob SessionAnalysis.result (sudah JSON + gzip),
+    tanpa parse & serialize ulang. ETag dari isi blob -> 304 kalau tidak berubah.
+    Representasi gzip dan identity punya ETag sendiri (akhiran -gz).
+    """
+    gzipped = request.accept_encodings["gzip"] > 0
+    etag = result_etag(analysis.result, gzipped=gzipped)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif gzipped:
+        response = Response(analysis.result, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(result_body(analysis.result), mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+def analysis_job_response(analysis):
+    response = {
+        "job_id": analysis.id,
+        "status": analysis.status,
+        "status_url": url_for('chat_message.analyze_status', session_id=analysis.session_id)
     }
-    
-    key_phrases_for_gemini = [p["phrase"] for p in phrases_with_full_data[:15]]
-    
-    try:
-        gemini_summary = gemini_analyzer.summarize_conversation(
-            conversation_text=conversation_text,
-            key_phrases=key_phrases_for_gemini,
-            rule_scores=rule_scores
+    if analysis.status == "failed":
+        response["error"] = analysis.error
+    return response
+
+def resolve_attachment_style(session_id, messages, context, context_fingerprint):
+    """
+    Pakai prediksi tersimpan kalau dihitung dari pesan user yang sama (prediction_fingerprint,
+    bukan messages_fingerprint yang ikut maju di update incremental) dengan versi model
+    yang sedang dipakai, kalau tidak prediksi ulang
+    """
+    # Blob result tidak dibutuhkan di sini
+    analysis = SessionAnalysis.query.options(
+        load_only(
+            SessionAnalysis.attachment_style,
+            SessionAnalysis.status,
+            SessionAnalysis.prediction_fingerprint,
+            SessionAnalysis.model_version,
         )
-    except Exception as e:
-        gemini_summary = f"Gagal generate AI insights: {str(e)}"
-
-    # ===== 8. SAVE TO DATABASE =====
-    phrase_analysis_data = {
-        "top_phrases": phrases_with_full_data,
-        "total_unique_phrases": len(phrase_frequency),
-        "total_phrases_extracted": len(all_phrases)
-    }
-    
-    probabilities_data = {
-        k: round(v * 100, 1) 
-        for k, v in bert_result["probabilities"].items()
-    }
-    
-    rule_scores_data = {
-        k: round(v * 100, 1)
-        for k, v in rule_scores.items()
-    }
-    
-    new_analysis = SessionAnalysis(
-        session_id=session_id,
-        attachment_style=bert_result["prediction"],
-        confidence=bert_result["confidence"],
-        probabilities=json.dumps(probabilities_data),
-        phrase_analysis=json.dumps(phrase_analysis_data),
-        emotion_analysis=json.dumps(emotion_data),
-        bert_features=json.dumps(bert_features),
-        text_statistics=json.dumps(text_statistics),
-        timeline_data=json.dumps(message_details),
-        ai_insights=gemini_summary,
-        rule_scores=json.dumps(rule_scores_data)
+    ).filter_by(session_id=session_id).first()
+    if (analysis and analysis.status == "done"
+            and analysis.prediction_fingerprint == context_fingerprint
+            and analysis.model_version == model_registry.model_version):
+        return analysis.attachment_style
+
+    bert_result = model_registry.chatbot_service.predict(
+        context,
+        normalized_text=conversation_normalized_text(messages)
     )
-    
-    db.session.add(new_analysis)
-    
-    summary_message = f""" **Analisis Percakapan Selesai!**
-
-        Attachment Style Anda: **{bert_result["prediction"].upper()}** ({round(bert_result["confidence"] * 100, 1)}% confidence)
-
-        ---
-
-        {gemini_summary}
+    db.session.commit()
+    return bert_result["prediction"]
+
+def explain_context(messages, phrase):
+    """Konteks untuk prompt explain_phrase: pesan yang memuat frasa + pesan paling informatif"""
+    rows = message_rows(messages)
+    text, _ = build_context(
+        rows,
+        current_app.config.get("PROMPT_EXPLAIN_TOKENS", 400),
+        phrase_weights(count_phrases(rows)[0]),
+        phrase=phrase
+    )
+    return text
 
-        ---
+def is_cacheable_explanation(explanation):
+    return bool(explanation) and not is_unavailable_text(explanation)
 
-         *Lihat detail lengkap dengan klik tombol "Analisis Percakapan" di atas.*"""
+def sse_event(event, data):
+    """Format satu event Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    summary_bot_msg = ChatMessages(
-        session_id=session_id,
-        sender="bot",
-        content=summary_message
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        # Matikan buffering proxy (nginx) supaya chunk langsung sampai ke browser
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    db.session.add(summary_bot_msg)
 
-    session.status = 'analyzed'
-    db.session.commit()
-    
-    return jsonify({
-        "cached": False,
-        "summary_sent_to_chat": True,
-        "attachment_style": {
-            "prediction": bert_result["prediction"],
-            "confidence": round(bert_result["confidence"] * 100, 1),
-            "probabilities": probabilities_data
-        },
-        "phrase_analysis": phrase_analysis_data,
-        "emotion_analysis": emotion_data,
-        "bert_features": bert_features,
-        "text_statistics": text_statistics,
-        "timeline": message_details,
-        "ai_insights": gemini_summary,
-        "rule_scores": rule_scores_data
-    })
+@chat_message.route('/<int:session_id>/analyze/insights/stream')
+@login_required
+def stream_insights(session_id):
+    """Stream AI insights Gemini per chunk (SSE), simpan ke SessionAnalysis setelah selesai"""
+    session = ChatSessions.query.filter_by(
+        id=session_id,
+        user_id=current_user.id
+    ).first_or_404()
+
+    analysis = SessionAnalysis.query.filter_by(session_id=session.id).first_or_404()
+    if analysis.status != "done":
+        return jsonify({"error": "Analisis belum selesai"}), 409
+
+    ai_insights = analysis_insights(analysis)
+    if ai_insights is not None:
+        # Sudah pernah di-generate (mis. dari tab lain), kirim sekaligus
+        return sse_response(iter([sse_event("done", {"ai_insights": ai_insights})]))
+
+    inputs = insight_inputs(analysis, load_user_messages(session.id))
+    analysis_id = analysis.id
+
+    deadline = Deadline(current_app.config.get("ANALYSIS_DEADLINE", 45))
+
+    def generate():
+        chunks = []
+        failed = False
+        try:
+            for chunk in model_registry.gemini_analyzer.summarize_conversation_stream(**inputs, deadline=deadline):
+                chunks.append(chunk)
+                yield sse_event("chunk", {"text": chunk})
+        except Exception as e:
+            failed = True
+            chunk = insights_error_text(e)
+            chunks.append(chunk)
+            yield sse_event("chunk", {"text": chunk})
+
+        text = "".join(chunks).strip()
+        if failed or is_unavailable_text(text):
+            # Fallback lokal tidak disimpan, stream berikutnya mencoba Gemini lagi
+            yield sse_event("done", {"ai_insights": text, "summary_sent_to_chat": False, "fallback": True})
+            return
+
+        # Row dibaca ulang: stream lain bisa selesai duluan, yang pertama yang disimpan
+        analysis = db.session.get(SessionAnalysis, analysis_id)
+        ai_insights = analysis_insights(analysis)
+        if ai_insights is None:
+            save_insights(analysis.session, analysis, text)
+            db.session.commit()
+            ai_insights = text
+        yield sse_event("done", {"ai_insights": ai_insights, "summary_sent_to_chat": True})
+
+    return sse_response(generate())
 
 @chat_message.route('/<int:session_id>/explain-phrase', methods=['POST'])
 @login_required
@@ -332,26 +439,108 @@ def explain_phrase(session_id):
         return jsonify({"error": "Phrase required"}), 400
 
     # Ambil konteks percakapan
-    messages = ChatMessages.query.filter_by(
-        session_id=session.id,
-        sender="user"
-    ).order_by(ChatMessages.created_at).all()
-
+    messages = load_user_messages(session.id)
     context = "\n".join([msg.content for msg in messages])
-    
-    # Predict attachment style
-    bert_result = chatbot_service.predict(context)
-    attachment_style = bert_result["prediction"]
-
-    # Explain dengan Gemini
-    explanation = gemini_analyzer.explain_phrase(
-        phrase=phrase,
-        context=context,
-        attachment_style=attachment_style
-    )
+    context_fingerprint = messages_fingerprint(messages)
+    attachment_style = resolve_attachment_style(session.id, messages, context, context_fingerprint)
+
+    # Explain dengan Gemini (cache + request identik digabung jadi satu panggilan)
+    try:
+        analyzer = model_registry.gemini_analyzer
+        cache_fields = dict(
+            phrase=phrase,
+            attachment_style=attachment_style,
+            context_fingerprint=context_fingerprint,
+            model=analyzer.model
+        )
+        explanation = explanation_cache.get_or_generate(
+            explanation_cache.make_key(**cache_fields),
+            lambda: analyzer.explain_phrase(
+                phrase=phrase,
+                context=explain_context(messages, phrase),
+                attachment_style=attachment_style,
+                deadline=Deadline(current_app.config.get("EXPLAIN_DEADLINE", 20))
+            ),
+            cacheable=is_cacheable_explanation,
+            **cache_fields
+        )
+    except Exception as e:
+        explanation = f"Maaf, penjelasan tidak tersedia. Error: {e}"
 
     return jsonify({
         "phrase": phrase,
         "attachment_style": attachment_style,
         "explanation": explanation
-    })
\ No newline at end of file
+    })
+
+@chat_message.route('/<int:session_id>/explain-phrase/stream')
+@login_required
+def stream_explain_phrase(session_id):
+    """Versi streaming (SSE) dari explain-phrase, frasa lewat query string ?phrase="""
+    session = ChatSessions.query.filter_by(
+        id=session_id,
+        user_id=current_user.id
+    ).first_or_404()
+
+    phrase = request.args.get('phrase')
+    if not phrase:
+        return jsonify({"error": "Phrase required"}), 400
+
+    messages = load_user_messages(session.id)
+    context = "\n".join([msg.content for msg in messages])
+    context_fingerprint = messages_fingerprint(messages)
+    attachment_style = resolve_attachment_style(session.id, messages, context, context_fingerprint)
+
+    prompt_context = explain_context(messages, phrase)
+    deadline = Deadline(current_app.config.get("EXPLAIN_DEADLINE", 20))
+
+    def stream_explanation(analyzer, key, cache_fields):
+        cached = explanation_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        leader, future = explanation_cache.claim(key)
+        if not leader:
+            # Request identik sedang di-generate, tunggu hasilnya
+            yield explanation_cache.wait(future)
+            return
+
+        chunks = []
+        try:
+            for chunk in analyzer.explain_phrase_stream(
+                phrase=phrase,
+                context=prompt_context,
+                attachment_style=attachment_style,
+                deadline=deadline
+            ):
+                chunks.append(chunk)
+                yield chunk
+        except BaseException as e:
+            explanation_cache.release(key, error=e)
+            raise
+
+        explanation = "".join(chunks).strip()
+        try:
+            if is_cacheable_explanation(explanation):
+                explanation_cache.put(key, explanation=explanation, **cache_fields)
+        finally:
+            explanation_cache.release(key, explanation)
+
+    def generate():
+        yield sse_event("meta", {"phrase": phrase, "attachment_style": attachment_style})
+        try:
+            analyzer = model_registry.gemini_analyzer
+            cache_fields = dict(
+                phrase=phrase,
+                attachment_style=attachment_style,
+                context_fingerprint=context_fingerprint,
+                model=analyzer.model
+            )
+            for chunk in stream_explanation(analyzer, explanation_cache.make_key(**cache_fields), cache_fields):
+                yield sse_event("chunk", {"text": chunk})
+        except Exception as e:
+            yield sse_event("chunk", {"text": f"Maaf, penjelasan tidak tersedia. Error: {e}"})
+        yield sse_event("done", {})
+
+    return sse_response(generate())
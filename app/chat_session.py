@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 chat_session = Blueprint('chat_session', __name__)
 from .models import ChatSessions
 from . import db
+from .conversation_store import conversation_store
 
 
 
@@ -41,5 +42,6 @@ def delete(session_id) :
 
     db.session.delete(session)
     db.session.commit()
+    conversation_store.discard(session_id)
 
     return redirect(url_for('views.home'))
\ No newline at end of file
@@ -2,14 +2,22 @@ import torch
 import joblib
 import json
 import numpy as np
-from transformers import AutoTokenizer, AutoModel
-from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-import re
+from transformers import AutoTokenizer
+import atexit
+from .bert_batcher import BertMicroBatcher
+from .embedding_cache import EmbeddingCache
+from .fingerprint import artifact_version, encoder_settings
+from .text_preprocessor import TextPreprocessor, extract_phrases, text_stats
+from .phrase_scoring import build_vocab_index, score_phrases
+from .encoder_backends import build_encoder
 
 class ChatbotService:
     
-    def __init__(self, model_path="app/model/"):
+    def __init__(self, model_path="app/model/", batching=True, batch_window_ms=10, max_batch_size=8,
+                 embedding_cache_size=1024, embedding_cache_path=None,
+                 encode_mode="truncate", chunk_pooling="mean", max_windows=8, window_overlap=64,
+                 stem_memo_size=50000, stem_memo_path=None,
+                 encoder_backend=None, onnx_path=None, model_version=None):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
         # Load model & scalers
@@ -31,191 +39,313 @@ class ChatbotService:
         except:
             self.phrase_tfidf = None
         
+        self.phrase_vocab_index = build_vocab_index(self.phrase_tfidf) if self.phrase_tfidf else {}
+        
         # Load feature config
         with open(f"{model_path}feature_config.json", "r") as f:
             self.feature_config = json.load(f)
         
         # Load IndoBERT
         model_name = "indobenchmark/indobert-base-p1"
+        self.bert_model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.bert_model = AutoModel.from_pretrained(model_name).to(self.device)
-        self.bert_model.eval()
+        
+        # Encoder backend: torch (fp32), torch-int8 atau onnx
+        self.encoder_backend = encoder_backend or self.feature_config.get("encoder_backend", "torch")
+        self.encoder = build_encoder(
+            self.encoder_backend,
+            model_name,
+            self.device,
+            onnx_path=onnx_path or f"{model_path}indobert.onnx"
+        )
+        
+        # Encoding mode: "truncate" (512 token pertama) atau "chunked" (sliding window)
+        self.max_length = 512
+        self.encode_mode = encode_mode
+        self.chunk_pooling = chunk_pooling
+        self.max_windows = max(1, int(max_windows))
+        self.window_overlap = max(0, min(int(window_overlap), self.max_length - 3))
+        
+        # Cache embedding berdasarkan clean text, key dari versi model (hash artefak)
+        # + setting encoder, jadi bobot / setting baru tidak memakai vector lama
+        self.embedding_cache = None
+        if embedding_cache_size:
+            model_version = model_version or artifact_version(
+                model_path,
+                encoder_settings(self.encoder_backend, encode_mode, chunk_pooling, self.max_windows)
+            )
+            encoder_id = f"{self.encoder_backend}"
+            if encode_mode == "chunked":
+                encoder_id = f"{encoder_id}|chunked|{chunk_pooling}|{self.max_windows}|{self.window_overlap}"
+            self.embedding_cache = EmbeddingCache(
+                f"{model_version}|{encoder_id}",
+                max_entries=embedding_cache_size,
+                disk_path=embedding_cache_path
+            )
+        
+        # Micro-batching untuk request encode yang datang bersamaan
+        self.batcher = None
+        if batching:
+            self.batcher = BertMicroBatcher(
+                self.encode_texts_bert,
+                max_batch_size=max_batch_size,
+                window_ms=batch_window_ms
+            )
         
         # Initialize preprocessing
-        self._init_preprocessing()
+        self._init_preprocessing(stem_memo_size, stem_memo_path)
         
     
-    def _init_preprocessing(self):
+    def _init_preprocessing(self, stem_memo_size=50000, stem_memo_path=None):
         """Initialize text preprocessing tools"""
-        stopword_factory = StopWordRemoverFactory()
-        self.stopword_remover = stopword_factory.create_stop_word_remover()
-        
-        stemmer_factory = StemmerFactory()
-        self.stemmer = stemmer_factory.create_stemmer()
-        
-        self.slang_dict = {
-            'ga': 'tidak', 'gak': 'tidak', 'nggak': 'tidak', 'ngga': 'tidak',
-            'udah': 'sudah', 'dah': 'sudah', 'udh': 'sudah',
-            'bgt': 'banget', 'bener': 'benar',
-            'yg': 'yang', 'org': 'orang', 'krn': 'karena',
-            'gue': 'saya', 'gw': 'saya', 'aku': 'saya',
-            'lo': 'kamu', 'lu': 'kamu',
-            'kalo': 'kalau', 'gimana': 'bagaimana',
-            'emang': 'memang', 'trus': 'terus',
-        }
+        self.preprocessor = TextPreprocessor(
+            memo_size=stem_memo_size,
+            memo_path=stem_memo_path
+        )
+        
+        # Simpan memo stem supaya restart berikutnya langsung warm
+        if stem_memo_path:
+            atexit.register(self.preprocessor.save_memo)
         
+    def normalize_text(self, text):
+        """Lowercase, buang angka & simbol, ganti slang (belum stopword/stem)"""
+        return self.preprocessor.normalize_text(text)
+    
+    def clean_normalized_text(self, text):
+        """Stopword removal + stemming dari hasil normalize_text"""
+        return self.preprocessor.clean_normalized_text(text)
+    
     def preprocess_text(self, text):
         """Preprocess text"""
-        text = text.lower()
-        text = re.sub(r'\d+', '', text)
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        words = text.split()
-        words = [self.slang_dict.get(w, w) for w in words]
-        text = ' '.join(words)
-        
-        text = self.stopword_remover.remove(text)
-        text = self.stemmer.stem(text)
-        return text
+        return self.preprocessor.preprocess(text)
+    
+    def preprocess_many(self, texts):
+        """Preprocess banyak text sekaligus"""
+        return self.preprocessor.preprocess_many(texts)
     
     def extract_phrases(self, text, n=2):
         """Extract bigrams and trigrams"""
-        words = text.split()
-        phrases = []
-        
-        # Bigrams
-        for i in range(len(words) - 1):
-            phrase = f"{words[i]} {words[i+1]}"
-            if len(phrase) >= 10:
-                phrases.append(phrase)
-        
-        # Trigrams
-        for i in range(len(words) - 2):
-            phrase = f"{words[i]} {words[i+1]} {words[i+2]}"
-            if len(phrase) >= 15:
-                phrases.append(phrase)
-        
-        return list(set(phrases))
+        return extract_phrases(text)
+    
+    def split_windows(self, text):
+        """Pecah token text jadi window 512 token (termasuk [CLS]/[SEP]) yang overlap"""
+        ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        size = self.max_length - 2
+        
+        if self.encode_mode != "chunked" or len(ids) <= size:
+            return [ids[:size]]
+        
+        stride = size - self.window_overlap
+        starts = list(range(0, len(ids) - size, stride)) + [len(ids) - size]
+        
+        # Batasi jumlah window, ambil yang tersebar merata supaya tetap mencakup seluruh teks
+        if len(starts) > self.max_windows:
+            picks = np.linspace(0, len(starts) - 1, self.max_windows).round().astype(int)
+            starts = [starts[i] for i in picks]
+        
+        return [ids[start:start + size] for start in starts]
+    
+    def encode_texts_bert(self, texts):
+        """Get BERT CLS embeddings untuk beberapa text dalam satu forward pass"""
+        windows = []
+        owners = []
+        for i, text in enumerate(texts):
+            for window in self.split_windows(text):
+                windows.append([self.tokenizer.cls_token_id] + window + [self.tokenizer.sep_token_id])
+                owners.append(i)
+        
+        inputs = self.tokenizer.pad(
+            {"input_ids": windows},
+            padding=True,
+            return_tensors="pt"
+        )
+        
+        cls_vectors = self.encoder.encode(inputs["input_ids"], inputs["attention_mask"])
+        
+        token_counts = inputs["attention_mask"].sum(dim=1).numpy()
+        owners = np.array(owners)
+        
+        # Pool CLS dari semua window milik text yang sama jadi satu vektor 768-d
+        embeddings = []
+        for i in range(len(texts)):
+            mask = owners == i
+            if self.chunk_pooling == "attention":
+                weights = token_counts[mask].astype(np.float32)
+                embedding = np.average(cls_vectors[mask], axis=0, weights=weights)
+            else:
+                embedding = cls_vectors[mask].mean(axis=0)
+            embeddings.append(embedding.astype(np.float32))
+        
+        return embeddings
     
     def encode_text_bert(self, text):
         """Get BERT embeddings"""
-        inputs = self.tokenizer(
-            text, 
-            return_tensors="pt", 
-            padding=True,
-            truncation=True, 
-            max_length=512
-        ).to(self.device)
+        if self.embedding_cache:
+            cached = self.embedding_cache.get(text)
+            if cached is not None:
+                return cached
         
-        with torch.no_grad():
-            outputs = self.bert_model(**inputs)
-            embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()[0]
+        if self.batcher:
+            embedding = self.batcher.encode(text)
+        else:
+            embedding = self.encode_texts_bert([text])[0]
         
+        if self.embedding_cache:
+            self.embedding_cache.put(text, embedding)
         return embedding
     
-    def predict(self, conversation_text):
+    def encode_many_bert(self, texts, batch_size=16):
+        """
+        Embedding untuk banyak text (mis. batch re-analysis): cek cache dulu,
+        sisanya di-encode per batch, diurutkan panjang supaya padding minimal
+        """
+        embeddings = [None] * len(texts)
+        missing = []
+        for i, text in enumerate(texts):
+            cached = self.embedding_cache.get(text) if self.embedding_cache else None
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                missing.append(i)
+        
+        missing.sort(key=lambda i: len(texts[i]))
+        for start in range(0, len(missing), max(1, batch_size)):
+            batch = missing[start:start + batch_size]
+            for i, embedding in zip(batch, self.encode_texts_bert([texts[i] for i in batch])):
+                embeddings[i] = embedding
+                if self.embedding_cache:
+                    self.embedding_cache.put(texts[i], embedding)
+        
+        return embeddings
+    
+    def warmup(self):
+        """Jalankan input dummy lewat preprocessing, tokenizer, BERT & classifier"""
+        self.predict(
+            "Halo, aku merasa cemas kalau dia tidak membalas pesanku.\n"
+            "Kadang aku butuh waktu sendiri untuk berpikir."
+        )
+    
+    def predict(self, conversation_text, normalized_text=None):
         """
         Predict attachment style dengan DETAILED OUTPUT
         Returns semua info model: BERT, emotion, phrase scores, dll
+        
+        normalized_text: hasil normalize_text yang sudah tersimpan (opsional),
+        supaya tidak perlu normalisasi ulang seluruh percakapan
         """
         # Preprocess
-        clean_text = self.preprocess_text(conversation_text)
+        if normalized_text is not None:
+            clean_text = self.clean_normalized_text(normalized_text)
+        else:
+            clean_text = self.preprocess_text(conversation_text)
+        
+        return self._predict_batch([conversation_text], [clean_text], [self.encode_text_bert(clean_text)])[0]
+    
+    def predict_many(self, conversation_texts, normalized_texts=None, clean_texts=None, batch_size=16):
+        """
+        predict() untuk banyak percakapan sekaligus: BERT di-encode per batch,
+        scaler, TF-IDF & classifier dijalankan sekali untuk seluruh matrix fitur.
+        clean_texts: hasil preprocessing yang sudah dihitung di luar (mis. process pool)
+        """
+        if not conversation_texts:
+            return []
+        
+        if clean_texts is None:
+            normalized_texts = normalized_texts or [None] * len(conversation_texts)
+            clean_texts = [
+                self.clean_normalized_text(normalized) if normalized is not None else self.preprocess_text(text)
+                for text, normalized in zip(conversation_texts, normalized_texts)
+            ]
+        
+        embeddings = self.encode_many_bert(clean_texts, batch_size)
+        return self._predict_batch(conversation_texts, clean_texts, embeddings)
+    
+    def _predict_batch(self, conversation_texts, clean_texts, embeddings):
+        """Fitur & prediksi untuk N percakapan (satu baris matrix per percakapan)"""
+        n = len(clean_texts)
         
         # Text statistics
-        word_count = len(clean_text.split())
-        sentence_count = conversation_text.count('.') + conversation_text.count('!') + conversation_text.count('?')
+        stats = [text_stats(text, clean_text) for text, clean_text in zip(conversation_texts, clean_texts)]
         
         # 1. BERT embedding
-        bert_emb = self.encode_text_bert(clean_text)
-        bert_emb_scaled = self.scaler_bert.transform([bert_emb])[0]
-        feature_list = [bert_emb_scaled]
-        
-        # BERT summary untuk output
-        bert_summary = {
-            "embedding_dim": len(bert_emb),
-            "embedding_mean": float(np.mean(bert_emb)),
-            "embedding_std": float(np.std(bert_emb)),
-            "embedding_max": float(np.max(bert_emb)),
-            "embedding_min": float(np.min(bert_emb))
-        }
+        bert_matrix = np.vstack(embeddings)
+        feature_list = [self.scaler_bert.transform(bert_matrix)]
         
         # 2. Phrase features WITH SCORES
-        phrases = self.extract_phrases(clean_text)
-        phrase_scores = {}
+        phrases_list = [self.extract_phrases(clean_text) for clean_text in clean_texts]
+        phrase_scores_list = [{} for _ in range(n)]
         
-        if self.phrase_tfidf and phrases:
-            phrase_text = ' '.join(phrases)
-            phrase_features = self.phrase_tfidf.transform([phrase_text]).toarray()[0]
+        if self.phrase_tfidf:
+            phrase_features = self.phrase_tfidf.transform([' '.join(phrases) for phrases in phrases_list]).toarray()
             feature_list.append(phrase_features)
             
             # Get TF-IDF scores untuk setiap phrase
-            feature_names = self.phrase_tfidf.get_feature_names_out()
-            for phrase in phrases:
-                phrase_words = phrase.split()
-                # Cari skor dari vocab
-                matching_scores = []
-                for word in phrase_words:
-                    if word in feature_names:
-                        idx = list(feature_names).index(word)
-                        matching_scores.append(phrase_features[idx])
-                
-                if matching_scores:
-                    phrase_scores[phrase] = float(np.mean(matching_scores))
+            for i, phrases in enumerate(phrases_list):
+                if phrases:
+                    phrase_scores_list[i] = score_phrases(phrases, phrase_features[i], self.phrase_vocab_index)
         
         # 3. Emotion features (jika ada model emotion)
+        emotion_cols = self.feature_config.get('emotion_cols') or []
         emotion_scores = {}
-        if self.feature_config.get('emotion_cols'):
+        if emotion_cols:
             # Ini placeholder - kalau ada model emotion beneran, extract di sini
-            emotion_zeros = np.zeros(len(self.feature_config['emotion_cols']))
+            emotion_zeros = np.zeros((n, len(emotion_cols)))
             if self.scaler_emotion:
-                emotion_zeros = self.scaler_emotion.transform([emotion_zeros])[0]
+                emotion_zeros = self.scaler_emotion.transform(emotion_zeros)
             feature_list.append(emotion_zeros)
             
-            # Output emotion scores (untuk ditampilkan)
-            for i, emotion_col in enumerate(self.feature_config['emotion_cols']):
-                emotion_scores[emotion_col] = float(emotion_zeros[i])
+            # Output emotion scores (untuk ditampilkan), sama untuk semua baris
+            for i, emotion_col in enumerate(emotion_cols):
+                emotion_scores[emotion_col] = float(emotion_zeros[0][i])
         
         # 4. Text stats
         if self.feature_config.get('text_stat_cols'):
-            text_stats = [word_count, sentence_count]
+            stat_features = np.array([[st["word_count"], st["sentence_count"]] for st in stats], dtype=float)
             if self.scaler_text:
-                text_stats = self.scaler_text.transform([text_stats])[0]
-            feature_list.append(text_stats)
+                stat_features = self.scaler_text.transform(stat_features)
+            feature_list.append(stat_features)
         
         # Combine features
-        X = np.concatenate(feature_list).reshape(1, -1)
+        X = np.hstack(feature_list)
         
         # Predict
-        prediction = self.model.predict(X)[0]
-        probabilities = self.model.predict_proba(X)[0]
-        proba_dict = dict(zip(self.model.classes_, probabilities))
-        
-        # ENHANCED RETURN dengan semua detail model
-        return {
-            # Main prediction
-            "prediction": prediction,
-            "confidence": float(max(probabilities)),
-            "probabilities": {k: float(v) for k, v in proba_dict.items()},
-            
-            # Phrase analysis
-            "key_phrases": phrases[:20],
-            "phrase_scores": phrase_scores,  
-            
-            # Emotion analysis (jika ada)
-            "emotion_scores": emotion_scores,  
-            
-            # BERT features summary
-            "bert_summary": bert_summary, 
-            
-            # Text stats
-            "text_stats": {
-                "word_count": word_count,
-                "sentence_count": sentence_count,
-                "clean_text_length": len(clean_text)
-            },
+        predictions = self.model.predict(X)
+        probabilities = self.model.predict_proba(X)
+        
+        results = []
+        for i in range(n):
+            bert_emb = embeddings[i]
+            proba_dict = dict(zip(self.model.classes_, probabilities[i]))
             
-            # Original text
-            "clean_text": clean_text,
-            "original_text": conversation_text
-        }
\ No newline at end of file
+            # ENHANCED RETURN dengan semua detail model
+            results.append({
+                # Main prediction
+                "prediction": predictions[i],
+                "confidence": float(max(probabilities[i])),
+                "probabilities": {k: float(v) for k, v in proba_dict.items()},
+                
+                # Phrase analysis
+                "key_phrases": phrases_list[i][:20],
+                "phrase_scores": phrase_scores_list[i],
+                
+                # Emotion analysis (jika ada)
+                "emotion_scores": dict(emotion_scores),
+                
+                # BERT features summary
+                "bert_summary": {
+                    "embedding_dim": len(bert_emb),
+                    "embedding_mean": float(np.mean(bert_emb)),
+                    "embedding_std": float(np.std(bert_emb)),
+                    "embedding_max": float(np.max(bert_emb)),
+                    "embedding_min": float(np.min(bert_emb))
+                },
+                
+                # Text stats
+                "text_stats": stats[i],
+                
+                # Original text
+                "clean_text": clean_texts[i],
+                "original_text": conversation_texts[i]
+            })
+        
+        return results
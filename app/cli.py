@@ -0,0 +1,468 @@
+"""
+Re-analisis offline semua session yang sudah dianalisis, mis. setelah model_best.pkl dilatih ulang.
+
+    flask --app main reanalyze --batch-size 64 --workers 4
+    flask --app main reanalyze --dry-run --limit 500
+
+Session dibaca per batch (keyset by session_id), preprocessing teks jalan di process pool
+sambil batch sebelumnya di-predict, BERT & classifier dijalankan per batch (predict_many),
+lalu SessionAnalysis di-update sekaligus per batch. ai_insights tidak diubah.
+Progress disimpan di file checkpoint, jadi command yang terputus bisa dijalankan ulang.
+Analisis yang sudah memakai model_version sekarang dilewati (kecuali --force).
+
+Konversi satu kali row SessionAnalysis lama (kolom TEXT per bagian) ke blob result,
+dijalankan sebelum kolom lama di-drop:
+
+    flask --app main pack-analyses --dry-run
+    flask --app main pack-analyses
+"""
+import json
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import MetaData, Table, func, inspect, or_, select, update
+from sqlalchemy.orm import load_only
+
+from . import db
+from .analysis_blob import RESULT_FORMAT, pack_result, unpack_result
+from .analysis_service import (
+    MessageRow,
+    analysis_values,
+    build_statistics,
+    build_timeline,
+    count_phrases,
+    is_transient_insights,
+    result_document,
+    validate_messages,
+)
+from .fingerprint import legacy_messages_fingerprint, messages_fingerprint
+from .model_registry import model_registry
+from .models import ChatMessages, SessionAnalysis
+from .text_preprocessor import extract_phrases
+
+BatchMessage = namedtuple(
+    "BatchMessage", ["id", "content", "created_at", "normalized_content", "clean_content", "phrases"]
+)
+
+# TextPreprocessor per proses worker (lihat _init_worker)
+_preprocessor = None
+
+
+def _init_worker(memo_path=None):
+    global _preprocessor
+    from .text_preprocessor import TextPreprocessor
+
+    _preprocessor = TextPreprocessor(memo_path=memo_path)
+
+
+def preprocess_session(messages):
+    """
+    Jalan di process pool. messages: [(id, content, normalized_content)] urut waktu.
+    Sama dengan conversation_normalized_text + predict(): pesan yang belum
+    di-preprocess di-backfill, lalu seluruh percakapan di-stem.
+    """
+    backfill = {}
+    normalized_parts = []
+    for msg_id, content, normalized in messages:
+        if normalized is None:
+            normalized = _preprocessor.normalize_text(content)
+            clean = _preprocessor.clean_normalized_text(normalized)
+            backfill[msg_id] = (normalized, clean, json.dumps(extract_phrases(clean)))
+        if normalized:
+            normalized_parts.append(normalized)
+
+    return {
+        "conversation_text": "\n".join(content for _, content, _ in messages),
+        "clean_text": _preprocessor.clean_normalized_text(" ".join(normalized_parts)),
+        "backfill": backfill,
+    }
+
+
+def reanalyze_filter(after_id, skip_version=None):
+    """
+    Analisis selesai setelah after_id; skip_version: lewati yang sudah memakai versi model ini
+    (kecuali result-nya masih format lama)
+    """
+    conditions = [SessionAnalysis.status == "done", SessionAnalysis.session_id > after_id]
+    if skip_version:
+        conditions.append(or_(
+            SessionAnalysis.model_version.is_(None),
+            SessionAnalysis.model_version != skip_version,
+            SessionAnalysis.result_format.is_(None),
+            SessionAnalysis.result_format != RESULT_FORMAT
+        ))
+    return conditions
+
+
+def session_batches(after_id, batch_size, limit=None, skip_version=None):
+    """Yield [(analysis_id, session_id, attachment_style lama, [BatchMessage], result lama)] per batch"""
+    yielded = 0
+    while limit is None or yielded < limit:
+        size = batch_size if limit is None else min(batch_size, limit - yielded)
+        analyses = SessionAnalysis.query.options(
+            load_only(
+                SessionAnalysis.id, SessionAnalysis.session_id, SessionAnalysis.attachment_style,
+                SessionAnalysis.result, SessionAnalysis.created_at
+            )
+        ).filter(
+            *reanalyze_filter(after_id, skip_version)
+        ).order_by(SessionAnalysis.session_id).limit(size).all()
+        if not analyses:
+            return
+
+        session_ids = [a.session_id for a in analyses]
+        messages = {session_id: [] for session_id in session_ids}
+        for msg in ChatMessages.query.options(
+            load_only(
+                ChatMessages.id, ChatMessages.session_id, ChatMessages.content, ChatMessages.created_at,
+                ChatMessages.normalized_content, ChatMessages.clean_content, ChatMessages.phrases
+            )
+        ).filter(
+            ChatMessages.session_id.in_(session_ids),
+            ChatMessages.sender == "user"
+        ).order_by(ChatMessages.session_id, ChatMessages.created_at, ChatMessages.id):
+            messages[msg.session_id].append(BatchMessage(
+                msg.id, msg.content, msg.created_at, msg.normalized_content, msg.clean_content, msg.phrases
+            ))
+
+        batch = [
+            (a.id, a.session_id, a.attachment_style, messages[a.session_id], previous_result(a))
+            for a in analyses
+        ]
+        # Objek ORM tidak dipakai lagi, jangan ditahan di identity map
+        db.session.expunge_all()
+
+        yield batch
+        yielded += len(batch)
+        after_id = session_ids[-1]
+
+
+def previous_result(analysis):
+    """Bagian result yang dipertahankan saat re-analisis (ai_insights, stage_timings, analyzed_at)"""
+    result = unpack_result(analysis.result) if analysis.result else {}
+    if not result.get("analyzed_at") and analysis.created_at:
+        result["analyzed_at"] = analysis.created_at.strftime("%Y-%m-%d %H:%M:%S")
+    return result
+
+
+def analysis_update(analysis_id, messages, preprocessed, bert_result, model_version, previous):
+    """Row update SessionAnalysis + update ChatMessages untuk pesan yang di-backfill"""
+    backfill = preprocessed["backfill"]
+    rows = []
+    message_updates = []
+    for msg in messages:
+        if msg.id in backfill:
+            normalized, clean, phrases = backfill[msg.id]
+            message_updates.append({
+                "id": msg.id, "normalized_content": normalized, "clean_content": clean, "phrases": phrases
+            })
+        else:
+            clean, phrases = msg.clean_content, msg.phrases
+        rows.append(MessageRow(msg.content, msg.created_at, json.loads(phrases) if phrases else [], clean))
+
+    stats = build_statistics(rows, bert_result, count_phrases(rows))
+    timeline = build_timeline(rows, bert_result.get("phrase_scores", {}))
+    values = analysis_values(bert_result, stats, timeline)
+    result = {
+        **values["result"],
+        "ai_insights": previous.get("ai_insights"),
+        "stage_timings": previous.get("stage_timings"),
+    }
+    values["result"] = pack_result(result_document(result, previous.get("analyzed_at"), model_version))
+    values["result_format"] = RESULT_FORMAT
+    values["id"] = analysis_id
+    values["messages_fingerprint"] = values["prediction_fingerprint"] = messages_fingerprint(messages)
+    values["last_message_id"] = max(msg.id for msg in messages)
+    values["model_version"] = model_version
+    return values, message_updates
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_checkpoint(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+@click.command("reanalyze")
+@click.option("--batch-size", default=64, show_default=True, help="Session per batch (satu predict_many + satu commit)")
+@click.option("--bert-batch-size", default=16, show_default=True, help="Text per forward pass BERT")
+@click.option("--workers", default=max(1, (os.cpu_count() or 2) - 1), show_default=True,
+              help="Proses preprocessing (0 = di proses ini)")
+@click.option("--limit", type=int, default=None, help="Maksimum session yang diproses")
+@click.option("--dry-run", is_flag=True, help="Hitung prediksi baru tanpa menulis ke database")
+@click.option("--restart", is_flag=True, help="Abaikan checkpoint, mulai dari session pertama")
+@click.option("--force", is_flag=True, help="Ikut proses analisis yang sudah memakai versi model sekarang")
+@click.option("--checkpoint", "checkpoint_path", default=None, help="File checkpoint (default: instance/)")
+@with_appcontext
+def reanalyze_command(batch_size, bert_batch_size, workers, limit, dry_run, restart, force, checkpoint_path):
+    """Hitung ulang SessionAnalysis semua session dengan model yang sekarang."""
+    checkpoint_path = checkpoint_path or os.path.join(current_app.instance_path, "reanalyze_checkpoint.json")
+    state = {"last_session_id": 0, "processed": 0, "changed": 0, "skipped": 0}
+    checkpoint = None if restart or dry_run else read_checkpoint(checkpoint_path)
+    if checkpoint:
+        state.update(checkpoint)
+        click.echo(f"Lanjut dari checkpoint: session_id > {state['last_session_id']} "
+                   f"({state['processed']} session sudah diproses)")
+    elif not dry_run:
+        os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+
+    model_version = model_registry.model_version
+    skip_version = None if force else model_version
+    total = db.session.query(func.count(SessionAnalysis.id)).filter(
+        *reanalyze_filter(state["last_session_id"], skip_version)
+    ).scalar()
+    if limit is not None:
+        total = min(total, limit)
+    if not total:
+        click.echo("Tidak ada session untuk dianalisis ulang.")
+        return
+
+    click.echo("Memuat model...")
+    service = model_registry.chatbot_service
+    memo_path = current_app.config.get("STEM_MEMO_PATH")
+
+    if workers > 0:
+        # spawn: worker tidak mewarisi torch / koneksi DB dari proses ini
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(memo_path,)
+        )
+    else:
+        pool = None
+        _init_worker(memo_path)
+
+    click.echo(f"Re-analisis {total} session ke model {model_version} (batch {batch_size}, {workers} worker preprocessing"
+               f"{', dry-run' if dry_run else ''})")
+    start = time.perf_counter()
+    # Hitungan run ini (state menyimpan total kumulatif termasuk run sebelumnya)
+    done = 0
+    skipped = 0
+    predictions = {}
+
+    def process(batch, preprocessed):
+        nonlocal done
+        preprocessed = [p.result() for p in preprocessed] if pool else preprocessed
+        bert_results = service.predict_many(
+            [p["conversation_text"] for p in preprocessed],
+            clean_texts=[p["clean_text"] for p in preprocessed],
+            batch_size=bert_batch_size
+        )
+
+        analysis_updates, message_updates = [], []
+        for item, p, bert_result in zip(batch, preprocessed, bert_results):
+            analysis_id, _, old_style, messages, previous = item
+            values, backfilled = analysis_update(analysis_id, messages, p, bert_result, model_version, previous)
+            analysis_updates.append(values)
+            message_updates.extend(backfilled)
+            predictions[values["attachment_style"]] = predictions.get(values["attachment_style"], 0) + 1
+            if values["attachment_style"] != old_style:
+                state["changed"] += 1
+
+        if not dry_run:
+            if analysis_updates:
+                db.session.execute(update(SessionAnalysis), analysis_updates)
+            if message_updates:
+                db.session.execute(update(ChatMessages), message_updates)
+            db.session.commit()
+
+        done += len(batch)
+        state["processed"] += len(batch)
+        state["last_session_id"] = batch[-1][1]
+        if not dry_run:
+            write_checkpoint(checkpoint_path, state)
+
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0
+        eta = (total - done - skipped) / rate if rate else 0
+        click.echo(f"  {done + skipped}/{total} session | {rate:.1f} session/s | ETA {eta:.0f}s | "
+                   f"prediksi berubah {state['changed']} | dilewati {skipped}")
+
+    try:
+        pending = None
+        for batch in session_batches(state["last_session_id"], batch_size, limit, skip_version):
+            # Session < 5 pesan tidak pernah lolos /analyze, lewati saja
+            valid = [item for item in batch if validate_messages(item[3]) is None]
+            skipped += len(batch) - len(valid)
+            state["skipped"] += len(batch) - len(valid)
+            if not valid:
+                continue
+
+            payloads = [[(m.id, m.content, m.normalized_content) for m in item[3]] for item in valid]
+            if pool:
+                preprocessed = [pool.submit(preprocess_session, payload) for payload in payloads]
+            else:
+                preprocessed = [preprocess_session(payload) for payload in payloads]
+
+            # Predict batch sebelumnya sementara batch ini di-preprocess
+            if pending:
+                process(*pending)
+            pending = (valid, preprocessed)
+
+        if pending:
+            process(*pending)
+    except BaseException:
+        db.session.rollback()
+        click.echo(f"Berhenti di session_id > {state['last_session_id']}; jalankan ulang untuk melanjutkan.", err=True)
+        raise
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    click.echo(f"Selesai: {done} session dalam {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} session/s), "
+               f"prediksi berubah {state['changed']}, dilewati {skipped}")
+    click.echo(f"Distribusi prediksi: {json.dumps(predictions)}")
+    if not dry_run and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+
+# ===== Konversi row lama ke blob result (pack-analyses) =====
+
+# Kolom hasil sebelum SessionAnalysis.result (JSON TEXT per bagian)
+LEGACY_RESULT_COLUMNS = (
+    "probabilities", "phrase_analysis", "emotion_analysis", "bert_features",
+    "text_statistics", "timeline_data", "ai_insights", "rule_scores",
+)
+
+
+def legacy_result(row):
+    """Isi result dari kolom TEXT lama, susunannya sama dengan analysis_service.analysis_values"""
+    def load(column, default=None):
+        value = getattr(row, column, None)
+        return json.loads(value) if value else default
+
+    # Fallback / pesan error yang dulu ikut tersimpan -> kosong, insights di-generate ulang
+    ai_insights = getattr(row, "ai_insights", None)
+    if ai_insights and is_transient_insights(ai_insights):
+        ai_insights = None
+
+    return {
+        "attachment_style": {
+            "prediction": row.attachment_style,
+            "confidence": round((row.confidence or 0) * 100, 1),
+            "probabilities": load("probabilities", {}),
+        },
+        "phrase_analysis": load("phrase_analysis"),
+        "emotion_analysis": load("emotion_analysis"),
+        "bert_features": load("bert_features"),
+        "text_statistics": load("text_statistics"),
+        "timeline": load("timeline_data", []),
+        "ai_insights": ai_insights,
+        "rule_scores": load("rule_scores", {}),
+        "stage_timings": load("stage_timings"),
+    }
+
+
+def legacy_fingerprints(analysis_row, messages, model_version):
+    """
+    Kolom fingerprint baru kalau fingerprint lama masih cocok dengan pesan sekarang,
+    supaya analisis tidak dihitung ulang (dan ringkasan tidak dikirim dua kali ke chat)
+    """
+    stored = analysis_row.messages_fingerprint
+    if not messages or stored not in (legacy_messages_fingerprint(messages), messages_fingerprint(messages)):
+        return {}
+    fingerprint = messages_fingerprint(messages)
+    values = {
+        "messages_fingerprint": fingerprint,
+        "prediction_fingerprint": fingerprint,
+        "last_message_id": max(msg.id for msg in messages),
+    }
+    if model_version and analysis_row.model_version is None:
+        values["model_version"] = model_version
+    return values
+
+
+@click.command("pack-analyses")
+@click.option("--batch-size", default=500, show_default=True)
+@click.option("--stamp-model/--no-stamp-model", default=True, show_default=True,
+              help="Anggap row lama tanpa model_version dihitung dengan model sekarang")
+@click.option("--dry-run", is_flag=True, help="Hitung row yang bisa dikonversi tanpa menulis ke database")
+@with_appcontext
+def pack_analyses_command(batch_size, stamp_model, dry_run):
+    """Pack kolom hasil lama SessionAnalysis ke blob result (sebelum kolom lama di-drop)."""
+    columns = {column["name"] for column in inspect(db.engine).get_columns(SessionAnalysis.__tablename__)}
+    present = [name for name in LEGACY_RESULT_COLUMNS + ("stage_timings",) if name in columns]
+    if "probabilities" not in present:
+        click.echo("Kolom lama tidak ada, tidak ada yang perlu dikonversi.")
+        return
+
+    table = Table(SessionAnalysis.__tablename__, MetaData(), autoload_with=db.engine)
+    select_columns = [
+        table.c[name] for name in (
+            "id", "session_id", "attachment_style", "confidence", "created_at",
+            "messages_fingerprint", "model_version", *present
+        )
+    ]
+    model_version = model_registry.model_version if stamp_model else None
+
+    after_id = 0
+    packed = restamped = failed = 0
+    while True:
+        rows = db.session.execute(
+            select(*select_columns).where(
+                table.c.id > after_id,
+                table.c.status == "done",
+                table.c.result.is_(None),
+                table.c.probabilities.is_not(None)
+            ).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        after_id = rows[-1].id
+
+        messages = {row.session_id: [] for row in rows}
+        for msg in ChatMessages.query.options(
+            load_only(ChatMessages.id, ChatMessages.session_id, ChatMessages.content)
+        ).filter(
+            ChatMessages.session_id.in_(list(messages)),
+            ChatMessages.sender == "user"
+        ).order_by(ChatMessages.session_id, ChatMessages.created_at, ChatMessages.id):
+            messages[msg.session_id].append(msg)
+
+        updates = []
+        for row in rows:
+            try:
+                result = legacy_result(row)
+            except ValueError as e:
+                failed += 1
+                click.echo(f"  analysis {row.id}: JSON rusak ({e}), dilewati", err=True)
+                continue
+
+            values = legacy_fingerprints(row, messages[row.session_id], model_version)
+            restamped += bool(values)
+            analyzed_at = row.created_at.strftime("%Y-%m-%d %H:%M:%S") if row.created_at else None
+            values.update({
+                "id": row.id,
+                "result": pack_result(result_document(
+                    result, analyzed_at, values.get("model_version", row.model_version)
+                )),
+                "result_format": RESULT_FORMAT,
+            })
+            updates.append(values)
+
+        packed += len(updates)
+        db.session.expunge_all()
+        if not dry_run and updates:
+            db.session.execute(update(SessionAnalysis), updates)
+            db.session.commit()
+        click.echo(f"  s/d analysis {after_id}: {packed} dikonversi, {restamped} fingerprint diperbarui, "
+                   f"{failed} gagal")
+
+    click.echo(f"Selesai{' (dry-run)' if dry_run else ''}: {packed} row dikonversi, {restamped} tetap fresh "
+               f"(fingerprint cocok), {failed} gagal.")
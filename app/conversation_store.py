@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .intent_classifier import ConversationEngine, IntentClassifier
+
+
+class ConversationEngineStore:
+    """
+    Cache ConversationEngine per session dengan batas jumlah (LRU) dan TTL.
+    Engine yang hilang atau basi dibangun ulang dari ChatMessages, jadi state
+    sama di semua worker dan setelah restart.
+    """
+
+    def __init__(self, max_sessions=1000, ttl_seconds=3600, history_size=20):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_size = history_size
+
+        # Satu IntentClassifier dipakai bersama semua engine
+        self.intent_classifier = IntentClassifier()
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.rebuilds = 0
+
+    def init_app(self, app):
+        self.max_sessions = app.config.get("CONVERSATION_STORE_SIZE", self.max_sessions)
+        self.ttl_seconds = app.config.get("CONVERSATION_STORE_TTL", self.ttl_seconds)
+        self.history_size = app.config.get("CONVERSATION_HISTORY_SIZE", self.history_size)
+
+    def get(self, session_id, turn_count, load_recent_messages):
+        """
+        turn_count: jumlah pesan user yang sudah tersimpan untuk session ini.
+        load_recent_messages(n): n pesan user terakhir (urut lama -> baru), dipanggil saat rebuild.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_expired(now)
+
+            entry = self._engines.get(session_id)
+            if entry and entry[0].turn_count == turn_count:
+                self._engines[session_id] = (entry[0], now)
+                self._engines.move_to_end(session_id)
+                self.hits += 1
+                return entry[0]
+
+        # Miss, expired, atau worker lain sudah memproses pesan baru -> rebuild dari DB
+        engine = ConversationEngine.from_messages(
+            turn_count,
+            load_recent_messages(self.history_size) if turn_count else [],
+            intent_classifier=self.intent_classifier,
+            history_size=self.history_size
+        )
+
+        with self._lock:
+            self.rebuilds += 1
+            self._engines[session_id] = (engine, now)
+            self._engines.move_to_end(session_id)
+            while len(self._engines) > self.max_sessions:
+                self._engines.popitem(last=False)
+
+        return engine
+
+    def _evict_expired(self, now):
+        # Urutan OrderedDict = urutan akses terakhir, yang paling lama di depan
+        while self._engines:
+            session_id, (_, last_used) = next(iter(self._engines.items()))
+            if now - last_used < self.ttl_seconds:
+                break
+            self._engines.popitem(last=False)
+
+    def discard(self, session_id):
+        with self._lock:
+            self._engines.pop(session_id, None)
+
+    def stats(self):
+        return {
+            "sessions": len(self._engines),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "rebuilds": self.rebuilds,
+        }
+
+
+conversation_store = ConversationEngineStore()
@@ -0,0 +1,121 @@
+"""
+Engine & connection pool SQLAlchemy dari config (DATABASE_URL, DB_POOL_*, SQLITE_*).
+
+- MySQL: QueuePool dengan pool_size/max_overflow/recycle/pre_ping, koneksi basi
+  dibuang oleh pre-ping sebelum dipakai request
+- SQLite (file): WAL, synchronous & busy_timeout di-set tiap koneksi baru
+- Waktu tunggu koneksi dari pool & saturasi pool dicatat ke metrics (/metrics)
+"""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from .metrics import metrics
+
+POOL_ACQUIRE = metrics.histogram(
+    "db_pool_acquire_seconds", "Waktu menunggu koneksi dari pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+POOL_TIMEOUTS = metrics.counter("db_pool_timeouts_total", "Checkout pool yang gagal karena pool_timeout")
+POOL_CONNECTIONS = metrics.gauge("db_pool_connections", "Koneksi pool per state (checked_out, idle, overflow)")
+POOL_SATURATION = metrics.gauge("db_pool_saturation", "Koneksi dipakai / kapasitas maksimum pool (0-1)")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool yang mencatat lama checkout (termasuk menunggu koneksi kosong)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_ACQUIRE.observe(time.perf_counter() - start)
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def is_sqlite_memory(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS untuk DATABASE_URL"""
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+
+    # SQLite in-memory: biarkan Flask-SQLAlchemy pakai StaticPool
+    if is_sqlite_memory(uri):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.get("DB_POOL_SIZE", 10),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+    }
+    if is_sqlite(uri):
+        # Satu file lokal, koneksi tidak pernah basi; thread analisis ikut memakai pool
+        options["pool_pre_ping"] = False
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        # Lebih pendek dari wait_timeout MySQL (default 8 jam)
+        options["pool_recycle"] = config.get("DB_POOL_RECYCLE", 1800)
+    return options
+
+
+def apply_sqlite_pragmas(engine, journal_mode="WAL", synchronous="NORMAL", busy_timeout_ms=5000):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.close()
+
+
+class DatabaseEngine:
+    def __init__(self):
+        self.engine = None
+        self._collector_registered = False
+
+    def init_app(self, app, db):
+        """Dipanggil setelah db.init_app, sebelum koneksi pertama dibuat"""
+        with app.app_context():
+            self.engine = db.engine
+
+        uri = app.config["SQLALCHEMY_DATABASE_URI"]
+        if is_sqlite(uri) and not is_sqlite_memory(uri):
+            apply_sqlite_pragmas(
+                self.engine,
+                journal_mode=app.config.get("SQLITE_JOURNAL_MODE", "WAL"),
+                synchronous=app.config.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+                busy_timeout_ms=app.config.get("SQLITE_BUSY_TIMEOUT", 5000)
+            )
+
+        if not self._collector_registered:
+            metrics.add_collector(self.collect)
+            self._collector_registered = True
+
+    def collect(self):
+        pool = self.engine.pool if self.engine is not None else None
+        if not isinstance(pool, QueuePool):
+            return
+
+        checked_out = pool.checkedout()
+        POOL_CONNECTIONS.set(checked_out, state="checked_out")
+        POOL_CONNECTIONS.set(pool.checkedin(), state="idle")
+        POOL_CONNECTIONS.set(max(0, pool.overflow()), state="overflow")
+        capacity = pool.size() + max(0, pool._max_overflow)
+        POOL_SATURATION.set(round(checked_out / capacity, 4) if capacity else 0)
+
+
+database = DatabaseEngine()
@@ -0,0 +1,131 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Cache CLS embedding IndoBERT, key = hash(versi model + clean text).
+    Tier 1: LRU in-process. Tier 2 (opsional): tabel SQLite di disk.
+    Vector yang dikembalikan read-only, dipakai bersama semua pemanggil.
+    """
+
+    def __init__(self, model_version, max_entries=1024, disk_path=None):
+        # Versi model (lihat model_registry.configured_model_version), bukan nama model:
+        # bobot / setting encoder berubah dengan nama yang sama tetap membuat key baru
+        self.model_version = model_version
+        self.max_entries = max(1, int(max_entries))
+        self.disk_path = disk_path
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk = None
+        if disk_path:
+            self._init_disk()
+
+    def _init_disk(self):
+        self._disk = sqlite3.connect(self.disk_path, check_same_thread=False)
+        columns = {row[1] for row in self._disk.execute("PRAGMA table_info(bert_embeddings)")}
+        if columns and "model_version" not in columns:
+            # Cache format lama (key dari nama model), isinya tidak bisa dipercaya lagi
+            self._disk.execute("DROP TABLE bert_embeddings")
+        self._disk.execute(
+            """CREATE TABLE IF NOT EXISTS bert_embeddings (
+                key TEXT PRIMARY KEY,
+                model_version TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL
+            )"""
+        )
+        # Model berubah -> embedding lama tidak valid lagi
+        self._disk.execute(
+            "DELETE FROM bert_embeddings WHERE model_version != ?", (self.model_version,)
+        )
+        self._disk.commit()
+
+    def make_key(self, text):
+        payload = f"{self.model_version}\0{text}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, text):
+        key = self.make_key(text)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT dim, vector FROM bert_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    embedding = np.frombuffer(row[1], dtype=np.float32).copy()
+                    embedding.setflags(write=False)
+                    self._put_memory(key, embedding)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, text, embedding):
+        key = self.make_key(text)
+        # Salinan read-only: array milik pemanggil boleh diubah tanpa merusak cache
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+
+        with self._lock:
+            self._put_memory(key, embedding)
+
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO bert_embeddings (key, model_version, dim, vector) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, self.model_version, len(embedding), embedding.tobytes())
+                )
+                self._disk.commit()
+
+    def _put_memory(self, key, embedding):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def invalidate(self, model_version=None):
+        """Kosongkan cache; kalau model_version diberikan, pindah ke versi model baru"""
+        with self._lock:
+            self._memory.clear()
+            if model_version:
+                self.model_version = model_version
+
+            if self._disk is not None:
+                if model_version:
+                    self._disk.execute(
+                        "DELETE FROM bert_embeddings WHERE model_version != ?", (self.model_version,)
+                    )
+                else:
+                    self._disk.execute("DELETE FROM bert_embeddings")
+                self._disk.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk_enabled": self._disk is not None,
+        }
@@ -0,0 +1,118 @@
+import inspect
+import os
+
+import numpy as np
+import torch
+from transformers import AutoModel
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+class TorchEncoder:
+    """IndoBERT fp32 PyTorch (referensi)"""
+
+    name = "torch"
+
+    def __init__(self, model_name, device):
+        self.device = device
+        self.model = AutoModel.from_pretrained(model_name).to(device)
+        self.model.eval()
+
+    def encode(self, input_ids, attention_mask):
+        """Return CLS vector tiap baris batch sebagai numpy array [batch, hidden]"""
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=input_ids.to(self.device),
+                attention_mask=attention_mask.to(self.device)
+            )
+            return outputs.last_hidden_state[:, 0, :].cpu().numpy()
+
+
+class QuantizedTorchEncoder(TorchEncoder):
+    """IndoBERT dengan dynamic INT8 quantization pada layer Linear (CPU only)"""
+
+    name = "torch-int8"
+
+    def __init__(self, model_name, device=None):
+        super().__init__(model_name, torch.device("cpu"))
+        self.model = torch.quantization.quantize_dynamic(
+            self.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class _ClsOnly(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state[:, 0, :]
+
+
+def export_onnx(model_name, onnx_path):
+    """Export IndoBERT (output CLS saja) ke ONNX graph dengan batch & panjang dinamis"""
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    torch.onnx.export(
+        _ClsOnly(model),
+        (dummy, dummy),
+        onnx_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["cls"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "cls": {0: "batch"},
+        },
+        opset_version=14,
+        **kwargs
+    )
+
+
+class OnnxEncoder:
+    """IndoBERT hasil export ONNX, dijalankan dengan onnxruntime (CPU)"""
+
+    name = "onnx"
+
+    def __init__(self, model_name, device=None, onnx_path="app/model/indobert.onnx", threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("Backend 'onnx' butuh paket onnxruntime (pip install onnxruntime)")
+
+        if not os.path.exists(onnx_path):
+            export_onnx(model_name, onnx_path)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = ort.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+
+    def encode(self, input_ids, attention_mask):
+        (cls,) = self.session.run(
+            ["cls"],
+            {
+                "input_ids": input_ids.cpu().numpy().astype(np.int64),
+                "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+            }
+        )
+        return cls
+
+
+def build_encoder(backend, model_name, device, onnx_path=None):
+    if backend == "torch":
+        return TorchEncoder(model_name, device)
+    if backend == "torch-int8":
+        return QuantizedTorchEncoder(model_name)
+    if backend == "onnx":
+        return OnnxEncoder(model_name, onnx_path=onnx_path or "app/model/indobert.onnx")
+    raise ValueError(f"Encoder backend tidak dikenal: {backend} (pilihan: {', '.join(BACKENDS)})")
@@ -0,0 +1,162 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+
+
+class ExplanationCache:
+    """
+    Cache penjelasan frasa dari Gemini di tabel PhraseExplanation,
+    key = hash(frasa, attachment style, fingerprint konteks, model, versi prompt).
+    Request identik yang datang bersamaan hanya memicu satu panggilan Gemini (single-flight).
+    """
+
+    def __init__(self, ttl_seconds=30 * 24 * 3600, max_entries=10000, prompt_version="1", wait_timeout=120):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prompt_version = prompt_version
+        # Batas tunggu request yang menumpang panggilan Gemini request lain
+        self.wait_timeout = wait_timeout
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+
+    def init_app(self, app):
+        self.ttl_seconds = app.config.get("EXPLAIN_CACHE_TTL", self.ttl_seconds)
+        self.max_entries = app.config.get("EXPLAIN_CACHE_SIZE", self.max_entries)
+        self.prompt_version = app.config.get("EXPLAIN_PROMPT_VERSION", self.prompt_version)
+        app.extensions["explanation_cache"] = self
+
+    def make_key(self, phrase, attachment_style, context_fingerprint, model, **_):
+        payload = "\0".join([
+            phrase.strip().lower(),
+            attachment_style or "",
+            context_fingerprint,
+            model,
+            str(self.prompt_version),
+        ]).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key):
+        from .models import PhraseExplanation
+
+        row = PhraseExplanation.query.filter_by(cache_key=key).first()
+        if row is None or row.expires_at < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row.explanation
+
+    def put(self, key, phrase, attachment_style, context_fingerprint, model, explanation):
+        from .models import PhraseExplanation
+
+        PhraseExplanation.query.filter_by(cache_key=key).delete()
+        db.session.add(PhraseExplanation(
+            cache_key=key,
+            phrase=phrase,
+            attachment_style=attachment_style,
+            context_fingerprint=context_fingerprint,
+            model=model,
+            prompt_version=str(self.prompt_version),
+            explanation=explanation,
+            expires_at=time.time() + self.ttl_seconds
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Worker lain sudah menyimpan key yang sama
+            db.session.rollback()
+            return
+
+        with self._lock:
+            self._puts += 1
+            evict = self._puts % 100 == 1
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Hapus entry expired, lalu entry terlama kalau jumlahnya melebihi max_entries"""
+        from .models import PhraseExplanation
+
+        PhraseExplanation.query.filter(PhraseExplanation.expires_at < time.time()).delete()
+        cutoff = PhraseExplanation.query.order_by(
+            PhraseExplanation.id.desc()
+        ).offset(self.max_entries).first()
+        if cutoff is not None:
+            PhraseExplanation.query.filter(PhraseExplanation.id <= cutoff.id).delete()
+        db.session.commit()
+
+    def claim(self, key):
+        """
+        Return (leader, future). Leader wajib memanggil release(key, ...) setelah selesai;
+        request lain dengan key sama cukup menunggu future.result().
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.collapsed += 1
+                return False, future
+            future = Future()
+            self._inflight[key] = future
+            return True, future
+
+    def release(self, key, explanation=None, error=None):
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is None:
+            return
+        if error is not None and not isinstance(error, Exception):
+            # GeneratorExit dsb. (client SSE putus) jangan diteruskan ke request lain
+            error = RuntimeError("Request penjelasan dibatalkan")
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(explanation)
+
+    def wait(self, future):
+        return future.result(self.wait_timeout)
+
+    def get_or_generate(self, key, generate, cacheable=None, **fields):
+        """
+        Ambil dari cache, atau panggil generate() sekali untuk semua request identik.
+        cacheable(explanation) -> False untuk hasil yang tidak boleh disimpan (mis. pesan error).
+        """
+        explanation = self.get(key)
+        if explanation is not None:
+            return explanation
+
+        leader, future = self.claim(key)
+        if not leader:
+            return self.wait(future)
+
+        try:
+            explanation = generate()
+        except BaseException as e:
+            self.release(key, error=e)
+            raise
+        try:
+            if cacheable is None or cacheable(explanation):
+                self.put(key, explanation=explanation, **fields)
+        finally:
+            self.release(key, explanation)
+        return explanation
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collapsed": self.collapsed,
+            "inflight": len(self._inflight),
+        }
+
+
+explanation_cache = ExplanationCache()
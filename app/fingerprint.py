@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+
+# File di MODEL_PATH yang menentukan hasil prediksi
+MODEL_ARTIFACTS = (
+    "model_best.pkl",
+    "scaler_bert.pkl",
+    "scaler_emotion.pkl",
+    "scaler_text.pkl",
+    "phrase_tfidf.pkl",
+    "feature_config.json",
+)
+
+
+def extend_fingerprint(fingerprint, messages):
+    """
+    Fingerprint berantai: hash(fingerprint sebelumnya + id + content) per pesan,
+    jadi pesan baru cukup di-hash di atas fingerprint yang sudah tersimpan
+    """
+    for msg in messages:
+        fingerprint = hashlib.sha256(f"{fingerprint}\0{msg.id}\0{msg.content}".encode("utf-8")).hexdigest()
+    return fingerprint
+
+
+def messages_fingerprint(messages):
+    """Hash dari pesan user (id + content) untuk deteksi analisis yang basi"""
+    return extend_fingerprint("", messages)
+
+
+def legacy_messages_fingerprint(messages):
+    """Format fingerprint sebelum hash berantai, hanya untuk konversi row lama (flask pack-analyses)"""
+    digest = hashlib.sha256()
+    for msg in messages:
+        digest.update(f"{msg.id}\0{msg.content}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def encoder_settings(encoder_backend=None, encode_mode="truncate", chunk_pooling="mean", max_windows=8):
+    """
+    Setting encoder yang ikut menentukan embedding & prediksi (bagian dari artifact_version).
+    Setting sliding window hanya dipakai mode chunked; di mode truncate tidak ikut di-hash,
+    supaya mengubahnya tidak membuat semua analisis tersimpan basi.
+    """
+    settings = {"encoder_backend": encoder_backend, "encode_mode": encode_mode}
+    if encode_mode == "chunked":
+        settings.update(chunk_pooling=chunk_pooling, max_windows=max_windows)
+    return settings
+
+
+def artifact_version(model_path, settings=None):
+    """Hash isi artefak model + setting encoder, berubah kalau model dilatih ulang"""
+    digest = hashlib.sha256()
+    for name in MODEL_ARTIFACTS:
+        path = os.path.join(model_path, name)
+        if not os.path.exists(path):
+            continue
+        digest.update(f"{name}\0".encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    digest.update(json.dumps(settings or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
@@ -1,31 +1,234 @@
-import os
-from typing import List, Dict
-from google import genai
+import time
+from typing import Dict, Iterator, List
 from dotenv import load_dotenv
 
+from .llm_backends import GeminiBackend
+from .metrics import metrics
+from .prompt_builder import estimate_tokens
+from .resilience import CircuitBreaker, Deadline, DeadlineExceeded, backoff_delay, retry_call
+
 load_dotenv()
 
+# Awalan teks yang dikembalikan kalau panggilan Gemini gagal (jangan di-cache)
+SUMMARY_UNAVAILABLE = "Maaf, analisis AI tidak tersedia."
+EXPLANATION_UNAVAILABLE = "Maaf, penjelasan tidak tersedia."
+# Awalan teks fallback lokal saat circuit breaker terbuka / Gemini gagal
+FALLBACK_MARKER = "**[Ringkasan otomatis]**"
+
+LLM_REQUESTS = metrics.counter(
+    "llm_requests_total", "Panggilan LLM per hasil (success, error, deadline, cancelled, circuit_open)"
+)
+LLM_LATENCY = metrics.histogram("llm_request_seconds", "Latency panggilan LLM termasuk retry")
+LLM_RETRIES = metrics.counter("llm_retries_total", "Jumlah retry panggilan LLM")
+LLM_FALLBACKS = metrics.counter("llm_fallbacks_total", "Respons fallback lokal karena LLM gagal / breaker terbuka")
+LLM_PROMPT_TOKENS = metrics.histogram(
+    "llm_prompt_tokens", "Estimasi ukuran prompt (token) sebelum dikirim",
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+LLM_CIRCUIT_STATE = metrics.gauge("llm_circuit_state", "State circuit breaker LLM (0=closed, 1=half_open, 2=open)")
+
+CIRCUIT_STATE_VALUES = {
+    CircuitBreaker.CLOSED: 0,
+    CircuitBreaker.HALF_OPEN: 1,
+    CircuitBreaker.OPEN: 2,
+}
+
+
+def is_unavailable_text(text: str) -> bool:
+    """True untuk pesan error / fallback lokal (bukan hasil LLM asli)"""
+    return text.startswith((SUMMARY_UNAVAILABLE, EXPLANATION_UNAVAILABLE, FALLBACK_MARKER))
+
+
+def local_summary(key_phrases: List[str], rule_scores: Dict[str, float]) -> str:
+    """Ringkasan tanpa LLM dari skor model lokal & frasa kunci"""
+    dominant = max(rule_scores, key=rule_scores.get) if rule_scores else None
+    lines = [
+        FALLBACK_MARKER,
+        "",
+        "AI insights sedang tidak tersedia, berikut ringkasan dari model lokal.",
+        "",
+    ]
+    if dominant:
+        lines.append(f"**Kecenderungan attachment:** {dominant.title()} ({rule_scores[dominant]:.0%})")
+        for style in ("secure", "anxious", "avoidant"):
+            lines.append(f"- {style.title()}: {rule_scores.get(style, 0):.0%}")
+    if key_phrases:
+        lines += ["", f"**Frasa yang sering muncul:** {', '.join(key_phrases[:8])}"]
+    lines += ["", "Buka analisis lagi nanti untuk insight lengkap."]
+    return "\n".join(lines)
+
+
+def local_explanation(phrase: str, attachment_style: str) -> str:
+    return (
+        f"{FALLBACK_MARKER}\n\n"
+        f'Penjelasan AI untuk frasa "{phrase}" sedang tidak tersedia. '
+        f"Frasa ini muncul dalam percakapan dengan kecenderungan attachment {attachment_style}. "
+        "Coba lagi beberapa saat lagi."
+    )
+
+
 class GeminiAnalyzer:
-    def __init__(self, api_key: str = None, model: str = "gemini-2.0-flash-exp"):
-        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY tidak ditemukan")
+    """
+    Ringkasan & penjelasan frasa lewat LLM backend (lihat llm_backends),
+    dengan deadline, retry dan circuit breaker. Default backend: Gemini.
+    """
 
-        self.client = genai.Client(api_key=self.api_key)
-        self.model = model
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = "gemini-2.0-flash-exp",
+        base_url: str = None,
+        timeout: float = 20.0,
+        retries: int = 2,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+        backend=None,
+    ):
+        # Tanpa backend -> Gemini asli (butuh GEMINI_API_KEY)
+        self.backend = backend or GeminiBackend(api_key=api_key, model=model, base_url=base_url)
+        self.name = self.backend.name
+        # Dipakai juga sebagai bagian key cache penjelasan
+        self.model = self.backend.model if self.name == "gemini" else f"{self.name}:{self.backend.model}"
 
-    def summarize_conversation(
+        # timeout: batas satu percobaan (detik); budget total diambil dari deadline pemanggil
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_threshold=breaker_threshold,
+            reset_timeout=breaker_reset,
+            on_state_change=lambda breaker, state: LLM_CIRCUIT_STATE.set(
+                CIRCUIT_STATE_VALUES[state], backend=breaker.name
+            )
+        )
+        LLM_CIRCUIT_STATE.set(0, backend=self.name)
+
+    def _budget_exhausted(self, error: Exception, deadline: Deadline, attempt_timeout) -> bool:
+        """
+        True kalau gagal karena budget waktu pemanggil habis (bukan salah upstream):
+        DeadlineExceeded, atau timeout percobaan yang dipotong sisa budget di bawah self.timeout.
+        """
+        if isinstance(error, DeadlineExceeded):
+            return True
+        return deadline.expired() and attempt_timeout is not None and attempt_timeout < self.timeout
+
+    def _generate(self, prompt: str, method: str, fallback, deadline: Deadline = None) -> str:
+        """
+        backend.generate dengan deadline, retry + jitter dan circuit breaker.
+        Kalau gagal / breaker terbuka, return fallback() (ringkasan lokal).
+        """
+        if not self.breaker.allow():
+            LLM_REQUESTS.inc(backend=self.name, method=method, outcome="circuit_open")
+            LLM_FALLBACKS.inc(backend=self.name, method=method)
+            return fallback()
+        LLM_PROMPT_TOKENS.observe(estimate_tokens(prompt), backend=self.name, method=method)
+
+        deadline = deadline or Deadline(self.timeout)
+        attempt_timeout = None
+
+        def call(timeout):
+            nonlocal attempt_timeout
+            attempt_timeout = timeout
+            return self.backend.generate(prompt, timeout)
+
+        start = time.perf_counter()
+        try:
+            text = retry_call(
+                call,
+                deadline,
+                attempts=self.retries + 1,
+                timeout_cap=self.timeout,
+                retryable=self.backend.is_retryable,
+                on_retry=lambda attempt, e: LLM_RETRIES.inc(backend=self.name, method=method)
+            )
+        except Exception as e:
+            if self._budget_exhausted(e, deadline, attempt_timeout):
+                self.breaker.release()
+                outcome = "deadline"
+            else:
+                self.breaker.record_failure()
+                outcome = "error"
+            LLM_REQUESTS.inc(backend=self.name, method=method, outcome=outcome)
+            LLM_FALLBACKS.inc(backend=self.name, method=method)
+            return fallback()
+        except BaseException:
+            # Dibatalkan (mis. KeyboardInterrupt), bukan hasil upstream
+            self.breaker.release()
+            raise
+        finally:
+            LLM_LATENCY.observe(time.perf_counter() - start, backend=self.name, method=method)
+
+        self.breaker.record_success()
+        LLM_REQUESTS.inc(backend=self.name, method=method, outcome="success")
+        return text
+
+    def _generate_stream(self, prompt: str, method: str, fallback, deadline: Deadline = None) -> Iterator[str]:
+        """
+        Yield potongan teks begitu diterima dari backend (generate_stream).
+        Retry hanya sebelum chunk pertama terkirim; setelah itu error ditempel di akhir teks.
+        """
+        if not self.breaker.allow():
+            LLM_REQUESTS.inc(backend=self.name, method=method, outcome="circuit_open")
+            LLM_FALLBACKS.inc(backend=self.name, method=method)
+            yield fallback()
+            return
+        LLM_PROMPT_TOKENS.observe(estimate_tokens(prompt), backend=self.name, method=method)
+
+        deadline = deadline or Deadline(self.timeout)
+        start = time.perf_counter()
+        attempts = self.retries + 1
+        # True setelah breaker dicatat sukses/gagal; kalau consumer menutup stream
+        # (client SSE putus -> GeneratorExit) sebelum itu, slot percobaan dilepas di finally
+        settled = False
+
+        try:
+            for attempt in range(attempts):
+                emitted = False
+                attempt_timeout = None
+                try:
+                    attempt_timeout = deadline.timeout(self.timeout)
+                    for chunk in self.backend.generate_stream(prompt, attempt_timeout):
+                        emitted = True
+                        yield chunk
+                    settled = True
+                    self.breaker.record_success()
+                    LLM_REQUESTS.inc(backend=self.name, method=method, outcome="success")
+                    return
+                except Exception as e:
+                    retry = (
+                        not emitted
+                        and attempt < attempts - 1
+                        and not isinstance(e, DeadlineExceeded)
+                        and self.backend.is_retryable(e)
+                    )
+                    delay = backoff_delay(attempt) if retry else 0
+                    if not retry or delay >= deadline.remaining():
+                        settled = True
+                        if self._budget_exhausted(e, deadline, attempt_timeout):
+                            self.breaker.release()
+                            outcome = "deadline"
+                        else:
+                            self.breaker.record_failure()
+                            outcome = "error"
+                        LLM_REQUESTS.inc(backend=self.name, method=method, outcome=outcome)
+                        LLM_FALLBACKS.inc(backend=self.name, method=method)
+                        yield f"\n\n{fallback()}" if emitted else fallback()
+                        return
+                    LLM_RETRIES.inc(backend=self.name, method=method)
+                    time.sleep(delay)
+        finally:
+            if not settled:
+                self.breaker.release()
+                LLM_REQUESTS.inc(backend=self.name, method=method, outcome="cancelled")
+            LLM_LATENCY.observe(time.perf_counter() - start, backend=self.name, method=method)
+
+    def summary_prompt(
         self,
         conversation_text: str,
         key_phrases: List[str],
         rule_scores: Dict[str, float],
     ) -> str:
-        """
-        Generate empathetic and insightful summary for chat display
-        Format optimized for chat bubble rendering
-        """
-
-        prompt = f"""Kamu adalah psikolog attachment theory yang empatis dan profesional.
+        return f"""Kamu adalah psikolog attachment theory yang empatis dan profesional.
 
             PERCAKAPAN USER:
             {conversation_text}
@@ -62,31 +265,51 @@ class GeminiAnalyzer:
             - Fokus pada insight yang actionable
             - Tone: empatis, supportive, non-judgmental"""
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-            )
-            return response.text.strip()
-        except Exception as e:
-            return f"Maaf, analisis AI tidak tersedia. Error: {e}"
-        
-    def explain_phrase(
+    def summarize_conversation(
         self,
-        phrase: str,
-        context: str,
-        attachment_style: str,
+        conversation_text: str,
+        key_phrases: List[str],
+        rule_scores: Dict[str, float],
+        deadline: Deadline = None,
     ) -> str:
         """
-        Explain a specific phrase in the context of attachment theory
+        Generate empathetic and insightful summary for chat display
+        Format optimized for chat bubble rendering
         """
+        return self._generate(
+            self.summary_prompt(conversation_text, key_phrases, rule_scores),
+            "summary",
+            lambda: local_summary(key_phrases, rule_scores),
+            deadline
+        )
+
+    def summarize_conversation_stream(
+        self,
+        conversation_text: str,
+        key_phrases: List[str],
+        rule_scores: Dict[str, float],
+        deadline: Deadline = None,
+    ) -> Iterator[str]:
+        """Sama dengan summarize_conversation, tapi streaming per chunk"""
+        return self._generate_stream(
+            self.summary_prompt(conversation_text, key_phrases, rule_scores),
+            "summary",
+            lambda: local_summary(key_phrases, rule_scores),
+            deadline
+        )
 
-        prompt = f"""Sebagai psikolog attachment theory, jelaskan frasa berikut secara mendalam namun mudah dipahami.
+    def explain_prompt(
+        self,
+        phrase: str,
+        context: str,
+        attachment_style: str,
+    ) -> str:
+        return f"""Sebagai psikolog attachment theory, jelaskan frasa berikut secara mendalam namun mudah dipahami.
 
                 FRASA: "{phrase}"
 
                 KONTEKS PERCAKAPAN:
-                {context[:500]}...
+                {context}
 
                 ATTACHMENT STYLE TERDETEKSI: {attachment_style}
 
@@ -101,11 +324,34 @@ class GeminiAnalyzer:
 
                 Format: Gunakan markdown sederhana, maksimal 250 kata, tone empatis."""
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-            )
-            return response.text.strip()
-        except Exception as e:
-            return f"Maaf, penjelasan tidak tersedia. Error: {e}"
\ No newline at end of file
+    def explain_phrase(
+        self,
+        phrase: str,
+        context: str,
+        attachment_style: str,
+        deadline: Deadline = None,
+    ) -> str:
+        """
+        Explain a specific phrase in the context of attachment theory
+        """
+        return self._generate(
+            self.explain_prompt(phrase, context, attachment_style),
+            "explain",
+            lambda: local_explanation(phrase, attachment_style),
+            deadline
+        )
+
+    def explain_phrase_stream(
+        self,
+        phrase: str,
+        context: str,
+        attachment_style: str,
+        deadline: Deadline = None,
+    ) -> Iterator[str]:
+        """Sama dengan explain_phrase, tapi streaming per chunk"""
+        return self._generate_stream(
+            self.explain_prompt(phrase, context, attachment_style),
+            "explain",
+            lambda: local_explanation(phrase, attachment_style),
+            deadline
+        )
@@ -0,0 +1,28 @@
+from flask import Blueprint, Response, jsonify
+from .metrics import metrics
+from .model_registry import model_registry
+
+health = Blueprint('health', __name__)
+
+
+@health.route('/healthz')
+def healthz():
+    """Liveness: proses Flask hidup, model belum tentu siap"""
+    return jsonify({"status": "ok"})
+
+
+@health.route('/readyz')
+def readyz():
+    """Readiness: 200 kalau model sudah ter-load (dan warmup selesai)"""
+    model_registry.retry_failed()
+    ready = model_registry.is_ready()
+    return jsonify({
+        "status": "ready" if ready else "loading",
+        "components": model_registry.status()
+    }), 200 if ready else 503
+
+
+@health.route('/metrics')
+def metrics_endpoint():
+    """Metrics format teks Prometheus (LLM latency, circuit breaker, ...)"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,442 @@
+"""
+Inference server: satu atau lebih proses worker memegang ChatbotService,
+web worker Flask memanggilnya lewat Unix socket (multiprocessing.connection).
+
+    export INFERENCE_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python -m app.inference_server --workers 2
+
+Lalu jalankan Flask dengan INFERENCE_AUTHKEY yang sama dan INFERENCE_SOCKET = path
+yang dicetak server (default $XDG_RUNTIME_DIR/reflectbot-<uid>/inference.sock).
+Request & hasil dikirim sebagai pickle, jadi koneksi wajib diautentikasi dengan
+secret (INFERENCE_AUTHKEY) dan socket hanya bisa dibuka user yang sama (0600
+di direktori 0700).
+
+Tiap worker menjalankan beberapa task sekaligus (--threads), supaya request yang
+datang bersamaan bisa digabung micro-batcher BERT di worker itu. Preprocessing teks
+(normalize, stem, frasa) tetap jalan di proses web, tidak ikut antri di belakang predict.
+Tiap worker punya Pipe sendiri; worker yang mati (EOF) di-restart dan request
+yang sedang dipegangnya langsung gagal.
+"""
+import argparse
+import atexit
+import itertools
+import multiprocessing
+import os
+import stat
+import tempfile
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Client, Listener, wait
+
+# Method ChatbotService yang boleh dipanggil lewat socket
+ALLOWED_METHODS = {
+    "predict",
+    "predict_many",
+    "warmup",
+    "normalize_text",
+    "clean_normalized_text",
+    "preprocess_text",
+    "preprocess_many",
+    "extract_phrases",
+    "encode_text_bert",
+    "encode_texts_bert",
+    "encode_many_bert",
+}
+
+
+# Method yang dijalankan RemoteChatbotService di proses web (TextPreprocessor lokal)
+LOCAL_METHODS = {
+    "normalize_text",
+    "clean_normalized_text",
+    "preprocess_text",
+    "preprocess_many",
+    "extract_phrases",
+}
+
+
+# Panjang minimum INFERENCE_AUTHKEY
+MIN_AUTHKEY_LENGTH = 16
+
+
+class RemoteError(RuntimeError):
+    """Error dari worker inference (exception aslinya tidak bisa di-pickle)"""
+
+
+class InsecureSocketError(RuntimeError):
+    """Direktori socket bisa diakses user lain"""
+
+
+def require_authkey(authkey):
+    """INFERENCE_AUTHKEY sebagai bytes; server & client tidak jalan tanpa secret"""
+    if not authkey or len(authkey) < MIN_AUTHKEY_LENGTH:
+        raise ValueError(
+            f"INFERENCE_AUTHKEY harus diisi secret acak (minimal {MIN_AUTHKEY_LENGTH} karakter), "
+            "mis. python -c \"import secrets; print(secrets.token_hex(32))\""
+        )
+    return authkey.encode("utf-8")
+
+
+def default_socket_path():
+    """Socket di direktori privat milik user ini, di bawah XDG_RUNTIME_DIR kalau ada"""
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"reflectbot-{os.getuid()}", "inference.sock")
+
+
+def check_socket_dir(socket_path, create=False):
+    """Direktori socket harus milik user ini dan tertutup untuk user lain (0700)"""
+    directory = os.path.dirname(os.path.abspath(socket_path))
+    if create:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise InsecureSocketError(
+            f"Direktori socket {directory} harus milik user ini dengan mode 0700"
+        )
+
+
+def private_listener(socket_path, authkey):
+    """Listener Unix socket dengan mode 0600 di direktori privat"""
+    check_socket_dir(socket_path, create=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    # umask dipasang sebelum bind, supaya socket tidak pernah sempat terbuka untuk user lain
+    previous_umask = os.umask(0o177)
+    try:
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(previous_umask)
+    os.chmod(socket_path, 0o600)
+    return listener
+
+
+def _worker_main(service_kwargs, conn, threads=1):
+    from .chatbot_service import ChatbotService
+
+    service = ChatbotService(**service_kwargs)
+    # Satu Pipe per worker: tidak ada lock antar proses yang bisa tertahan kalau worker mati
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    send(("ready", os.getpid(), None))
+    executor = ThreadPoolExecutor(max_workers=max(1, int(threads)), thread_name_prefix="inference-task")
+
+    def run(request_id, method, args, kwargs):
+        try:
+            send((request_id, True, getattr(service, method)(*args, **kwargs)))
+        except Exception as e:
+            traceback.print_exc()
+            send((request_id, False, RemoteError(f"{type(e).__name__}: {e}")))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        executor.submit(run, *task)
+
+    executor.shutdown(wait=True)
+
+
+class InferenceServer:
+    """Terima request dari banyak koneksi, bagikan ke worker process yang paling sedikit bebannya"""
+
+    def __init__(self, socket_path, service_kwargs, authkey, workers=1, threads=8, task_timeout=60):
+        self.socket_path = socket_path
+        self.service_kwargs = service_kwargs
+        self.authkey = require_authkey(authkey)
+        self.n_workers = max(1, int(workers))
+        self.threads = max(1, int(threads))
+        self.task_timeout = task_timeout
+
+        self._ctx = multiprocessing.get_context("spawn")
+        # Per worker: process, ujung Pipe di server, lock kirim, request yang sedang dipegang
+        self.workers = [self._new_worker(i) for i in range(self.n_workers)]
+
+        self._pending = {}
+        self._owners = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._ready = threading.Event()
+        self._ready_count = 0
+
+    def _new_worker(self, index):
+        conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.service_kwargs, child_conn, self.threads),
+            name=f"inference-worker-{index}",
+            daemon=True
+        )
+        return {"process": process, "conn": conn, "child_conn": child_conn,
+                "send_lock": threading.Lock(), "inflight": set()}
+
+    def _start_worker(self, worker):
+        worker["process"].start()
+        # Ujung child hanya dipakai worker; ditutup di sini supaya EOF terbaca saat worker mati
+        worker["child_conn"].close()
+
+    def start(self):
+        for worker in self.workers:
+            self._start_worker(worker)
+        threading.Thread(target=self._dispatch_results, name="inference-results", daemon=True).start()
+
+    def _dispatch_results(self):
+        while True:
+            conns = {worker["conn"]: index for index, worker in enumerate(self.workers)}
+            for conn in wait(list(conns)):
+                index = conns[conn]
+                try:
+                    request_id, ok, payload = conn.recv()
+                except (EOFError, OSError):
+                    self._restart_worker(index)
+                    continue
+
+                if request_id == "ready":
+                    self._ready_count += 1
+                    print(f"Inference worker {ok} ready ({self._ready_count}/{self.n_workers})")
+                    if self._ready_count >= self.n_workers:
+                        self._ready.set()
+                    continue
+
+                with self._lock:
+                    self._owners.pop(request_id, None)
+                    self.workers[index]["inflight"].discard(request_id)
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(payload)
+
+    def _restart_worker(self, index):
+        """Worker mati: gagalkan request yang dipegangnya, lalu jalankan worker baru"""
+        worker = self.workers[index]
+        process = worker["process"]
+        process.join(timeout=1)
+        with self._lock:
+            lost = [self._pending.pop(rid, None) for rid in worker["inflight"]]
+            for rid in worker["inflight"]:
+                self._owners.pop(rid, None)
+            self.workers[index] = self._new_worker(index)
+        worker["conn"].close()
+
+        print(f"Inference worker {process.pid} mati (exit {process.exitcode}), "
+              f"{len(lost)} request digagalkan, restart")
+        for future in lost:
+            if future is not None:
+                future.set_exception(RemoteError(f"Inference worker {process.pid} mati"))
+        self._start_worker(self.workers[index])
+
+    def submit(self, method, args, kwargs):
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            index = min(range(len(self.workers)), key=lambda i: len(self.workers[i]["inflight"]))
+            worker = self.workers[index]
+            worker["inflight"].add(request_id)
+            self._owners[request_id] = index
+            self._pending[request_id] = future
+        try:
+            with worker["send_lock"]:
+                worker["conn"].send((request_id, method, args, kwargs))
+        except (OSError, ValueError):
+            # Worker baru saja mati; _dispatch_results yang merestart
+            with self._lock:
+                worker["inflight"].discard(request_id)
+                self._owners.pop(request_id, None)
+                self._pending.pop(request_id, None)
+            future.set_exception(RemoteError("Inference worker tidak tersedia"))
+        return request_id, future
+
+    def _forget(self, request_id):
+        with self._lock:
+            self._pending.pop(request_id, None)
+            index = self._owners.pop(request_id, None)
+            if index is not None:
+                self.workers[index]["inflight"].discard(request_id)
+
+    def _handle_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                if method not in ALLOWED_METHODS:
+                    conn.send((False, RemoteError(f"Method tidak diizinkan: {method}")))
+                    continue
+
+                request_id, future = self.submit(method, args, kwargs)
+                try:
+                    response = (True, future.result(timeout=self.task_timeout))
+                except FutureTimeoutError:
+                    # Worker hang: jangan tahan thread koneksi ini selamanya
+                    self._forget(request_id)
+                    response = (False, TimeoutError(f"Inference task {method} melewati {self.task_timeout}s"))
+                except Exception as e:
+                    response = (False, e)
+
+                try:
+                    conn.send(response)
+                except OSError:
+                    # Client sudah menutup koneksi (mis. timeout di sisi web)
+                    return
+
+    def serve_forever(self):
+        # Cek direktori socket sebelum worker (dan model) di-load
+        check_socket_dir(self.socket_path, create=True)
+
+        self.start()
+        self._ready.wait()
+
+        with private_listener(self.socket_path, self.authkey) as listener:
+            print(f"Inference server listening on {self.socket_path}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception:
+                    traceback.print_exc()
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+
+class RemoteChatbotService:
+    """
+    Proxy ChatbotService di sisi web worker. Satu koneksi per thread;
+    kalau server tidak bisa dihubungi, pakai ChatbotService in-process (fallback).
+    Preprocessing teks (LOCAL_METHODS) dijalankan di proses ini, tanpa RPC.
+    """
+
+    def __init__(self, socket_path, authkey, timeout=60, fallback=None, stem_memo_path=None):
+        self.socket_path = socket_path
+        self.authkey = require_authkey(authkey)
+        self.timeout = timeout
+        self.fallback = fallback
+        self.stem_memo_path = stem_memo_path
+
+        self._local = threading.local()
+        self._fallback_service = None
+        self._fallback_lock = threading.Lock()
+        self._preprocessor = None
+        self._preprocessor_lock = threading.Lock()
+
+    @property
+    def preprocessor(self):
+        with self._preprocessor_lock:
+            if self._preprocessor is None:
+                from .text_preprocessor import TextPreprocessor
+
+                self._preprocessor = TextPreprocessor(memo_path=self.stem_memo_path)
+                if self.stem_memo_path:
+                    atexit.register(self._preprocessor.save_memo)
+            return self._preprocessor
+
+    def normalize_text(self, text):
+        return self.preprocessor.normalize_text(text)
+
+    def clean_normalized_text(self, text):
+        return self.preprocessor.clean_normalized_text(text)
+
+    def preprocess_text(self, text):
+        return self.preprocessor.preprocess(text)
+
+    def preprocess_many(self, texts):
+        return self.preprocessor.preprocess_many(texts)
+
+    def extract_phrases(self, text):
+        from .text_preprocessor import extract_phrases
+
+        return extract_phrases(text)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Socket di direktori yang bisa ditulis user lain bisa saja server palsu
+            check_socket_dir(self.socket_path)
+            conn = Client(self.socket_path, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _local_service(self):
+        with self._fallback_lock:
+            if self._fallback_service is None:
+                self._fallback_service = self.fallback()
+            return self._fallback_service
+
+    def call(self, method, *args, **kwargs):
+        try:
+            conn = self._connection()
+            conn.send((method, args, kwargs))
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Inference server tidak merespons dalam {self.timeout}s")
+            ok, payload = conn.recv()
+        except TimeoutError:
+            self._drop_connection()
+            raise
+        except (OSError, EOFError):
+            # Server mati / belum jalan -> ChatbotService in-process
+            self._drop_connection()
+            if self.fallback is None:
+                raise
+            return getattr(self._local_service(), method)(*args, **kwargs)
+
+        if not ok:
+            raise payload
+        return payload
+
+    def __getattr__(self, name):
+        if name not in ALLOWED_METHODS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+
+def main():
+    from .config import model_config
+    from .model_registry import chatbot_service_kwargs
+
+    config = model_config()
+
+    parser = argparse.ArgumentParser(description="ReflectBot inference server")
+    parser.add_argument("--socket", default=config["INFERENCE_SOCKET"] or default_socket_path())
+    parser.add_argument("--workers", type=int, default=config["INFERENCE_WORKERS"])
+    parser.add_argument("--threads", type=int, default=config["INFERENCE_WORKER_THREADS"],
+                        help="task bersamaan per worker (sebaiknya >= BERT_MAX_BATCH_SIZE)")
+    args = parser.parse_args()
+
+    try:
+        require_authkey(config["INFERENCE_AUTHKEY"])
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = InferenceServer(
+        args.socket,
+        chatbot_service_kwargs(config),
+        config["INFERENCE_AUTHKEY"],
+        workers=args.workers,
+        threads=args.threads,
+        task_timeout=config["INFERENCE_TIMEOUT"]
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,25 @@
+import bisect
+import json
+import os
 import re
 import random
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Dict
-from datetime import datetime
+from typing import List
+
+# Parser regex internal CPython, hanya untuk index awalan di CompiledMatcher.
+# Kalau tidak ada / berubah, matcher kembali menjalankan semua pattern.
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    try:  # Python < 3.11
+        import sre_parse
+        import sre_constants
+    except ImportError:
+        sre_parse = sre_constants = None
+
+WORD_RE = re.compile(r"\w\w+")
+WORD_KEY_RE = re.compile(r"\w\w")
 
 
 @dataclass
@@ -15,186 +32,192 @@ class Intent:
     required_turns: int = 1
 
 
+def _literal_prefixes(items, need=2):
+    """
+    Semua kemungkinan awalan literal (panjang `need`) dari pattern yang sudah di-parse.
+    Awalan yang tidak bisa ditentukan (charset, wildcard, dst) jadi string lebih pendek.
+    """
+    if need == 0 or not items:
+        return {""}
+    
+    op, av = items[0]
+    rest = items[1:]
+    if op is sre_constants.LITERAL:
+        return {chr(av) + p for p in _literal_prefixes(rest, need - 1)}
+    if op is sre_constants.SUBPATTERN:
+        return _literal_prefixes(list(av[-1]) + rest, need)
+    if op is sre_constants.BRANCH:
+        prefixes = set()
+        for branch in av[1]:
+            prefixes |= _literal_prefixes(list(branch) + rest, need)
+        return prefixes
+    return {""}
+
+
+def _parse_word_start_keys(pattern: str):
+    try:
+        items = list(sre_parse.parse(pattern))
+    except re.error:
+        return None
+    
+    anchors = {sre_constants.AT_BOUNDARY, sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING}
+    anchored = False
+    while items and items[0][0] is sre_constants.AT:
+        if items[0][1] in anchors:
+            anchored = True
+        items = items[1:]
+    if not anchored:
+        return None
+    
+    keys = _literal_prefixes(items)
+    if all(len(key) == 2 and WORD_KEY_RE.fullmatch(key) for key in keys):
+        return keys
+    return None
+
+
+def _prefix_index_supported():
+    """Cek parser internal masih berperilaku seperti yang diharapkan _parse_word_start_keys"""
+    if sre_parse is None or sre_constants is None:
+        return False
+    try:
+        return (
+            _parse_word_start_keys(r"\b(takut|khawatir)\s+(di|ke)") == {"ta", "kh"}
+            and _parse_word_start_keys(r"^(pagi|siang)") == {"pa", "si"}
+            and _parse_word_start_keys(r"\w+\s+saya") is None
+        )
+    except Exception:
+        return False
+
+
+PREFIX_INDEX = _prefix_index_supported()
+
+
+def word_start_keys(pattern: str):
+    """
+    Key 2 huruf yang pasti ada di awal sebuah kata kalau pattern match, mis.
+    r"\b(takut|khawatir)\s+..." -> {"ta", "kh"}. None kalau tidak bisa ditentukan
+    (atau parser internal tidak tersedia), pattern itu selalu dijalankan.
+    """
+    if not PREFIX_INDEX:
+        return None
+    try:
+        return _parse_word_start_keys(pattern)
+    except Exception:
+        return None
+
+
+class CompiledMatcher:
+    """
+    Index pattern intent yang dikompilasi sekali. Tiap pattern didaftarkan di bawah
+    awalan 2 huruf kata yang wajib muncul; saat classify text di-scan sekali untuk
+    mengambil awalan kata, dan hanya pattern kandidat yang dijalankan (urut priority).
+    """
+    
+    def __init__(self, intents: List[Intent]):
+        self.patterns = []
+        self.by_key = {}
+        self.always = []
+        
+        for rank, intent in enumerate(intents):
+            for pattern in intent.patterns:
+                index = len(self.patterns)
+                self.patterns.append((re.compile(pattern), intent.name))
+                
+                keys = word_start_keys(pattern)
+                if keys is None:
+                    self.always.append(index)
+                    continue
+                for key in keys:
+                    self.by_key.setdefault(key, []).append(index)
+    
+    def candidates(self, text: str):
+        found = set(self.always)
+        by_key = self.by_key
+        for word in WORD_RE.findall(text):
+            indices = by_key.get(word[:2])
+            if indices:
+                found.update(indices)
+        # Index pattern sudah urut priority intent
+        return sorted(found)
+    
+    def match(self, text: str):
+        """Return nama intent dengan priority tertinggi yang match, atau None"""
+        for index in self.candidates(text):
+            regex, name = self.patterns[index]
+            if regex.search(text):
+                return name
+        return None
+
+
 class IntentClassifier:
     """Multi-intent classifier dengan priority handling"""
     
-    def __init__(self):
-        self.intents = self._initialize_intents()
+    DEFAULT_INTENTS_PATH = os.path.join(os.path.dirname(__file__), "data", "intents.json")
+    
+    def __init__(self, intents_path: str = None):
+        self.intents_path = intents_path or self.DEFAULT_INTENTS_PATH
+        self.intents, self.priority = self._initialize_intents()
+        self._matchers = {}
+        self._turn_levels = sorted({
+            self.intents[name].required_turns for name in self.priority
+        })
     
-    def _initialize_intents(self) -> Dict[str, Intent]:
-        """Define all conversation intents - DIPERBANYAK"""
+    def _initialize_intents(self):
+        """Load intents & urutan priority dari file data (app/data/intents.json)"""
+        with open(self.intents_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
         
-        return {
-            "greeting": Intent(
-                name="greeting",
-                patterns=[
-                    r"\b(hai|halo|hi|hey|selamat|assalamualaikum)\b",
-                    r"^(pagi|siang|sore|malam)",
-                ],
-                responses=[
-                    "Hai! 👋 Saya ReflectBot, teman refleksi Anda.",
-                    "Halo! Senang bertemu dengan Anda.",
-                    "Selamat datang! Saya di sini untuk mendengarkan Anda.",
-                ],
-                follow_ups=[
-                    "Bagaimana perasaan Anda hari ini?",
-                    "Ada yang ingin Anda ceritakan?",
-                    "Apa yang sedang ada di pikiran Anda sekarang?",
-                ],
-                required_turns=0
-            ),
-            
-            "sharing_emotion": Intent(
-                name="sharing_emotion",
-                patterns=[
-                    r"\b(merasa|rasa|perasaan)\s+\w+",
-                    r"\b(sedih|senang|marah|cemas|takut|khawatir|bahagia|kecewa)\b",
-                    r"\b(stress|depresi|down|galau)\b",
-                ],
-                responses=[
-                    "Terima kasih sudah terbuka dengan saya. Perasaan Anda valid.",
-                    "Saya dengar Anda. Tidak apa-apa merasakan ini.",
-                    "Wajar untuk merasa seperti itu. Anda tidak sendirian.",
-                ],
-                follow_ups=[
-                    "Bisa ceritakan lebih detail apa yang membuat Anda merasa seperti itu?",
-                    "Kapan pertama kali Anda merasa seperti ini?",
-                    "Apa yang biasanya membuat perasaan ini muncul?",
-                ],
-                required_turns=1
-            ),
-            
-      
-            
-            "attachment_anxious": Intent(
-                name="attachment_anxious",
-                patterns=[
-                    r"\b(takut|khawatir)\s+(ditinggal|dihiraukan|diabaikan)",
-                    r"\b(insecure|tidak percaya diri)\b",
-                    r"\bkenapa\s+(dia|kamu)\s+(tidak|nggak)\b",
-                    r"\b(butuh|perlu)\s+perhatian\b",
-                ],
-                responses=[
-                    "Kekhawatiran akan ditinggalkan adalah perasaan yang sangat manusiawi.",
-                    "Saya mendengar kebutuhan Anda untuk merasa aman dalam hubungan.",
-                ],
-                follow_ups=[
-                    "Apakah Anda sering merasa cemas saat pasangan tidak responsif?",
-                    "Bagaimana Anda biasanya mengekspresikan kebutuhan emosional Anda?",
-                ],
-                required_turns=3
-            ),
-            
-            "attachment_avoidant": Intent(
-                name="attachment_avoidant",
-                patterns=[
-                    r"\b(butuh|perlu)\s+space\b",
-                    r"\b(terlalu|over)\s+(clingy|lengket)",
-                    r"\b(mandiri|independen)\b.*\b(tidak butuh|nggak perlu)",
-                    r"\bsulit\s+terbuka\b",
-                ],
-                responses=[
-                    "Kemandirian adalah hal yang baik, tapi koneksi juga penting.",
-                    "Menjaga jarak emosional kadang terasa lebih aman.",
-                ],
-                follow_ups=[
-                    "Apakah Anda merasa tidak nyaman saat seseorang terlalu dekat secara emosional?",
-                    "Bagaimana Anda biasanya merespons saat seseorang menunjukkan kebutuhan emosional?",
-                ],
-                required_turns=3
-            ),
-            
-            "self_reflection": Intent(
-                name="self_reflection",
-                patterns=[
-                    r"\bkenapa\s+saya\s+(selalu|sering)\b",
-                    r"\b(pola|pattern)\s+yang sama\b",
-                    r"\b(salah|masalah)\s+saya\b",
-                ],
-                responses=[
-                    "Kesadaran diri adalah langkah pertama menuju perubahan.",
-                    "Anda mulai melihat pola - itu sangat penting.",
-                ],
-                follow_ups=[
-                    "Apakah Anda melihat pola ini berulang di berbagai hubungan?",
-                    "Menurut Anda, apa yang membuat pola ini terus terjadi?",
-                ],
-                required_turns=4
-            ),
-            
-            "closure": Intent(
-                name="closure",
-                patterns=[
-                    r"\b(terima kasih|thanks|makasih)\b",
-                    r"\b(cukup|sudah|oke)\b.*\b(bantu|jelas)",
-                    r"\b(bye|selesai|cukup)\b",
-                ],
-                responses=[
-                    "Terima kasih sudah berbagi dengan saya hari ini. 🙏",
-                    "Saya senang bisa menemani refleksi Anda.",
-                ],
-                follow_ups=[
-                    "Jika Anda ingin menganalisis percakapan kita, tekan tombol 'Analisis Percakapan'.",
-                    "Sampai jumpa! Saya selalu di sini jika Anda butuh berbicara lagi.",
-                ],
-                required_turns=6
-            ),
-            
-            "general": Intent(
-                name="general",
-                patterns=[],
-                responses=[
-                    "Menarik. Bisa ceritakan lebih banyak?",
-                    "Saya mendengarkan. Silakan lanjutkan.",
-                    "Apa yang Anda rasakan tentang itu?",
-                ],
-                follow_ups=[
-                    "Bagaimana perasaan Anda saat itu?",
-                    "Apa yang membuat situasi ini penting bagi Anda?",
-                ],
-                required_turns=1
-            ),
-        }
+        intents = {item["name"]: Intent(**item) for item in data["intents"]}
+        return intents, data["priority"]
+    
+    def _matcher_for(self, turn_count: int) -> CompiledMatcher:
+        """Matcher untuk intent yang lolos gating required_turns, di-cache per level"""
+        level = bisect.bisect_right(self._turn_levels, turn_count)
+        matcher = self._matchers.get(level)
+        if matcher is None:
+            eligible = [
+                self.intents[name] for name in self.priority
+                if self.intents[name].required_turns <= turn_count
+            ]
+            matcher = self._matchers[level] = CompiledMatcher(eligible)
+        return matcher
     
     def classify(self, text: str, turn_count: int) -> str:
         """Classify intent with priority"""
-        text_lower = text.lower()
-        
-        # Priority urutan
-        priority = [
-            "greeting",
-            "closure",
-            "attachment_anxious",
-            "attachment_avoidant",
-            "self_reflection",
-            "sharing_emotion",
-            "general"
-        ]
-        
-        for intent_name in priority:
-            intent = self.intents[intent_name]
-            
-            # Check required turns
-            if turn_count < intent.required_turns:
-                continue
-            
-            # Match patterns
-            for pattern in intent.patterns:
-                if re.search(pattern, text_lower):
-                    return intent_name
-        
-        return "general"
+        intent_name = self._matcher_for(turn_count).match(text.lower())
+        return intent_name or "general"
 
 
 class ConversationEngine:
     """Main conversation management"""
     
-    def __init__(self):
-        self.intent_classifier = IntentClassifier()
-        self.conversation_history = []
+    def __init__(self, intent_classifier: IntentClassifier = None, history_size: int = 20):
+        self.intent_classifier = intent_classifier or IntentClassifier()
+        # History ringkas (turn + intent), dibatasi supaya memory tidak terus tumbuh
+        self.conversation_history = deque(maxlen=history_size)
         self.turn_count = 0
         self.user_name = None
     
+    @classmethod
+    def from_messages(
+        cls,
+        turn_count: int,
+        recent_messages: List[str],
+        intent_classifier: IntentClassifier = None,
+        history_size: int = 20,
+    ) -> "ConversationEngine":
+        """Bangun ulang state dari pesan user yang tersimpan (turn terakhir di akhir list)"""
+        engine = cls(intent_classifier, history_size)
+        engine.turn_count = turn_count
+        
+        first_turn = turn_count - len(recent_messages) + 1
+        for turn, message in enumerate(recent_messages, start=first_turn):
+            engine.conversation_history.append({
+                "turn": turn,
+                "intent": engine.intent_classifier.classify(message, turn)
+            })
+        return engine
+    
     def start_conversation(self) -> str:
         """Start the conversation"""
         greeting = random.choice(
@@ -219,9 +242,7 @@ class ConversationEngine:
         # Save to history
         self.conversation_history.append({
             "turn": self.turn_count,
-            "user_message": user_message,
-            "intent": intent_name,
-            "timestamp": datetime.now()
+            "intent": intent_name
         })
         
         # Generate response
@@ -232,7 +253,4 @@ class ConversationEngine:
             follow_up = random.choice(intent.follow_ups)
             response = f"{response}\n\n{follow_up}"
         
-        # Save bot response
-        self.conversation_history[-1]["bot_response"] = response
-        
-        return response
\ No newline at end of file
+        return response
@@ -0,0 +1,244 @@
+"""
+Backend LLM di balik GeminiAnalyzer. Semua backend punya interface yang sama:
+
+    backend.generate(prompt, timeout) -> str
+    backend.generate_stream(prompt, timeout) -> Iterator[str]
+    backend.is_retryable(exception) -> bool
+
+Dipilih lewat LLM_BACKEND:
+    gemini  Google Gemini (google-genai), butuh GEMINI_API_KEY
+    stub    in-process, teks deterministik, latency & error bisa diatur (tanpa network)
+    http    REST client (urllib) ke server lokal, mis. scripts/fake_gemini_server.py
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKENDS = ("gemini", "stub", "http")
+
+WORDS = (
+    "kamu merasa hubungan kelekatan butuh ruang aman cerita perasaan pasangan "
+    "kepercayaan cemas menghindar dukungan komunikasi terbuka refleksi diri"
+).split()
+
+
+class BackendError(RuntimeError):
+    """Error dari backend stub/http, membawa status code ala HTTP"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def is_retryable_code(code):
+    return code in (408, 429) or (code or 0) >= 500
+
+
+def deterministic_text(prompt, n_words=120):
+    """Teks palsu yang sama untuk prompt yang sama (stub & fake server)"""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return "## Ringkasan\n" + " ".join(words).capitalize() + "."
+
+
+def split_chunks(text, n_chunks):
+    words = text.split(" ")
+    size = max(1, len(words) // max(1, n_chunks))
+    return [
+        " ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+        for i in range(0, len(words), size)
+    ]
+
+
+class LatencyModel:
+    """Distribusi latency (fixed, uniform, exponential) dan error rate untuk backend palsu"""
+
+    DISTRIBUTIONS = ("fixed", "uniform", "exponential")
+
+    def __init__(self, mean_ms=200, distribution="fixed", error_rate=0.0, error_code=503, seed=None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Distribusi latency tidak dikenal: {distribution}")
+        self.mean = mean_ms / 1000
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """Return (latency detik, error?)"""
+        with self._lock:
+            if self.distribution == "uniform":
+                latency = self._rng.uniform(0, 2 * self.mean)
+            elif self.distribution == "exponential":
+                latency = self._rng.expovariate(1 / self.mean) if self.mean > 0 else 0.0
+            else:
+                latency = self.mean
+            return latency, self._rng.random() < self.error_rate
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, api_key=None, model="gemini-2.0-flash-exp", base_url=None):
+        from google import genai
+        from google.genai import types
+
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY tidak ditemukan")
+
+        # base_url: mis. scripts/fake_gemini_server.py untuk testing
+        http_options = types.HttpOptions(base_url=base_url) if base_url else None
+        self.client = genai.Client(api_key=self.api_key, http_options=http_options)
+        self.model = model
+        self._types = types
+
+    def _request_config(self, timeout):
+        # HttpOptions.timeout dalam milidetik
+        return self._types.GenerateContentConfig(
+            http_options=self._types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+        )
+
+    def generate(self, prompt, timeout):
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._request_config(timeout),
+        )
+        return response.text.strip()
+
+    def generate_stream(self, prompt, timeout):
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self._request_config(timeout),
+        ):
+            if chunk.text:
+                yield chunk.text
+
+    def is_retryable(self, e):
+        """Timeout, error jaringan, 429 & 5xx boleh diulang; 4xx lain tidak"""
+        from google.genai import errors
+
+        if isinstance(e, errors.APIError):
+            return is_retryable_code(e.code)
+        try:
+            import httpx
+
+            if isinstance(e, (httpx.TimeoutException, httpx.TransportError)):
+                return True
+        except ImportError:
+            pass
+        return isinstance(e, (TimeoutError, ConnectionError))
+
+
+class StubBackend:
+    """LLM palsu in-process: teks deterministik per prompt, latency & error dari LatencyModel"""
+
+    name = "stub"
+
+    def __init__(self, latency=None, chunks=8):
+        self.latency = latency or LatencyModel(mean_ms=0)
+        self.chunks = chunks
+        self.model = "stub"
+
+    def _wait(self, timeout):
+        latency, error = self.latency.sample()
+        if latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub LLM timeout setelah {timeout:.2f}s")
+        time.sleep(latency)
+        if error:
+            raise BackendError("Stub LLM error", code=self.latency.error_code)
+
+    def generate(self, prompt, timeout):
+        self._wait(timeout)
+        return deterministic_text(prompt)
+
+    def generate_stream(self, prompt, timeout):
+        self._wait(timeout)
+        yield from split_chunks(deterministic_text(prompt), self.chunks)
+
+    def is_retryable(self, e):
+        if isinstance(e, BackendError):
+            return is_retryable_code(e.code)
+        return isinstance(e, (TimeoutError, ConnectionError))
+
+
+class HttpBackend:
+    """
+    REST client ringan (urllib) dengan format API Gemini, untuk server lokal
+    seperti scripts/fake_gemini_server.py. Tidak butuh google-genai.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url="http://127.0.0.1:8089", model="gemini-2.0-flash-exp", api_version="v1beta"):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_version = api_version
+
+    def _request(self, method, prompt, timeout, query=""):
+        body = json.dumps({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}).encode("utf-8")
+        request = urllib.request.Request(
+            f"{self.base_url}/{self.api_version}/models/{self.model}:{method}{query}",
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            raise BackendError(f"HTTP {e.code}: {e.read()[:200]!r}", code=e.code)
+
+    @staticmethod
+    def _text(payload):
+        return "".join(
+            part.get("text", "")
+            for candidate in payload.get("candidates", [])
+            for part in candidate.get("content", {}).get("parts", [])
+        )
+
+    def generate(self, prompt, timeout):
+        with self._request("generateContent", prompt, timeout) as response:
+            return self._text(json.load(response)).strip()
+
+    def generate_stream(self, prompt, timeout):
+        with self._request("streamGenerateContent", prompt, timeout, query="?alt=sse") as response:
+            for line in response:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                text = self._text(json.loads(line[5:]))
+                if text:
+                    yield text
+
+    def is_retryable(self, e):
+        if isinstance(e, BackendError):
+            return is_retryable_code(e.code)
+        return isinstance(e, (TimeoutError, ConnectionError, urllib.error.URLError))
+
+
+def build_backend(config):
+    """Backend LLM dari app config (LLM_BACKEND, GEMINI_*, LLM_STUB_*, LLM_HTTP_URL)"""
+    name = config.get("LLM_BACKEND", "gemini")
+    model = config.get("GEMINI_MODEL", "gemini-2.0-flash-exp")
+
+    if name == "gemini":
+        return GeminiBackend(model=model, base_url=config.get("GEMINI_BASE_URL"))
+    if name == "stub":
+        return StubBackend(LatencyModel(
+            mean_ms=config.get("LLM_STUB_LATENCY_MS", 200),
+            distribution=config.get("LLM_STUB_LATENCY_DIST", "fixed"),
+            error_rate=config.get("LLM_STUB_ERROR_RATE", 0.0),
+            seed=config.get("LLM_STUB_SEED")
+        ))
+    if name == "http":
+        return HttpBackend(config.get("LLM_HTTP_URL", "http://127.0.0.1:8089"), model=model)
+    raise ValueError(f"LLM backend tidak dikenal: {name} (pilihan: {', '.join(BACKENDS)})")
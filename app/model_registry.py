@@ -0,0 +1,220 @@
+import threading
+import time
+import traceback
+
+
+class ModelRegistry:
+    """
+    Load ChatbotService & GeminiAnalyzer secara lazy atau di background thread,
+    supaya Flask sudah bisa melayani request (login, dsb) sebelum model siap.
+    Komponen yang gagal di-load dicoba lagi setelah backoff (MODEL_RETRY_BACKOFF,
+    dua kali lipat tiap gagal berturut-turut, maksimal MODEL_RETRY_MAX_BACKOFF).
+    """
+
+    COMPONENTS = ("chatbot_service", "gemini_analyzer", "warmup")
+
+    def __init__(self):
+        self.config = {}
+        self._instances = {}
+        self._errors = {}
+        # name -> (jumlah gagal berturut-turut, waktu gagal terakhir)
+        self._failures = {}
+        self._retry_thread = None
+        self._locks = {name: threading.Lock() for name in self.COMPONENTS}
+        self._status = {
+            name: {"state": "pending", "seconds": None} for name in self.COMPONENTS
+        }
+        self._thread = None
+        self._model_version = None
+
+    def init_app(self, app):
+        self.config = app.config
+        app.extensions["model_registry"] = self
+
+        mode = app.config.get("MODEL_LOADING", "background")
+        if mode == "eager":
+            self.load_all()
+        elif mode == "background":
+            self._thread = threading.Thread(
+                target=self.load_all, name="model-loader", daemon=True
+            )
+            self._thread.start()
+
+    def load_all(self):
+        for name in ("chatbot_service", "gemini_analyzer"):
+            try:
+                self._get(name)
+            except Exception:
+                pass
+
+        if self.config.get("MODEL_WARMUP", True):
+            try:
+                self.warmup()
+            except Exception:
+                pass
+
+    @property
+    def chatbot_service(self):
+        return self._get("chatbot_service")
+
+    @property
+    def gemini_analyzer(self):
+        return self._get("gemini_analyzer")
+
+    def _get(self, name):
+        if name in self._instances:
+            return self._instances[name]
+
+        # Request lain yang datang saat loading ikut menunggu di lock yang sama
+        with self._locks[name]:
+            if name in self._instances:
+                return self._instances[name]
+            if name in self._errors:
+                if self.retry_in(name) > 0:
+                    raise self._errors[name]
+                del self._errors[name]
+
+            self._run(name, getattr(self, f"_build_{name}"))
+            if name in self._errors:
+                raise self._errors[name]
+            return self._instances[name]
+
+    def _run(self, name, build):
+        self._status[name]["state"] = "loading"
+        start = time.perf_counter()
+        try:
+            result = build()
+            if result is not None:
+                self._instances[name] = result
+            self._status[name]["state"] = "ready"
+            self._status[name].pop("error", None)
+            self._status[name].pop("failures", None)
+            self._failures.pop(name, None)
+        except Exception as e:
+            traceback.print_exc()
+            self._errors[name] = e
+            count = self._failures.get(name, (0, 0))[0] + 1
+            self._failures[name] = (count, time.monotonic())
+            self._status[name]["state"] = "failed"
+            self._status[name]["error"] = str(e)
+            self._status[name]["failures"] = count
+        self._status[name]["seconds"] = round(time.perf_counter() - start, 2)
+
+    def retry_in(self, name):
+        """Detik sampai komponen yang gagal boleh di-load ulang (0 = sekarang)"""
+        if name not in self._failures:
+            return 0
+        count, failed_at = self._failures[name]
+        delay = min(
+            self.config.get("MODEL_RETRY_BACKOFF", 5) * 2 ** (count - 1),
+            self.config.get("MODEL_RETRY_MAX_BACKOFF", 300)
+        )
+        return max(0.0, failed_at + delay - time.monotonic())
+
+    def retry_failed(self):
+        """Load ulang di background komponen gagal yang backoff-nya sudah lewat (dipanggil /readyz)"""
+        due = [name for name in ("chatbot_service", "gemini_analyzer")
+               if name in self._errors and self.retry_in(name) <= 0]
+        if not due or (self._retry_thread is not None and self._retry_thread.is_alive()):
+            return
+        self._retry_thread = threading.Thread(target=self.load_all, name="model-loader-retry", daemon=True)
+        self._retry_thread.start()
+
+    def _build_chatbot_service(self):
+        if self.config.get("INFERENCE_SOCKET"):
+            from .inference_server import RemoteChatbotService
+
+            return RemoteChatbotService(
+                self.config["INFERENCE_SOCKET"],
+                authkey=self.config.get("INFERENCE_AUTHKEY"),
+                timeout=self.config.get("INFERENCE_TIMEOUT", 60),
+                stem_memo_path=self.config.get("STEM_MEMO_PATH"),
+                fallback=self._build_local_chatbot_service if self.config.get("INFERENCE_FALLBACK", True) else None
+            )
+        return self._build_local_chatbot_service()
+
+    def _build_local_chatbot_service(self):
+        from .chatbot_service import ChatbotService
+
+        return ChatbotService(**chatbot_service_kwargs(self.config, model_version=self.model_version))
+
+    def _build_gemini_analyzer(self):
+        from .genai_analyzer import GeminiAnalyzer
+        from .llm_backends import build_backend
+
+        return GeminiAnalyzer(
+            backend=build_backend(self.config),
+            timeout=self.config.get("GEMINI_TIMEOUT", 20),
+            retries=self.config.get("GEMINI_RETRIES", 2),
+            breaker_threshold=self.config.get("GEMINI_BREAKER_THRESHOLD", 5),
+            breaker_reset=self.config.get("GEMINI_BREAKER_RESET", 30)
+        )
+
+    def warmup(self):
+        """Jalankan input dummy lewat tokenizer, BERT & classifier"""
+        service = self.chatbot_service
+        with self._locks["warmup"]:
+            if self._status["warmup"]["state"] != "ready":
+                self._run("warmup", service.warmup)
+
+    @property
+    def model_version(self):
+        """Versi model untuk SessionAnalysis.model_version (hash artefak kalau MODEL_VERSION kosong)"""
+        if self._model_version is None:
+            self._model_version = configured_model_version(self.config)
+        return self._model_version
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def is_ready(self):
+        if self._status["chatbot_service"]["state"] != "ready":
+            return False
+        # Mode lazy tidak menjalankan warmup, cukup model sudah ter-load
+        if self.config.get("MODEL_WARMUP", True) and self.config.get("MODEL_LOADING") != "lazy":
+            return self._status["warmup"]["state"] in ("ready", "failed")
+        return True
+
+    def status(self):
+        status = {name: dict(info) for name, info in self._status.items()}
+        for name in self._errors:
+            status[name]["retry_in"] = round(self.retry_in(name), 1)
+        return status
+
+
+def configured_model_version(config):
+    """MODEL_VERSION, atau hash artefak di MODEL_PATH + setting encoder kalau kosong"""
+    from .fingerprint import artifact_version, encoder_settings
+
+    return config.get("MODEL_VERSION") or artifact_version(
+        config.get("MODEL_PATH", "app/model/"),
+        encoder_settings(
+            encoder_backend=config.get("BERT_BACKEND"),
+            encode_mode=config.get("BERT_ENCODE_MODE", "truncate"),
+            chunk_pooling=config.get("BERT_CHUNK_POOLING", "mean"),
+            max_windows=config.get("BERT_MAX_WINDOWS", 8),
+        )
+    )
+
+
+def chatbot_service_kwargs(config, model_version=None):
+    """Argumen ChatbotService dari app config / model_config()"""
+    return dict(
+        model_path=config.get("MODEL_PATH", "app/model/"),
+        batching=config.get("BERT_BATCHING", True),
+        batch_window_ms=config.get("BERT_BATCH_WINDOW_MS", 10),
+        max_batch_size=config.get("BERT_MAX_BATCH_SIZE", 8),
+        embedding_cache_size=config.get("BERT_CACHE_SIZE", 1024),
+        embedding_cache_path=config.get("BERT_CACHE_PATH"),
+        encode_mode=config.get("BERT_ENCODE_MODE", "truncate"),
+        chunk_pooling=config.get("BERT_CHUNK_POOLING", "mean"),
+        max_windows=config.get("BERT_MAX_WINDOWS", 8),
+        stem_memo_path=config.get("STEM_MEMO_PATH"),
+        encoder_backend=config.get("BERT_BACKEND"),
+        onnx_path=config.get("BERT_ONNX_PATH"),
+        # Key cache embedding, sama dengan SessionAnalysis.model_version
+        model_version=model_version or configured_model_version(config)
+    )
+
+
+model_registry = ModelRegistry()
@@ -11,12 +11,29 @@ class ChatSessions(db.Model):
     chat_messages = db.relationship('ChatMessages')
     analysis = db.relationship('SessionAnalysis', backref='session', uselist=False, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Dashboard: session milik user, urut started_at
+        db.Index('ix_chat_sessions_user_started', 'user_id', 'started_at'),
+    )
+
 class ChatMessages(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('chat_sessions.id'))
     sender  = db.Column(db.String(150))
     content = db.Column(db.String(10000))
     created_at = db.Column(db.DateTime(timezone=True), default=func.now())
+    
+    # Hasil preprocessing pesan user, diisi saat pesan disimpan
+    normalized_content = db.Column(db.Text)  
+    clean_content = db.Column(db.Text)  
+    phrases = db.Column(db.Text)  
+
+    __table_args__ = (
+        # Pesan user per session urut waktu (analisis, explain-phrase, rebuild ConversationEngine)
+        db.Index('ix_chat_messages_session_sender_created', 'session_id', 'sender', 'created_at'),
+        # Cursor /read (before_id / after_id)
+        db.Index('ix_chat_messages_session_id', 'session_id', 'id'),
+    )
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -34,15 +51,42 @@ class SessionAnalysis(db.Model):
     # Main Prediction
     attachment_style = db.Column(db.String(50))  # secure, anxious, avoidant
     confidence = db.Column(db.Float)
-    probabilities = db.Column(db.Text)  
-    
-    phrase_analysis = db.Column(db.Text)  
-    emotion_analysis = db.Column(db.Text) 
-    bert_features = db.Column(db.Text)  
-    text_statistics = db.Column(db.Text) 
-    timeline_data = db.Column(db.Text)  
-    ai_insights = db.Column(db.Text)  
-    rule_scores = db.Column(db.Text) 
+
+    # Hasil lengkap (probabilities, frasa, emosi, fitur BERT, statistik, timeline,
+    # rule scores, ai_insights) sebagai satu blob gzip, lihat analysis_blob
+    result = db.Column(db.LargeBinary(length=2**24))
+    result_format = db.Column(db.SmallInteger)
+
+    # Hash berantai pesan user saat dianalisis (lihat fingerprint.messages_fingerprint)
+    # + id pesan user terakhir yang ikut dianalisis, untuk deteksi pesan yang hanya ditambahkan
+    messages_fingerprint = db.Column(db.String(64))
+    # messages_fingerprint saat attachment_style terakhir diprediksi; tidak ikut maju
+    # di update incremental (prediksi lama dipertahankan), lihat resolve_attachment_style
+    prediction_fingerprint = db.Column(db.String(64))
+    last_message_id = db.Column(db.Integer)
+    # Versi model/artefak yang menghasilkan analisis ini (ModelRegistry.model_version)
+    model_version = db.Column(db.String(64))
+
+    # Status job analisis: pending, running, done, failed
+    status = db.Column(db.String(20), default='done')
+    error = db.Column(db.Text)
+    job_started_at = db.Column(db.Float)
     
     created_at = db.Column(db.DateTime(timezone=True), default=func.now())
-    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+
+
+class PhraseExplanation(db.Model):
+    """Cache penjelasan frasa dari Gemini (lihat explanation_cache.ExplanationCache)"""
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, index=True)
+
+    phrase = db.Column(db.String(255))
+    attachment_style = db.Column(db.String(50))
+    context_fingerprint = db.Column(db.String(64))
+    model = db.Column(db.String(100))
+    prompt_version = db.Column(db.String(20))
+    explanation = db.Column(db.Text)
+
+    expires_at = db.Column(db.Float)
+    created_at = db.Column(db.DateTime(timezone=True), default=func.now())
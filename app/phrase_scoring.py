@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def build_vocab_index(tfidf):
+    """Map kata -> index kolom TF-IDF, dibangun sekali saat model di-load"""
+    return {word: int(idx) for word, idx in tfidf.vocabulary_.items()}
+
+
+def score_phrases(phrases, phrase_features, vocab_index):
+    """
+    Skor tiap frasa = rata-rata skor TF-IDF kata-kata penyusunnya yang ada di vocab.
+    Frasa tanpa satu pun kata di vocab tidak diberi skor.
+    """
+    indices = []
+    owners = []
+    for i, phrase in enumerate(phrases):
+        for word in phrase.split():
+            idx = vocab_index.get(word)
+            if idx is not None:
+                indices.append(idx)
+                owners.append(i)
+
+    if not indices:
+        return {}
+
+    # Gather skor sekaligus lalu jumlahkan per frasa
+    values = np.asarray(phrase_features)[indices]
+    sums = np.bincount(owners, weights=values, minlength=len(phrases))
+    counts = np.bincount(owners, minlength=len(phrases))
+
+    return {
+        phrases[i]: float(sums[i] / counts[i])
+        for i in np.flatnonzero(counts)
+    }
@@ -0,0 +1,88 @@
+"""
+Susun konteks percakapan untuk prompt Gemini dalam batas token.
+Pesan dipilih berdasarkan frekuensi frasa x skor TF-IDF; pesan yang memuat
+frasa yang diminta (explain_phrase) selalu didahulukan.
+"""
+import math
+
+# Perkiraan kasar tokenizer Gemini untuk teks Indonesia
+CHARS_PER_TOKEN = 4
+GAP_MARKER = "[...]"
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def phrase_weights(phrase_frequency, phrase_scores=None):
+    """Bobot frasa = frekuensi x (1 + skor TF-IDF)"""
+    phrase_scores = phrase_scores or {}
+    return {
+        phrase: freq * (1 + (phrase_scores.get(phrase) or 0))
+        for phrase, freq in phrase_frequency.items()
+    }
+
+
+def contains_phrase(row, phrase):
+    """Cocokkan frasa hasil ekstraksi (teks bersih) ke pesan"""
+    if phrase in row.phrases:
+        return True
+    if getattr(row, "clean_content", None) and phrase in row.clean_content:
+        return True
+    return phrase in row.content.lower()
+
+
+def build_context(rows, budget_tokens, weights, phrase=None):
+    """
+    rows: MessageRow urut kronologis (content, phrases, clean_content).
+    Return (teks konteks, info) dengan estimasi token <= budget_tokens.
+    Kalau semua pesan muat, hasilnya sama persis dengan join semua pesan.
+    """
+    full_text = "\n".join(row.content for row in rows)
+    full_tokens = estimate_tokens(full_text)
+    if full_tokens <= budget_tokens:
+        return full_text, {
+            "messages": len(rows),
+            "selected": len(rows),
+            "tokens": full_tokens,
+            "full_tokens": full_tokens,
+        }
+
+    # Biaya tiap pesan sudah termasuk newline & kemungkinan GAP_MARKER sebelumnya,
+    # jadi total tidak pernah melewati budget
+    gap_cost = estimate_tokens(GAP_MARKER) + 1
+    budget_tokens -= gap_cost
+    costs = [estimate_tokens(row.content) + 1 + gap_cost for row in rows]
+    scores = [sum(weights.get(p, 0) for p in row.phrases) for row in rows]
+
+    # Urutan prioritas: pesan berisi frasa yang diminta, lalu skor per token tertinggi,
+    # seri -> pesan yang lebih baru
+    def priority(i):
+        required = phrase is not None and contains_phrase(rows[i], phrase)
+        return (required, scores[i] / costs[i], i)
+
+    selected = set()
+    used = 0
+    for i in sorted(range(len(rows)), key=priority, reverse=True):
+        if used + costs[i] > budget_tokens:
+            continue
+        selected.add(i)
+        used += costs[i]
+
+    parts = []
+    previous = -1
+    for i in sorted(selected):
+        if i != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(rows[i].content)
+        previous = i
+    if previous != len(rows) - 1 and rows:
+        parts.append(GAP_MARKER)
+
+    text = "\n".join(parts)
+    return text, {
+        "messages": len(rows),
+        "selected": len(selected),
+        "tokens": estimate_tokens(text),
+        "full_tokens": full_tokens,
+    }
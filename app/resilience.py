@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    """Budget waktu request sudah habis sebelum panggilan selesai"""
+
+
+class Deadline:
+    """Batas waktu absolut untuk satu request/job, dibagi ke semua panggilan di dalamnya"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, cap=None):
+        """Timeout untuk satu panggilan: sisa budget, dibatasi cap"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Budget waktu request habis")
+        return min(remaining, cap) if cap else remaining
+
+
+class CircuitBreaker:
+    """
+    closed -> open setelah failure_threshold kegagalan berturut-turut.
+    Setelah reset_timeout detik, satu panggilan percobaan (half_open) boleh lewat:
+    sukses -> closed, gagal -> open lagi. Percobaan yang tidak punya hasil
+    (dibatalkan pemanggil, budget pemanggil habis) dilepas lewat release().
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, on_state_change=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            if self.on_state_change:
+                self.on_state_change(self, state)
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+                self._trial_running = False
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            self._set_state(self.CLOSED)
+
+    def release(self):
+        """Panggilan selesai tanpa sukses/gagal: lepas slot percobaan, state & hitungan tetap"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=4.0):
+    """Exponential backoff dengan full jitter"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_call(fn, deadline, attempts=3, timeout_cap=None, base_delay=0.5, max_delay=4.0,
+               retryable=lambda e: True, on_retry=None):
+    """
+    Panggil fn(timeout) sampai `attempts` kali dengan exponential backoff + full jitter.
+    Tidak pernah melewati deadline: timeout tiap percobaan & jeda diambil dari sisa budget.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn(deadline.timeout(timeout_cap))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if attempt == attempts - 1 or not retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if delay >= deadline.remaining():
+                raise
+            if on_retry:
+                on_retry(attempt + 1, e)
+            time.sleep(delay)
@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class StageGraph:
+    """
+    Graf stage kecil di atas ThreadPoolExecutor. Tiap stage jalan begitu semua
+    dependensinya selesai, jadi stage yang saling bebas berjalan bersamaan.
+
+        graph = StageGraph(executor)
+        graph.add("predict", predict)
+        graph.add("timeline", lambda predict: build_timeline(predict), deps=["predict"])
+        results = graph.run()
+
+    Hasil dependensi diberikan ke fungsi stage sebagai keyword argument.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' bergantung pada stage yang belum ada: {dep}")
+        self.stages[name] = (fn, tuple(deps))
+
+    def _timed(self, name, fn, kwargs, origin):
+        start = time.perf_counter()
+        try:
+            return fn(**kwargs)
+        finally:
+            end = time.perf_counter()
+            self.timings[name] = {
+                "start_ms": round((start - origin) * 1000, 1),
+                "duration_ms": round((end - start) * 1000, 1),
+            }
+
+    def run(self):
+        origin = time.perf_counter()
+        results = {}
+        waiting = dict(self.stages)
+        running = {}
+
+        try:
+            while waiting or running:
+                for name, (fn, deps) in list(waiting.items()):
+                    if all(dep in results for dep in deps):
+                        del waiting[name]
+                        kwargs = {dep: results[dep] for dep in deps}
+                        future = self.executor.submit(self._timed, name, fn, kwargs, origin)
+                        running[future] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        finally:
+            # Stage gagal -> stage lain yang belum mulai dibatalkan
+            for future in running:
+                future.cancel()
+
+        self.timings["total_ms"] = round((time.perf_counter() - origin) * 1000, 1)
+        return results
@@ -5,28 +5,106 @@ const analyzeBtn = document.getElementById("analyzeBtn");
 
 let messageCount = 0;
 
+// Cursor halaman /read: id pesan tertua & terbaru yang sudah dirender
+let oldestId = null;
+let newestId = null;
+let hasOlder = false;
+let loadingOlder = false;
+
+// Hasil analisis tersimpan terakhir + ETag-nya, dikirim lagi sebagai If-None-Match (304 = tidak berubah)
+let lastAnalysis = null;
+
 
 chatInput.addEventListener("input", function () {
     this.style.height = "auto";
     this.style.height = this.scrollHeight + "px";
 });
 
+// Server kirim ETag + no-cache, jadi browser revalidasi sendiri (304 kalau tidak berubah)
+function fetchMessages(params = {}) {
+    return fetch(`/chat/${SESSION_ID}/read?${new URLSearchParams(params)}`).then((res) => {
+        if (!res.ok) throw new Error("Failed to load messages");
+        return res.json();
+    });
+}
+
+// Render halaman terbaru saja, pesan lama dimuat saat scroll ke atas
 function loadMessages() {
-    fetch(`/chat/${SESSION_ID}/read`)
-        .then((res) => res.json())
-        .then((messages) => {
+    fetchMessages()
+        .then((page) => {
             chatMessages.innerHTML = "";
-            messageCount = messages.filter(m => m.sender === "user").length;
+            page.messages.forEach((msg) => {
+                appendMessage(msg.sender, msg.content);
+            });
+
+            oldestId = page.messages.length ? page.messages[0].id : null;
+            newestId = page.last_id;
+            hasOlder = page.has_more;
+            messageCount = page.user_count;
+
+            updateAnalyzeButton();
+            scrollToBottom();
+            fillViewport();
+        })
+        .catch((err) => console.error(err));
+}
+
+// Tambahkan pesan yang masuk setelah newestId (mis. ringkasan analisis)
+function loadNewMessages() {
+    if (newestId === null) return loadMessages();
 
-            messages.forEach((msg) => {
+    fetchMessages({ after_id: newestId })
+        .then((page) => {
+            page.messages.forEach((msg) => {
                 appendMessage(msg.sender, msg.content);
             });
+            if (page.messages.length) newestId = page.messages[page.messages.length - 1].id;
+            messageCount = page.user_count;
+
             updateAnalyzeButton();
             scrollToBottom();
+            if (page.has_more) loadNewMessages();
         })
         .catch((err) => console.error(err));
 }
 
+function loadOlderMessages() {
+    if (!hasOlder || loadingOlder || oldestId === null) return;
+    loadingOlder = true;
+
+    fetchMessages({ before_id: oldestId })
+        .then((page) => {
+            const fragment = document.createDocumentFragment();
+            page.messages.forEach((msg) => {
+                fragment.appendChild(createMessage(msg.sender, msg.content));
+            });
+
+            // Prepend tanpa menggeser posisi baca user
+            const previousHeight = chatMessages.scrollHeight;
+            chatMessages.insertBefore(fragment, chatMessages.firstChild);
+            chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+
+            if (page.messages.length) oldestId = page.messages[0].id;
+            hasOlder = page.has_more;
+        })
+        .catch((err) => console.error(err))
+        .finally(() => {
+            loadingOlder = false;
+            fillViewport();
+        });
+}
+
+// Halaman pertama belum bisa di-scroll -> langsung muat halaman sebelumnya
+function fillViewport() {
+    if (hasOlder && chatMessages.scrollHeight <= chatMessages.clientHeight) {
+        loadOlderMessages();
+    }
+}
+
+chatMessages.addEventListener("scroll", () => {
+    if (chatMessages.scrollTop < 100) loadOlderMessages();
+});
+
 function sendMessage() {
     const message = chatInput.innerText.trim();
     if (!message) return;
@@ -54,6 +132,7 @@ function sendMessage() {
             
             appendMessage("user", data.user);
             appendMessage("bot", data.bot);
+            newestId = data.bot_id;
             
             messageCount += 1;
             updateAnalyzeButton();
@@ -99,6 +178,12 @@ function scrollToBottom() {
 }
 
 function appendMessage(sender, text) {
+    const div = createMessage(sender, text);
+    chatMessages.appendChild(div);
+    return div;
+}
+
+function createMessage(sender, text) {
     const div = document.createElement("div");
 
     div.className =
@@ -122,7 +207,7 @@ function appendMessage(sender, text) {
 
     `;
     }
-    chatMessages.appendChild(div);
+    return div;
 }
 
 
@@ -140,27 +225,29 @@ function openAnalysisModal() {
         </div>
     `;
     
-    // Fetch analysis
+    // Fetch analysis (202 = job masih jalan di server, polling status)
+    const headers = { "Content-Type": "application/json" };
+    if (lastAnalysis) headers["If-None-Match"] = lastAnalysis.etag;
+
     fetch(`/chat/${SESSION_ID}/analyze`, {
         method: "POST",
-        headers: {
-            "Content-Type": "application/json",
-        },
+        headers,
     })
-        .then((res) => {
-            if (!res.ok) throw new Error("Analysis failed");
-            return res.json();
-        })
+        .then(readCachedAnalysis)
+        .then((data) => (data.status === "done" ? data : pollAnalysisStatus(data.status_url)))
         .then((data) => {
             displayAnalysisResults(data);
             
             isAnalyzed = true;
             lockChatInput();
 
-            // If summary was sent to chat, reload messages
-            if (data.summary_sent_to_chat) {
+            // AI insights belum ada -> stream dari Gemini (SSE)
+            if (data.insights_pending) {
+                streamInsights();
+            } else if (data.summary_sent_to_chat) {
+                // If summary was sent to chat, reload messages
                 setTimeout(() => {
-                    loadMessages();
+                    loadNewMessages();
                 }, 500);
             }
         })
@@ -174,7 +261,99 @@ function openAnalysisModal() {
         });
 }
 
+// POST tidak di-cache browser, jadi revalidasi hasil tersimpan ditangani di sini
+function readCachedAnalysis(res) {
+    if (res.status === 304 && lastAnalysis) return lastAnalysis.data;
+
+    return readAnalysisResponse(res).then((data) => {
+        const etag = res.headers.get("ETag");
+        lastAnalysis = etag && data.cached ? { etag, data } : null;
+        return data;
+    });
+}
+
+function readAnalysisResponse(res) {
+    return res.json().then((data) => {
+        if (!res.ok || data.status === "failed") {
+            throw new Error(data.error || "Analysis failed");
+        }
+        return data;
+    });
+}
+
+function pollAnalysisStatus(statusUrl, delay = 1000) {
+    return new Promise((resolve) => setTimeout(resolve, delay))
+        .then(() => fetch(statusUrl))
+        .then(readAnalysisResponse)
+        .then((data) => {
+            if (data.status === "done") return data;
+
+            const status = document.querySelector("#analysisContent .loading p");
+            if (status && data.status === "running") {
+                status.textContent = "Model sedang menganalisis percakapan Anda...";
+            }
+            return pollAnalysisStatus(statusUrl, Math.min(delay * 1.5, 5000));
+        });
+}
+
+// Render AI insights per chunk di modal & bubble chat, lalu reload pesan (ringkasan tersimpan di server)
+function streamInsights() {
+    const target = document.getElementById("aiInsights");
+    const placeholder = appendMessage("bot", "");
+    const bubble = placeholder.querySelector(".chat-bubble");
+    bubble.style.whiteSpace = "pre-wrap";
+    let text = "";
+
+    const source = new EventSource(`/chat/${SESSION_ID}/analyze/insights/stream`);
+    source.addEventListener("chunk", (e) => {
+        text += JSON.parse(e.data).text;
+        if (target) target.textContent = text;
+        bubble.textContent = text;
+        scrollToBottom();
+    });
+    source.addEventListener("done", (e) => {
+        source.close();
+        const data = JSON.parse(e.data);
+        if (target) target.textContent = data.ai_insights;
+        // Ganti bubble sementara dengan pesan ringkasan yang tersimpan di server
+        placeholder.remove();
+        loadNewMessages();
+    });
+    source.onerror = () => {
+        source.close();
+        if (target && !text) target.textContent = "AI insights gagal dimuat.";
+    };
+}
+
+let explainSource = null;
+
+function explainPhrase(phrase) {
+    const box = document.getElementById("phraseExplanation");
+    if (!box) return;
+    if (explainSource) explainSource.close();
+
+    box.innerHTML = `<h4></h4><div class="explanation-text" style="white-space: pre-wrap;">Memuat penjelasan...</div>`;
+    box.querySelector("h4").textContent = `"${phrase}"`;
+    const textEl = box.querySelector(".explanation-text");
+    let text = "";
+
+    const source = new EventSource(
+        `/chat/${SESSION_ID}/explain-phrase/stream?phrase=${encodeURIComponent(phrase)}`
+    );
+    explainSource = source;
+    source.addEventListener("chunk", (e) => {
+        text += JSON.parse(e.data).text;
+        textEl.textContent = text;
+    });
+    source.addEventListener("done", () => source.close());
+    source.onerror = () => {
+        source.close();
+        if (!text) textEl.textContent = "Penjelasan gagal dimuat.";
+    };
+}
+
 function closeAnalysisModal() {
+    if (explainSource) explainSource.close();
     document.getElementById("analysisModal").style.display = "none";
 }
 
@@ -208,7 +387,7 @@ function displayAnalysisResults(data) {
             return `
                 <tr>
                     <td>${idx + 1}</td>
-                    <td><strong>${p.phrase}</strong></td>
+                    <td><strong class="phrase-link" data-phrase="${p.phrase}" style="cursor: pointer;" title="Klik untuk penjelasan">${p.phrase}</strong></td>
                     <td>${p.frequency}x</td>
                     <td>${p.percentage}%</td>
                     <td>${p.tfidf_score !== null ? p.tfidf_score.toFixed(3) : '-'}</td>
@@ -346,6 +525,13 @@ function displayAnalysisResults(data) {
                         ${phrasesTable}
                     </tbody>
                 </table>
+                <div id="phraseExplanation" class="phrase-explanation"></div>
+            </div>
+            
+            <!-- AI Insights (Gemini) -->
+            <div class="section">
+                <h3>AI Insights</h3>
+                <div id="aiInsights" class="ai-insights" style="white-space: pre-wrap;"></div>
             </div>
             
             ${emotionsHtml}
@@ -388,7 +574,12 @@ function displayAnalysisResults(data) {
         </div>
     `;
 
+    document.getElementById("aiInsights").textContent =
+        data.ai_insights || "Menyiapkan insight AI...";
 
+    modalContent.querySelectorAll(".phrase-link").forEach((el) => {
+        el.addEventListener("click", () => explainPhrase(el.dataset.phrase));
+    });
 }
 
 function lockChatInput() {
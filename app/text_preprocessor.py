@@ -0,0 +1,169 @@
+import json
+import os
+import re
+import threading
+
+from Sastrawi.Dictionary.ArrayDictionary import ArrayDictionary
+from Sastrawi.Stemmer.Stemmer import Stemmer
+from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+
+DIGITS_RE = re.compile(r'\d+')
+NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+SPACES_RE = re.compile(r'\s+')
+
+SLANG_DICT = {
+    'ga': 'tidak', 'gak': 'tidak', 'nggak': 'tidak', 'ngga': 'tidak',
+    'udah': 'sudah', 'dah': 'sudah', 'udh': 'sudah',
+    'bgt': 'banget', 'bener': 'benar',
+    'yg': 'yang', 'org': 'orang', 'krn': 'karena',
+    'gue': 'saya', 'gw': 'saya', 'aku': 'saya',
+    'lo': 'kamu', 'lu': 'kamu',
+    'kalo': 'kalau', 'gimana': 'bagaimana',
+    'emang': 'memang', 'trus': 'terus',
+}
+
+
+def extract_phrases(text):
+    """Bigram (>= 10 karakter) & trigram (>= 15 karakter) dari teks bersih"""
+    words = text.split()
+    phrases = []
+
+    # Bigrams
+    for i in range(len(words) - 1):
+        phrase = f"{words[i]} {words[i+1]}"
+        if len(phrase) >= 10:
+            phrases.append(phrase)
+
+    # Trigrams
+    for i in range(len(words) - 2):
+        phrase = f"{words[i]} {words[i+1]} {words[i+2]}"
+        if len(phrase) >= 15:
+            phrases.append(phrase)
+
+    return list(set(phrases))
+
+
+def text_stats(conversation_text, clean_text):
+    """Statistik teks yang dipakai sebagai fitur model & ditampilkan di hasil analisis"""
+    return {
+        "word_count": len(clean_text.split()),
+        "sentence_count": conversation_text.count('.') + conversation_text.count('!') + conversation_text.count('?'),
+        "clean_text_length": len(clean_text),
+    }
+
+
+class SetDictionary(ArrayDictionary):
+    """ArrayDictionary Sastrawi dengan lookup set (O(1)) bukan list"""
+
+    def __init__(self, words=None):
+        self.words = set()
+        if words:
+            self.add_words(words)
+
+    def add(self, word):
+        if not word or word.strip() == '':
+            return
+        self.words.add(word)
+
+
+class TextPreprocessor:
+    """
+    Preprocessing teks Indonesia dengan hasil identik ChatbotService.preprocess_text lama
+    (regex -> slang -> stopword Sastrawi -> stem Sastrawi), tapi lebih cepat:
+    regex dikompilasi, stopword & kamus kata dasar pakai set, stem per kata di-memo.
+    """
+
+    def __init__(self, memo_size=50000, memo_path=None):
+        self.slang_dict = SLANG_DICT
+        self.stopwords = SetDictionary(StopWordRemoverFactory().get_stop_words()).words
+        self.stemmer = Stemmer(SetDictionary(StemmerFactory().get_words()))
+
+        self.memo_size = max(1, int(memo_size))
+        self.memo_path = memo_path
+        self._memo = {}
+        self._lock = threading.Lock()
+
+        if memo_path:
+            self.load_memo(memo_path)
+
+    def normalize_text(self, text):
+        """Lowercase, buang angka & simbol, ganti slang"""
+        text = text.lower()
+        text = DIGITS_RE.sub('', text)
+        text = NON_ALPHA_RE.sub('', text)
+        text = SPACES_RE.sub(' ', text).strip()
+
+        slang = self.slang_dict
+        return ' '.join([slang.get(w, w) for w in text.split()])
+
+    def remove_stopwords(self, text):
+        """
+        Sama persis dengan StopWordRemover.remove Sastrawi, termasuk perilakunya
+        yang menghapus item list saat iterasi (kata setelah stopword ikut terlewat).
+        """
+        words = text.split(' ')
+        stopwords = self.stopwords
+        for word in words:
+            if word in stopwords:
+                words.remove(word)
+        return ' '.join(words)
+
+    def stem_word(self, word):
+        stem = self._memo.get(word)
+        if stem is None:
+            stem = self.stemmer.stem(word)
+            self._remember(word, stem)
+        return stem
+
+    def _remember(self, word, stem):
+        memo = self._memo
+        memo[word] = stem
+        if len(memo) > self.memo_size:
+            with self._lock:
+                # Buang entry paling lama (dict menyimpan urutan insert)
+                while len(memo) > self.memo_size:
+                    try:
+                        del memo[next(iter(memo))]
+                    except (KeyError, StopIteration, RuntimeError):
+                        break
+
+    def stem_text(self, text):
+        # Input sudah ternormalisasi (a-z + satu spasi), jadi cukup split per spasi
+        return ' '.join([self.stem_word(w) for w in text.split(' ')])
+
+    def clean_normalized_text(self, text):
+        """Stopword removal + stemming dari hasil normalize_text"""
+        return self.stem_text(self.remove_stopwords(text))
+
+    def preprocess(self, text):
+        return self.clean_normalized_text(self.normalize_text(text))
+
+    def preprocess_many(self, texts):
+        """Preprocess banyak text sekaligus, text yang sama hanya diproses sekali"""
+        results = {}
+        return [
+            results[text] if text in results else results.setdefault(text, self.preprocess(text))
+            for text in texts
+        ]
+
+    def load_memo(self, path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            memo = json.load(f)
+        for word, stem in list(memo.items())[-self.memo_size:]:
+            self._memo[word] = stem
+        return len(self._memo)
+
+    def save_memo(self, path=None):
+        path = path or self.memo_path
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(self._memo), f)
+        os.replace(tmp_path, path)
+
+    def memo_stats(self):
+        return {"entries": len(self._memo), "max_entries": self.memo_size}
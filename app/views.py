@@ -1,15 +1,26 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
-from .models import ChatSessions
+from sqlalchemy.orm import joinedload
+from .models import ChatSessions, SessionAnalysis
 views = Blueprint('views', __name__)
 
 
+def dashboard_sessions(user_id):
+    """Session user + ringkasan analisis dalam satu query (tanpa lazy load per baris)"""
+    return ChatSessions.query.options(
+        joinedload(ChatSessions.analysis).load_only(
+            SessionAnalysis.attachment_style,
+            SessionAnalysis.status
+        )
+    ).filter_by(
+        user_id=user_id
+    ).order_by(ChatSessions.started_at.desc()).all()
+
+
 @views.route('/')
 @login_required
 def home():
-    sessions = ChatSessions.query.filter_by(
-        user_id=current_user.id
-    ).order_by(ChatSessions.started_at.desc()).all()
+    sessions = dashboard_sessions(current_user.id)
 
     return render_template(
         "index.html",
@@ -0,0 +1,68 @@
+"""
+Benchmark throughput encode IndoBERT: micro-batching vs tanpa batching.
+
+    python scripts/bench_bert_batching.py --requests 64 --concurrency 16
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.chatbot_service import ChatbotService
+
+SAMPLE_TEXT = (
+    "saya merasa cemas kalau pasangan tidak balas pesan saya "
+    "saya takut ditinggal dan butuh perhatian setiap hari "
+)
+
+
+def run(service, n_requests, concurrency, words, tag):
+    # Text berbeda per pass, supaya pass kedua tidak diuntungkan cache apa pun
+    texts = [f"{SAMPLE_TEXT * words} {tag} {i}" for i in range(n_requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(service.encode_text_bert, texts))
+    elapsed = time.perf_counter() - start
+
+    return n_requests / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--words", type=int, default=4, help="pengali panjang text")
+    parser.add_argument("--window-ms", type=float, default=10)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    service = ChatbotService(
+        model_path="app/model/",
+        batching=True,
+        # Cache embedding dimatikan: yang diukur encode BERT, bukan cache hit
+        embedding_cache_size=0,
+        batch_window_ms=args.window_ms,
+        max_batch_size=args.max_batch_size
+    )
+    batcher = service.batcher
+
+    # Warmup
+    service.encode_texts_bert([SAMPLE_TEXT])
+
+    service.batcher = None
+    rps, elapsed = run(service, args.requests, args.concurrency, args.words, "unbatched")
+    print(f"unbatched : {rps:7.2f} req/s  ({elapsed:.2f}s)")
+
+    service.batcher = batcher
+    rps_batched, elapsed = run(service, args.requests, args.concurrency, args.words, "batched")
+    print(f"batched   : {rps_batched:7.2f} req/s  ({elapsed:.2f}s)")
+
+    print(f"speedup   : {rps_batched / rps:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark jumlah query & latency untuk query path utama (dashboard, /read, analisis)
+di database SQLite yang diisi data sintetis.
+
+    python scripts/bench_dashboard_queries.py --users 50 --sessions 40 --messages 200
+    python scripts/bench_dashboard_queries.py --no-indexes   # bandingkan tanpa index komposit
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event, text
+from sqlalchemy.orm import load_only
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import db
+from app.analysis_blob import RESULT_FORMAT, pack_result
+from app.models import ChatMessages, ChatSessions, SessionAnalysis, User
+from app.analysis_service import load_user_messages
+from app.views import dashboard_sessions
+
+WORDS = (
+    "saya merasa cemas kalau pasangan tidak balas pesan takut ditinggal "
+    "butuh perhatian sulit terbuka tentang perasaan sendiri"
+).split()
+
+COMPOSITE_INDEXES = (
+    "ix_chat_sessions_user_started",
+    "ix_chat_messages_session_sender_created",
+    "ix_chat_messages_session_id",
+)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def seed(n_users, n_sessions, n_messages, analyzed_ratio, rng):
+    start = datetime(2024, 1, 1)
+    for u in range(n_users):
+        db.session.add(User(email=f"user{u}@example.com", password="x", name=f"user{u}"))
+    db.session.commit()
+
+    user_ids = [user.id for user in User.query.all()]
+    for user_id in user_ids:
+        sessions = [
+            ChatSessions(user_id=user_id, started_at=start + timedelta(hours=rng.randrange(24 * 365)))
+            for _ in range(n_sessions)
+        ]
+        db.session.add_all(sessions)
+        db.session.flush()
+
+        messages, analyses = [], []
+        for session in sessions:
+            for i in range(n_messages):
+                messages.append({
+                    "session_id": session.id,
+                    "sender": "user" if i % 2 == 0 else "bot",
+                    "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))),
+                    "created_at": session.started_at + timedelta(seconds=30 * i),
+                })
+            if rng.random() < analyzed_ratio:
+                analyses.append({
+                    "session_id": session.id,
+                    "attachment_style": rng.choice(["secure", "anxious", "avoidant"]),
+                    "confidence": rng.random(),
+                    "status": "done",
+                    "result": pack_result({"ai_insights": " ".join(rng.choice(WORDS) for _ in range(300))}),
+                    "result_format": RESULT_FORMAT,
+                })
+        db.session.execute(ChatMessages.__table__.insert(), messages)
+        if analyses:
+            db.session.execute(SessionAnalysis.__table__.insert(), analyses)
+        db.session.commit()
+    return user_ids
+
+
+def render_dashboard(sessions):
+    # Atribut yang dibaca index.html untuk tiap baris
+    for s in sessions:
+        _ = s.started_at, s.status
+        if s.analysis:
+            _ = s.analysis.status, s.analysis.attachment_style
+
+
+def lazy_dashboard(user_id):
+    """Query dashboard sebelum eager loading (s.analysis lazy per baris)"""
+    return ChatSessions.query.filter_by(
+        user_id=user_id
+    ).order_by(ChatSessions.started_at.desc()).all()
+
+
+def read_page(session_id, limit=50):
+    """Halaman terbaru /read (sama dengan chat_message.read_messages)"""
+    return ChatMessages.query.options(
+        load_only(ChatMessages.id, ChatMessages.sender, ChatMessages.content, ChatMessages.created_at)
+    ).filter(ChatMessages.session_id == session_id).order_by(ChatMessages.id.desc()).limit(limit + 1).all()
+
+
+def measure(counter, fn, args_list):
+    timings, queries = [], []
+    for args in args_list:
+        db.session.expunge_all()
+        before = counter.count
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count - before)
+    return statistics.median(timings), max(timings), statistics.median(queries), max(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=50, help="session per user")
+    parser.add_argument("--messages", type=int, default=100, help="pesan per session")
+    parser.add_argument("--analyzed", type=float, default=0.7, help="rasio session yang sudah dianalisis")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--no-indexes", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    db.init_app(app)
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.create_all()
+        if args.no_indexes:
+            for name in COMPOSITE_INDEXES:
+                db.session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        start = time.perf_counter()
+        user_ids = seed(args.users, args.sessions, args.messages, args.analyzed, rng)
+        db.session.execute(text("ANALYZE"))
+        print(f"seeded {args.users} users x {args.sessions} sessions x {args.messages} messages "
+              f"in {time.perf_counter() - start:.1f}s ({db_path})")
+
+        session_ids = [row.id for row in ChatSessions.query.options(load_only(ChatSessions.id)).all()]
+        sample_users = [(rng.choice(user_ids),) for _ in range(args.samples)]
+        sample_sessions = [(rng.choice(session_ids),) for _ in range(args.samples)]
+
+        counter = QueryCounter(db.engine)
+        cases = [
+            ("dashboard (lazy analysis)", lambda user_id: render_dashboard(lazy_dashboard(user_id)), sample_users),
+            ("dashboard (joinedload)", lambda user_id: render_dashboard(dashboard_sessions(user_id)), sample_users),
+            ("read newest page", read_page, sample_sessions),
+            ("load_user_messages", load_user_messages, sample_sessions),
+        ]
+
+        print(f"\n{'path':<28} {'p50 ms':>8} {'max ms':>8} {'queries':>8} {'max q':>6}")
+        for name, fn, samples in cases:
+            p50, worst, queries, max_queries = measure(counter, fn, samples)
+            print(f"{name:<28} {p50:>8.2f} {worst:>8.2f} {queries:>8.0f} {max_queries:>6}")
+
+        print("\nquery plans:")
+        plans = [
+            ("dashboard", "SELECT id FROM chat_sessions WHERE user_id = 1 ORDER BY started_at DESC"),
+            ("read", "SELECT id FROM chat_messages WHERE session_id = 1 ORDER BY id DESC LIMIT 51"),
+            ("user messages", "SELECT id FROM chat_messages WHERE session_id = 1 AND sender = 'user' "
+                              "ORDER BY created_at"),
+        ]
+        for name, sql in plans:
+            plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+            print(f"  {name:<14} " + " | ".join(row[-1] for row in plan))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark IntentClassifier.classify: loop re.search per pattern (lama) vs matcher gabungan,
+dengan jumlah pattern yang terus ditambah (intent sintetis).
+
+    python scripts/bench_intent_classifier.py --patterns 0 50 200 1000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.intent_classifier import IntentClassifier
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "preprocess_corpus.txt")
+
+
+def legacy_classify(classifier, text, turn_count):
+    """Salinan IntentClassifier.classify lama"""
+    text_lower = text.lower()
+    for intent_name in classifier.priority:
+        intent = classifier.intents[intent_name]
+        if turn_count < intent.required_turns:
+            continue
+        for pattern in intent.patterns:
+            if re.search(pattern, text_lower):
+                return intent_name
+    return "general"
+
+
+def synthetic_intents_file(n_patterns, rng):
+    with open(IntentClassifier.DEFAULT_INTENTS_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    per_intent = 10
+    for i in range(0, n_patterns, per_intent):
+        words = [
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9)))
+            for _ in range(min(per_intent, n_patterns - i) * 3)
+        ]
+        name = f"synthetic_{i // per_intent}"
+        data["intents"].append({
+            "name": name,
+            "patterns": [
+                rf"\b({words[j]}|{words[j + 1]})\s+{words[j + 2]}\b"
+                for j in range(0, len(words), 3)
+            ],
+            "responses": ["-"],
+            "follow_ups": [],
+            "required_turns": rng.randint(0, 6),
+        })
+        # Intent sintetis disisipkan sebelum "general"
+        data["priority"].insert(len(data["priority"]) - 1, name)
+
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
+
+
+def per_message_us(fn, messages, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text, turn in messages:
+            fn(text, turn)
+    return (time.perf_counter() - start) / (repeats * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patterns", type=int, nargs="+", default=[0, 50, 200, 500, 1000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with open(DEFAULT_CORPUS, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    messages = [(line, turn) for line in lines for turn in (0, 2, 5, 8)]
+
+    print(f"{'patterns':>8} {'legacy us/msg':>14} {'compiled us/msg':>16}")
+    for n_patterns in args.patterns:
+        path = synthetic_intents_file(n_patterns, rng)
+        try:
+            classifier = IntentClassifier(path)
+        finally:
+            os.remove(path)
+
+        for text, turn in messages:
+            expected = legacy_classify(classifier, text, turn)
+            assert classifier.classify(text, turn) == expected, (text, turn)
+
+        legacy = per_message_us(lambda t, n: legacy_classify(classifier, t, n), messages, args.repeats)
+        compiled = per_message_us(classifier.classify, messages, args.repeats)
+        total = sum(len(i.patterns) for i in classifier.intents.values())
+        print(f"{total:>8} {legacy:>14.1f} {compiled:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
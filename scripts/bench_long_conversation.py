@@ -0,0 +1,70 @@
+"""
+Benchmark latency encode IndoBERT terhadap panjang percakapan (truncate vs chunked).
+
+    python scripts/bench_long_conversation.py --lengths 100 500 1000 2000 4000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.chatbot_service import ChatbotService
+
+WORDS = (
+    "saya merasa cemas kalau pasangan tidak balas pesan takut ditinggal "
+    "butuh perhatian sulit terbuka tentang perasaan sendiri"
+).split()
+
+
+def make_text(n_words):
+    return " ".join(WORDS[i % len(WORDS)] for i in range(n_words))
+
+
+def measure(service, text, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        service.encode_texts_bert([text])
+        timings.append(time.perf_counter() - start)
+    return np.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 500, 1000, 2000, 4000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-windows", type=int, default=8)
+    parser.add_argument("--pooling", default="mean", choices=["mean", "attention"])
+    args = parser.parse_args()
+
+    service = ChatbotService(
+        model_path="app/model/",
+        batching=False,
+        embedding_cache_size=0,
+        encode_mode="chunked",
+        chunk_pooling=args.pooling,
+        max_windows=args.max_windows
+    )
+    service.encode_texts_bert([make_text(10)])
+
+    print(f"{'words':>7} {'tokens':>7} {'windows':>8} {'truncate ms':>12} {'chunked ms':>11}")
+    for n_words in args.lengths:
+        text = make_text(n_words)
+
+        service.encode_mode = "chunked"
+        n_windows = len(service.split_windows(text))
+        n_tokens = len(service.tokenizer(text, add_special_tokens=False)["input_ids"])
+        chunked_ms = measure(service, text, args.repeats)
+
+        service.encode_mode = "truncate"
+        truncate_ms = measure(service, text, args.repeats)
+
+        print(f"{n_words:>7} {n_tokens:>7} {n_windows:>8} {truncate_ms:>12.1f} {chunked_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark skor frasa TF-IDF: loop lama (scan vocab linear) vs index vocab + gather.
+
+    python scripts/bench_phrase_scoring.py --messages 10 50 100 250 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.phrase_scoring import build_vocab_index, score_phrases
+
+
+def legacy_score_phrases(phrases, phrase_features, tfidf):
+    """Salinan loop lama di ChatbotService.predict"""
+    phrase_scores = {}
+    feature_names = tfidf.get_feature_names_out()
+    for phrase in phrases:
+        matching_scores = []
+        for word in phrase.split():
+            if word in feature_names:
+                idx = list(feature_names).index(word)
+                matching_scores.append(phrase_features[idx])
+        if matching_scores:
+            phrase_scores[phrase] = float(np.mean(matching_scores))
+    return phrase_scores
+
+
+def extract_phrases(words):
+    phrases = set()
+    for i in range(len(words) - 1):
+        phrase = f"{words[i]} {words[i+1]}"
+        if len(phrase) >= 10:
+            phrases.add(phrase)
+    for i in range(len(words) - 2):
+        phrase = f"{words[i]} {words[i+1]} {words[i+2]}"
+        if len(phrase) >= 15:
+            phrases.add(phrase)
+    return list(phrases)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--words-per-message", type=int, default=15)
+    parser.add_argument("--model-path", default="app/model/")
+    args = parser.parse_args()
+
+    tfidf = joblib.load(os.path.join(args.model_path, "phrase_tfidf.pkl"))
+    vocab = list(tfidf.vocabulary_)
+    filler = ["rasa", "hubung", "pasang", "pikir", "orang", "waktu", "hari", "cerita"]
+    pool = vocab + filler
+
+    start = time.perf_counter()
+    vocab_index = build_vocab_index(tfidf)
+    index_ms = (time.perf_counter() - start) * 1000
+    print(f"vocab index build: {index_ms:.3f} ms (sekali saat load)\n")
+
+    rng = random.Random(0)
+    print(f"{'messages':>8} {'phrases':>8} {'legacy ms':>10} {'indexed ms':>11} {'speedup':>8}")
+    for n_messages in args.messages:
+        words = [rng.choice(pool) for _ in range(n_messages * args.words_per_message)]
+        phrases = extract_phrases(words)
+        phrase_features = tfidf.transform([" ".join(phrases)]).toarray()[0]
+
+        start = time.perf_counter()
+        expected = legacy_score_phrases(phrases, phrase_features, tfidf)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        actual = score_phrases(phrases, phrase_features, vocab_index)
+        indexed_ms = (time.perf_counter() - start) * 1000
+
+        assert actual == expected, "phrase_scores berbeda dengan implementasi lama"
+        print(f"{n_messages:>8} {len(phrases):>8} {legacy_ms:>10.2f} {indexed_ms:>11.3f} "
+              f"{legacy_ms / indexed_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
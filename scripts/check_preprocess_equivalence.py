@@ -0,0 +1,81 @@
+"""
+Cek hasil TextPreprocessor identik dengan pipeline preprocessing lama (Sastrawi langsung).
+
+    python scripts/check_preprocess_equivalence.py [corpus.txt ...]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+
+from app.text_preprocessor import SLANG_DICT, TextPreprocessor
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "preprocess_corpus.txt")
+
+
+class ReferencePreprocessor:
+    """Salinan ChatbotService.preprocess_text sebelum TextPreprocessor"""
+
+    def __init__(self):
+        self.stopword_remover = StopWordRemoverFactory().create_stop_word_remover()
+        self.stemmer = StemmerFactory().create_stemmer()
+        self.slang_dict = SLANG_DICT
+
+    def preprocess_text(self, text):
+        text = text.lower()
+        text = re.sub(r'\d+', '', text)
+        text = re.sub(r'[^a-zA-Z\s]', '', text)
+        text = re.sub(r'\s+', ' ', text).strip()
+
+        words = text.split()
+        words = [self.slang_dict.get(w, w) for w in words]
+        text = ' '.join(words)
+
+        text = self.stopword_remover.remove(text)
+        text = self.stemmer.stem(text)
+        return text
+
+
+def load_corpus(paths):
+    texts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.extend(line.rstrip("\n") for line in f)
+
+    # Tambah gabungan beberapa baris, seperti percakapan penuh di predict()
+    texts.append("\n".join(texts))
+    texts.extend("\n".join(texts[i:i + 5]) for i in range(0, len(texts) - 1, 5))
+    return texts
+
+
+def main():
+    paths = sys.argv[1:] or [DEFAULT_CORPUS]
+    texts = load_corpus(paths)
+
+    reference = ReferencePreprocessor()
+    engine = TextPreprocessor()
+
+    start = time.perf_counter()
+    expected = [reference.preprocess_text(t) for t in texts]
+    reference_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = engine.preprocess_many(texts)
+    engine_s = time.perf_counter() - start
+
+    mismatches = [(t, e, a) for t, e, a in zip(texts, expected, actual) if e != a]
+    for text, exp, act in mismatches:
+        print(f"MISMATCH: {text[:60]!r}\n  expected: {exp!r}\n  actual:   {act!r}")
+
+    print(f"{len(texts) - len(mismatches)}/{len(texts)} identical")
+    print(f"reference: {reference_s * 1000:.1f} ms, engine (cold memo): {engine_s * 1000:.1f} ms")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
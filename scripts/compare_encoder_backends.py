@@ -0,0 +1,95 @@
+"""
+Bandingkan encoder backend IndoBERT dengan referensi fp32 PyTorch:
+cosine similarity embedding, kesamaan prediksi attachment style, dan latency.
+
+    python scripts/compare_encoder_backends.py --backends torch-int8 onnx
+
+Backend terbaik bisa dipasang lewat "encoder_backend" di app/model/feature_config.json
+atau env BERT_BACKEND.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.chatbot_service import ChatbotService
+from app.encoder_backends import BACKENDS, build_encoder
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "preprocess_corpus.txt")
+
+
+def load_conversations(path, size):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    # Percakapan sintetis: gabungan beberapa baris berurutan
+    return ["\n".join(lines[i:i + size]) for i in range(0, len(lines), max(1, size // 2))]
+
+
+def run_backend(service, encoder, conversations, repeats):
+    service.encoder = encoder
+
+    clean_texts = service.preprocess_many(conversations)
+    embeddings = np.stack(service.encode_texts_bert(clean_texts))
+    predictions = [service.predict(text)["prediction"] for text in conversations]
+
+    timings = []
+    for _ in range(repeats):
+        for text in clean_texts:
+            start = time.perf_counter()
+            service.encode_texts_bert([text])
+            timings.append(time.perf_counter() - start)
+
+    return embeddings, predictions, timings
+
+
+def cosine(a, b):
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx"], choices=BACKENDS)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--messages-per-conversation", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--onnx-path", default="app/model/indobert.onnx")
+    args = parser.parse_args()
+
+    service = ChatbotService(
+        model_path="app/model/",
+        batching=False,
+        embedding_cache_size=0,
+        encoder_backend="torch"
+    )
+    conversations = load_conversations(args.corpus, args.messages_per_conversation)
+
+    ref_emb, ref_pred, ref_times = run_backend(service, service.encoder, conversations, args.repeats)
+    ref_ms = np.median(ref_times) * 1000
+
+    print(f"{len(conversations)} percakapan, referensi torch fp32: {ref_ms:.1f} ms/encode (median)\n")
+    print(f"{'backend':>11} {'cos mean':>9} {'cos min':>8} {'agree':>7} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+
+    for backend in args.backends:
+        encoder = build_encoder(
+            backend,
+            service.bert_model_name,
+            service.device,
+            onnx_path=args.onnx_path
+        )
+        emb, pred, times = run_backend(service, encoder, conversations, args.repeats)
+
+        sims = cosine(ref_emb, emb)
+        agreement = np.mean([a == b for a, b in zip(ref_pred, pred)])
+        p50 = np.median(times) * 1000
+        p95 = np.percentile(times, 95) * 1000
+
+        print(f"{backend:>11} {sims.mean():>9.5f} {sims.min():>8.5f} {agreement:>6.1%} "
+              f"{p50:>8.1f} {p95:>8.1f} {ref_ms / p50:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
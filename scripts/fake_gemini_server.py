@@ -0,0 +1,164 @@
+"""
+Fake Gemini REST API lokal untuk menguji timeout, retry dan circuit breaker
+tanpa network. Meniru endpoint generateContent & streamGenerateContent (SSE).
+
+    python scripts/fake_gemini_server.py --port 8089 --mode slow --latency 5
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8089 python main.py
+
+Mode:
+    ok     latency dari --latency / --latency-dist, error acak sesuai --error-rate
+    slow   sama dengan ok, tapi distribusi latency eksponensial
+    error  selalu balas HTTP --error-code
+    hang   terima request lalu tidak pernah membalas
+Mode juga bisa diganti saat jalan: POST /_mode?mode=hang
+
+Tanpa google-genai, pakai LLM_BACKEND=http LLM_HTTP_URL=http://127.0.0.1:8089.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.llm_backends import LatencyModel, deterministic_text, split_chunks
+
+PATH_RE = re.compile(r"^/[^/]+/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)$")
+
+
+def response_json(text):
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": len(text.split())},
+    }
+
+
+class FakeGeminiState:
+    def __init__(self, args):
+        self.mode = args.mode
+        self.latency = LatencyModel(
+            mean_ms=args.latency * 1000,
+            distribution=args.latency_dist,
+            error_rate=args.error_rate,
+            error_code=args.error_code,
+            seed=args.seed
+        )
+        self.slow_latency = LatencyModel(
+            mean_ms=args.latency * 1000,
+            distribution="exponential",
+            error_rate=args.error_rate,
+            seed=args.seed
+        )
+        self.error_code = args.error_code
+        self.chunks = args.chunks
+        self.chunk_delay = args.chunk_delay
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        print(f"[fake-gemini] {self.command} {self.path} mode={self.state.mode}")
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            return self._send_json(200, {"requests": self.state.requests, "mode": self.state.mode})
+        self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b"{}"
+
+        if url.path == "/_mode":
+            params = parse_qs(url.query)
+            self.state.mode = params.get("mode", [self.state.mode])[0]
+            return self._send_json(200, {"mode": self.state.mode})
+
+        match = PATH_RE.match(url.path)
+        if not match:
+            return self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+        with self.state.lock:
+            self.state.requests += 1
+
+        state = self.state
+        if state.mode == "hang":
+            # Tahan koneksi sampai client timeout
+            time.sleep(3600)
+            return
+
+        latency, error = (state.slow_latency if state.mode == "slow" else state.latency).sample()
+        time.sleep(latency)
+
+        if state.mode == "error" or error:
+            return self._send_json(state.error_code, {
+                "error": {"code": state.error_code, "message": "fake upstream error", "status": "UNAVAILABLE"}
+            })
+
+        request = json.loads(body or b"{}")
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = deterministic_text(prompt)
+
+        if match.group("method") == "generateContent":
+            return self._send_json(200, response_json(text))
+
+        # streamGenerateContent?alt=sse
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for chunk in split_chunks(text, state.chunks):
+            self.wfile.write(f"data: {json.dumps(response_json(chunk))}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(state.chunk_delay)
+        self.close_connection = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--mode", choices=["ok", "slow", "error", "hang"], default="ok")
+    parser.add_argument("--latency", type=float, default=0.2, help="detik (rata-rata)")
+    parser.add_argument("--latency-dist", choices=LatencyModel.DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probabilitas error di mode ok/slow")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--error-code", type=int, default=503)
+    parser.add_argument("--chunks", type=int, default=8, help="jumlah chunk untuk streaming")
+    parser.add_argument("--chunk-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    FakeGeminiHandler.state = FakeGeminiState(args)
+    server = ThreadingHTTPServer((args.host, args.port), FakeGeminiHandler)
+    server.daemon_threads = True
+    print(f"Fake Gemini listening on http://{args.host}:{args.port} (mode={args.mode})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+class FakeChatbotService:
+    """
+    Pengganti ChatbotService (IndoBERT + classifier) untuk test: preprocessing
+    sederhana dan prediksi tetap, jumlah panggilan predict dicatat.
+    """
+
+    def __init__(self):
+        self.predict_calls = 0
+
+    def normalize_text(self, text):
+        return text.lower()
+
+    def clean_normalized_text(self, text):
+        return text
+
+    def extract_phrases(self, text):
+        return text.split()[:3]
+
+    def predict(self, text, normalized_text=None):
+        self.predict_calls += 1
+        return {
+            "prediction": "anxious",
+            "confidence": 0.7,
+            "probabilities": {"secure": 0.1, "anxious": 0.7, "avoidant": 0.2},
+            "phrase_scores": {"aku": 0.5, "cemas": 0.8},
+            "emotion_scores": {"sad": 0.4, "fear": 0.3},
+            "bert_summary": {"embedding_dim": 768},
+            "text_stats": {"word_count": len(text.split())},
+        }
+
+    def warmup(self):
+        pass
+
+
+def create_test_app(monkeypatch, tmp_path, **env):
+    """
+    create_app() dengan SQLite sementara, LLM stub dan FakeChatbotService.
+    env: config tambahan lewat environment, mis. ANALYSIS_ASYNC="1".
+    """
+    from app.conversation_store import conversation_store
+    from app.model_registry import model_registry
+
+    settings = {
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'test.db'}",
+        "MODEL_LOADING": "lazy",
+        "MODEL_VERSION": "test-v1",
+        "LLM_BACKEND": "stub",
+        "LLM_STUB_LATENCY_MS": "0",
+        "ANALYSIS_ASYNC": "0",
+        "GEMINI_STREAMING": "0",
+    }
+    settings.update(env)
+    for name, value in settings.items():
+        monkeypatch.setenv(name, str(value))
+
+    from app import create_app
+
+    # Singleton dipakai ulang antar create_app, kosongkan state test sebelumnya
+    model_registry._instances = {}
+    model_registry._errors = {}
+    model_registry._failures = {}
+    model_registry._model_version = None
+    conversation_store._engines.clear()
+
+    app = create_app()
+    app.config["TESTING"] = True
+    model_registry._instances["chatbot_service"] = FakeChatbotService()
+    return app
+
+
+def chatbot_service():
+    from app.model_registry import model_registry
+
+    return model_registry._instances["chatbot_service"]
+
+
+def add_session(app, n_messages=6, user_id=None):
+    """Session dengan n pesan user (+ balasan bot), return (user_id, session_id)"""
+    from app import db
+    from app.models import ChatMessages, ChatSessions, User
+
+    with app.app_context():
+        if user_id is None:
+            user = User(email=f"user{User.query.count()}@test.id", password="x", name="tester")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+        session = ChatSessions(user_id=user_id)
+        db.session.add(session)
+        db.session.commit()
+        for i in range(n_messages):
+            db.session.add(ChatMessages(session_id=session.id, sender="user", content=f"aku merasa cemas {i}"))
+            db.session.add(ChatMessages(session_id=session.id, sender="bot", content="oke, ceritakan lagi"))
+        db.session.commit()
+        return user_id, session.id
+
+
+def login(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    return client
+
+
+def analyze(client, session_id, **kwargs):
+    response = client.post(f"/chat/{session_id}/analyze", **kwargs)
+    return response, response.get_json()
+
+
+def send(client, session_id, message):
+    response = client.post(f"/chat/{session_id}/send", data={"sender": "user", "message": message})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def summary_messages(app, session_id):
+    """Jumlah pesan bot ringkasan analisis di session"""
+    from app.models import ChatMessages
+
+    with app.app_context():
+        return ChatMessages.query.filter(
+            ChatMessages.session_id == session_id,
+            ChatMessages.content.like("%Analisis Percakapan Selesai%")
+        ).count()
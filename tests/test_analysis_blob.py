@@ -0,0 +1,73 @@
+import gzip
+import json
+from collections import namedtuple
+
+from app.analysis_blob import RESULT_FORMAT, pack_result, result_body, result_etag, unpack_result
+from app.analysis_service import RESULT_KEYS, result_document
+from app.fingerprint import legacy_messages_fingerprint, messages_fingerprint
+
+Message = namedtuple("Message", ["id", "content"])
+
+DOCUMENT = {
+    "cached": True,
+    "status": "done",
+    "attachment_style": "anxious",
+    "ai_insights": "Ringkasan dengan karakter non-ASCII: é — 😊",
+    "timeline": [{"message_index": 1, "phrases": ["aku", "cemas"]}],
+}
+
+
+# Blob hasil analisis
+
+def test_pack_unpack_round_trip():
+    blob = pack_result(DOCUMENT)
+    assert blob[:2] == b"\x1f\x8b"
+    assert unpack_result(blob) == DOCUMENT
+
+
+def test_result_body_is_plain_compact_json():
+    body = result_body(pack_result(DOCUMENT))
+    assert body == gzip.decompress(pack_result(DOCUMENT))
+    assert body == json.dumps(DOCUMENT, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def test_pack_is_deterministic_and_etag_follows_content():
+    blob = pack_result(DOCUMENT)
+    assert pack_result(dict(DOCUMENT)) == blob
+    assert result_etag(blob) == result_etag(pack_result(DOCUMENT))
+    assert result_etag(blob).startswith(f"r{RESULT_FORMAT}-")
+
+    changed = dict(DOCUMENT, ai_insights="lain")
+    assert result_etag(pack_result(changed)) != result_etag(blob)
+
+
+def test_gzip_and_identity_representations_have_different_etags():
+    blob = pack_result(DOCUMENT)
+    assert result_etag(blob, gzipped=True) == result_etag(blob) + "-gz"
+    assert result_etag(blob, gzipped=True) != result_etag(blob)
+
+
+def test_result_document_fields():
+    result = {key: None for key in RESULT_KEYS}
+    result.update(attachment_style="secure", ai_insights=None)
+    document = result_document(result, "2024-01-01 10:00:00", "v1")
+
+    assert document["cached"] is True
+    assert document["status"] == "done"
+    assert document["analyzed_at"] == "2024-01-01 10:00:00"
+    assert document["model_version"] == "v1"
+    assert document["insights_pending"] is True
+    assert set(RESULT_KEYS) <= set(document)
+
+    result["ai_insights"] = "insight"
+    assert result_document(result, None, "v1")["insights_pending"] is False
+
+
+# Fingerprint format lama (sebelum pack-analyses)
+
+def test_legacy_fingerprint_differs_from_chained_format():
+    messages = [Message(i, f"pesan {i}") for i in range(1, 4)]
+    legacy = legacy_messages_fingerprint(messages)
+    assert len(legacy) == 64
+    assert legacy == legacy_messages_fingerprint(list(messages))
+    assert legacy != messages_fingerprint(messages)
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app.genai_analyzer import is_unavailable_text
+from conftest import add_session, analyze, chatbot_service, create_test_app, login, summary_messages
+
+
+@pytest.fixture
+def sync_app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path, ANALYSIS_ASYNC="0")
+
+
+@pytest.fixture
+def async_app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path, ANALYSIS_ASYNC="1")
+
+
+def wait_for_job(client, status_url, timeout=10):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        data = client.get(status_url).get_json()
+        if data["status"] not in ("pending", "running"):
+            return data
+        time.sleep(0.02)
+    pytest.fail("Job analisis tidak selesai")
+
+
+def assert_generated_insights(insights):
+    assert insights
+    assert not insights.startswith("Gagal generate AI insights")
+    assert not is_unavailable_text(insights)
+
+
+# Mode sync
+
+def test_sync_analysis_returns_full_result(sync_app):
+    user_id, session_id = add_session(sync_app)
+    response, data = analyze(login(sync_app, user_id), session_id)
+
+    assert response.status_code == 200
+    assert data["cached"] is False
+    assert data["status"] == "done"
+    assert data["attachment_style"]["prediction"] == "anxious"
+    assert data["summary_sent_to_chat"] is True
+    assert_generated_insights(data["ai_insights"])
+    assert len(data["timeline"]) == 6
+    assert {"predict", "phrase_counts", "gemini", "timeline", "statistics"} <= set(data["stage_timings"])
+    assert summary_messages(sync_app, session_id) == 1
+
+
+def test_too_few_messages_is_rejected(sync_app):
+    user_id, session_id = add_session(sync_app, n_messages=1)
+    response, data = analyze(login(sync_app, user_id), session_id)
+    assert response.status_code == 400
+    assert "error" in data
+
+
+def test_concurrent_first_analysis_reuses_the_other_requests_row(sync_app, monkeypatch):
+    from app import chat_message, db
+    from app.models import SessionAnalysis
+
+    user_id, session_id = add_session(sync_app)
+    load_user_messages = chat_message.load_user_messages
+
+    def insert_competing_row(sid):
+        # Request lain membuat row SessionAnalysis setelah request ini memeriksa row yang ada
+        with db.engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO session_analysis (session_id, status, job_started_at) "
+                     "VALUES (:sid, 'pending', :now)"),
+                {"sid": sid, "now": time.time()}
+            )
+        return load_user_messages(sid)
+
+    monkeypatch.setattr(chat_message, "load_user_messages", insert_competing_row)
+    response, data = analyze(login(sync_app, user_id), session_id)
+
+    assert response.status_code == 202
+    assert data["status"] == "pending"
+    with sync_app.app_context():
+        rows = SessionAnalysis.query.filter_by(session_id=session_id).all()
+        assert [row.id for row in rows] == [data["job_id"]]
+    assert chatbot_service().predict_calls == 0
+
+
+# Mode async: job di thread pool + polling status
+
+def test_async_analysis_runs_as_job(async_app):
+    user_id, session_id = add_session(async_app)
+    client = login(async_app, user_id)
+
+    response, job = analyze(client, session_id)
+    assert response.status_code == 202
+    assert job["status"] in ("pending", "running")
+    assert job["status_url"].endswith(f"/chat/{session_id}/analyze/status")
+
+    data = wait_for_job(client, job["status_url"])
+    assert data["status"] == "done"
+    assert data["job_id"] == job["job_id"]
+    assert data["attachment_style"]["prediction"] == "anxious"
+    assert data["summary_sent_to_chat"] is True
+    assert_generated_insights(data["ai_insights"])
+    assert summary_messages(async_app, session_id) == 1
+
+    _, cached = analyze(client, session_id)
+    assert cached["cached"] is True
+    assert cached["ai_insights"] == data["ai_insights"]
+
+
+def test_async_job_failure_is_reported(async_app):
+    user_id, session_id = add_session(async_app)
+    client = login(async_app, user_id)
+    chatbot_service().predict = lambda text, normalized_text=None: {"error": "model rusak"}
+
+    _, job = analyze(client, session_id)
+    data = wait_for_job(client, job["status_url"])
+    assert data["status"] == "failed"
+    assert "model rusak" in data["error"]
+
+
+def test_stale_job_is_marked_failed(async_app):
+    from app import db
+    from app.models import SessionAnalysis
+
+    user_id, session_id = add_session(async_app)
+    with async_app.app_context():
+        # Job dari worker yang sudah restart: pending, tidak ada di proses ini
+        db.session.add(SessionAnalysis(session_id=session_id, status="pending", job_started_at=0))
+        db.session.commit()
+
+    data = login(async_app, user_id).get(f"/chat/{session_id}/analyze/status").get_json()
+    assert data["status"] == "failed"
+    assert data["error"]
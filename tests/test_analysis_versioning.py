@@ -0,0 +1,127 @@
+import pytest
+
+from conftest import add_session, analyze, chatbot_service, create_test_app, login, send
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path)
+
+
+@pytest.fixture
+def chat(app):
+    user_id, session_id = add_session(app)
+    return login(app, user_id), session_id
+
+
+def analysis_row(app, session_id):
+    from app.models import SessionAnalysis
+
+    with app.app_context():
+        analysis = SessionAnalysis.query.filter_by(session_id=session_id).one()
+        return {
+            "messages_fingerprint": analysis.messages_fingerprint,
+            "prediction_fingerprint": analysis.prediction_fingerprint,
+            "last_message_id": analysis.last_message_id,
+            "model_version": analysis.model_version,
+        }
+
+
+def explain(client, session_id, phrase):
+    response = client.post(f"/chat/{session_id}/explain-phrase", json={"phrase": phrase})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_appended_messages_update_incrementally(app, chat):
+    client, session_id = chat
+    analyze(client, session_id)
+    before = analysis_row(app, session_id)
+
+    send(client, session_id, "aku takut dia pergi")
+    response, data = analyze(client, session_id)
+
+    assert response.status_code == 200
+    assert data["incremental"] is True
+    assert len(data["timeline"]) == 7
+    assert data["text_statistics"]["total_messages"] == 7
+    assert chatbot_service().predict_calls == 1
+
+    after = analysis_row(app, session_id)
+    assert after["messages_fingerprint"] != before["messages_fingerprint"]
+    assert after["last_message_id"] > before["last_message_id"]
+    # Prediksi tidak dihitung ulang, fingerprint prediksi tetap milik pesan lama
+    assert after["prediction_fingerprint"] == before["prediction_fingerprint"]
+
+    _, cached = analyze(client, session_id)
+    assert cached["cached"] is True
+
+
+def test_corrupt_result_falls_back_to_full_analysis(app, chat):
+    from app import db
+    from app.models import SessionAnalysis
+
+    client, session_id = chat
+    analyze(client, session_id)
+    with app.app_context():
+        analysis = SessionAnalysis.query.filter_by(session_id=session_id).one()
+        analysis.result = b"\x1f\x8bbukan gzip"
+        db.session.commit()
+
+    send(client, session_id, "aku takut dia pergi")
+    response, data = analyze(client, session_id)
+    assert response.status_code == 200
+    assert data["cached"] is False and "incremental" not in data
+    assert len(data["timeline"]) == 7
+    assert chatbot_service().predict_calls == 2
+
+
+def test_explain_phrase_predicts_again_after_incremental_update(app, chat):
+    client, session_id = chat
+    analyze(client, session_id)
+    service = chatbot_service()
+
+    assert explain(client, session_id, "cemas")["attachment_style"] == "anxious"
+    assert service.predict_calls == 1
+
+    send(client, session_id, "aku takut dia pergi")
+    analyze(client, session_id)
+    explain(client, session_id, "takut")
+    assert service.predict_calls == 2
+
+
+def test_explain_phrase_predicts_again_after_model_version_change(app, chat):
+    from app.model_registry import model_registry
+
+    client, session_id = chat
+    analyze(client, session_id)
+    explain(client, session_id, "cemas")
+    assert chatbot_service().predict_calls == 1
+
+    model_registry._model_version = "test-v2"
+    explain(client, session_id, "aku")
+    assert chatbot_service().predict_calls == 2
+
+
+def test_edited_message_or_new_model_version_triggers_full_analysis(app, chat):
+    from app import db
+    from app.model_registry import model_registry
+    from app.models import ChatMessages
+
+    client, session_id = chat
+    analyze(client, session_id)
+
+    with app.app_context():
+        message = ChatMessages.query.filter_by(session_id=session_id, sender="user").first()
+        message.content = "pesan diedit"
+        db.session.commit()
+    _, data = analyze(client, session_id)
+    assert data["cached"] is False and "incremental" not in data
+    assert chatbot_service().predict_calls == 2
+
+    model_registry._model_version = "test-v2"
+    _, data = analyze(client, session_id)
+    assert data["cached"] is False
+    assert data["model_version"] == "test-v2"
+    assert analysis_row(app, session_id)["model_version"] == "test-v2"
+    assert chatbot_service().predict_calls == 3
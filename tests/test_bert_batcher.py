@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.bert_batcher import BertMicroBatcher
+
+
+class RecordingEncoder:
+    """encode_batch_fn palsu: embedding = [panjang text], ukuran tiap batch dicatat"""
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        return [np.array([len(text)], dtype=np.float32) for text in texts]
+
+
+def test_concurrent_requests_share_one_batch_and_keep_order():
+    encoder = RecordingEncoder()
+    batcher = BertMicroBatcher(encoder, max_batch_size=8, window_ms=200)
+    texts = ["a" * n for n in range(1, 9)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda text: batcher.encode(text, timeout=5), texts))
+
+    assert [int(result[0]) for result in results] == list(range(1, 9))
+    assert len(encoder.batches) < len(texts)
+    assert sum(len(batch) for batch in encoder.batches) == len(texts)
+    assert max(len(batch) for batch in encoder.batches) <= 8
+
+
+def test_batch_size_limit_is_respected():
+    encoder = RecordingEncoder()
+    batcher = BertMicroBatcher(encoder, max_batch_size=3, window_ms=100)
+    futures = [batcher.submit(f"text {i}") for i in range(7)]
+
+    assert [int(f.result(timeout=5)[0]) for f in futures] == [len(f"text {i}") for i in range(7)]
+    assert all(len(batch) <= 3 for batch in encoder.batches)
+
+
+def test_batch_error_is_set_on_every_future_and_batcher_keeps_running():
+    calls = []
+
+    def encode(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise RuntimeError("forward pass gagal")
+        return [np.zeros(1) for _ in texts]
+
+    batcher = BertMicroBatcher(encode, max_batch_size=4, window_ms=100)
+    futures = [batcher.submit(f"text {i}") for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+    assert batcher.encode("lagi", timeout=5).shape == (1,)
@@ -0,0 +1,123 @@
+import gzip
+import json
+
+import pytest
+from sqlalchemy import text
+
+from conftest import add_session, analyze, chatbot_service, create_test_app, login, summary_messages
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path)
+
+
+@pytest.fixture
+def chat(app):
+    user_id, session_id = add_session(app)
+    return login(app, user_id), session_id
+
+
+def test_cached_result_is_served_as_gzip_blob_with_etag(app, chat):
+    client, session_id = chat
+    _, first = analyze(client, session_id)
+
+    response = client.post(f"/chat/{session_id}/analyze", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    gzip_etag = response.headers["ETag"]
+    cached = json.loads(gzip.decompress(response.get_data()))
+    assert cached["cached"] is True
+    assert cached["ai_insights"] == first["ai_insights"]
+    assert cached["timeline"] == first["timeline"]
+
+    response = client.post(
+        f"/chat/{session_id}/analyze", headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag}
+    )
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+    response, plain = analyze(client, session_id)
+    assert "Content-Encoding" not in response.headers
+    assert plain == cached
+    # Body identity beda dengan body gzip, ETag juga beda
+    assert response.headers["ETag"] != gzip_etag
+    # Cache hit tidak memanggil model dan tidak mengirim ringkasan lagi
+    assert chatbot_service().predict_calls == 1
+    assert summary_messages(app, session_id) == 1
+
+
+def test_etag_only_matches_its_own_representation(app, chat):
+    client, session_id = chat
+    analyze(client, session_id)
+    gzip_etag = client.post(f"/chat/{session_id}/analyze", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    plain_etag = client.post(f"/chat/{session_id}/analyze").headers["ETag"]
+
+    response = client.post(f"/chat/{session_id}/analyze", headers={"If-None-Match": gzip_etag})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert client.post(f"/chat/{session_id}/analyze", headers={"If-None-Match": plain_etag}).status_code == 304
+
+
+def test_gzip_with_zero_quality_is_not_used(app, chat):
+    client, session_id = chat
+    analyze(client, session_id)
+
+    response, data = analyze(client, session_id, headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert data["cached"] is True
+
+    response = client.post(f"/chat/{session_id}/analyze", headers={"Accept-Encoding": "deflate, *;q=0.5"})
+    assert response.headers["Content-Encoding"] == "gzip"
+
+
+# Konversi row lama (kolom TEXT) ke blob
+
+def test_pack_analyses_converts_legacy_rows(app, chat):
+    from app import db
+    from app.analysis_service import load_result, load_user_messages
+    from app.cli import LEGACY_RESULT_COLUMNS, pack_analyses_command
+    from app.fingerprint import legacy_messages_fingerprint
+    from app.models import SessionAnalysis
+
+    client, session_id = chat
+    with app.app_context():
+        for column in LEGACY_RESULT_COLUMNS + ("stage_timings",):
+            db.session.execute(text(f"ALTER TABLE session_analysis ADD COLUMN {column} TEXT"))
+        fingerprint = legacy_messages_fingerprint(load_user_messages(session_id))
+        db.session.execute(
+            text(
+                "INSERT INTO session_analysis (session_id, attachment_style, confidence, status, "
+                "messages_fingerprint, probabilities, phrase_analysis, emotion_analysis, bert_features, "
+                "text_statistics, timeline_data, ai_insights, rule_scores) VALUES (:session_id, 'anxious', "
+                "0.7, 'done', :fingerprint, :probabilities, :phrase_analysis, '{}', '{}', '{}', '[]', "
+                "'insight lama', :rule_scores)"
+            ),
+            {
+                "session_id": session_id,
+                "fingerprint": fingerprint,
+                "probabilities": json.dumps({"anxious": 70.0}),
+                "phrase_analysis": json.dumps({"top_phrases": [], "total_phrases_extracted": 3}),
+                "rule_scores": json.dumps({"anxious": 60.0}),
+            }
+        )
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(pack_analyses_command)
+    assert result.exception is None, result.output
+
+    with app.app_context():
+        analysis = SessionAnalysis.query.filter_by(session_id=session_id).one()
+        stored = load_result(analysis)
+        assert analysis.model_version == "test-v1"
+        assert stored["ai_insights"] == "insight lama"
+        assert stored["rule_scores"] == {"anxious": 60.0}
+
+    # Row hasil konversi dipakai sebagai cache, tanpa analisis ulang
+    _, data = analyze(client, session_id)
+    assert data["cached"] is True
+    assert data["ai_insights"] == "insight lama"
+    assert chatbot_service().predict_calls == 0
+    assert summary_messages(app, session_id) == 0
@@ -0,0 +1,68 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.embedding_cache import EmbeddingCache
+
+
+def test_memory_cache_is_lru():
+    cache = EmbeddingCache("v1", max_entries=2)
+    cache.put("satu", np.array([1.0]))
+    cache.put("dua", np.array([2.0]))
+    assert cache.get("satu")[0] == 1.0
+
+    cache.put("tiga", np.array([3.0]))
+    assert cache.get("dua") is None
+    assert cache.get("satu")[0] == 1.0
+    assert cache.get("tiga")[0] == 3.0
+    assert cache.hits == 3
+    assert cache.misses == 1
+
+
+def test_cached_vectors_cannot_be_modified_by_callers():
+    cache = EmbeddingCache("v1")
+    vector = np.ones(4, dtype=np.float32)
+    cache.put("aku cemas", vector)
+
+    # Array pemanggil tetap miliknya sendiri
+    vector[0] = 5
+    cached = cache.get("aku cemas")
+    assert cached[0] == 1
+
+    with pytest.raises(ValueError):
+        cached[0] = 5
+    assert cache.get("aku cemas")[0] == 1
+
+
+def test_disk_tier_survives_restart_and_is_scoped_to_model_version(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    vector = np.arange(4, dtype=np.float32)
+
+    EmbeddingCache("v1", disk_path=path).put("aku cemas", vector)
+
+    reopened = EmbeddingCache("v1", disk_path=path)
+    cached = reopened.get("aku cemas")
+    assert np.array_equal(cached, vector)
+    assert not cached.flags.writeable
+    assert reopened.disk_hits == 1
+
+    # Versi model lain (mis. bobot dilatih ulang) -> key lain, dan row versi lama dihapus
+    assert EmbeddingCache("v2", disk_path=path).get("aku cemas") is None
+    assert EmbeddingCache("v1", disk_path=path).get("aku cemas") is None
+
+
+def test_old_name_keyed_disk_cache_is_dropped(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE bert_embeddings (key TEXT PRIMARY KEY, model_name TEXT NOT NULL, "
+            "dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+        conn.execute("INSERT INTO bert_embeddings VALUES ('k', 'indobert', 1, x'0000803f')")
+
+    cache = EmbeddingCache("v1", disk_path=path)
+    cache.put("aku cemas", np.ones(1))
+    assert EmbeddingCache("v1", disk_path=path).get("aku cemas")[0] == 1
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM bert_embeddings").fetchone()[0] == 1
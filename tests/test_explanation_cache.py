@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from app.genai_analyzer import FALLBACK_MARKER
+from app.llm_backends import BackendError
+from conftest import add_session, create_test_app, login, send
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path, GEMINI_RETRIES="0")
+
+
+@pytest.fixture
+def chat(app):
+    user_id, session_id = add_session(app)
+    return login(app, user_id), session_id
+
+
+@pytest.fixture
+def backend(app):
+    """Backend stub analyzer aplikasi, dengan hitungan panggilan & mode gagal"""
+    from app.model_registry import model_registry
+
+    backend = model_registry.gemini_analyzer.backend
+    generate = backend.generate
+    backend.calls = 0
+    backend.failing = False
+
+    def counting_generate(prompt, timeout):
+        backend.calls += 1
+        if backend.failing:
+            raise BackendError("upstream error", code=400)
+        return generate(prompt, timeout)
+
+    backend.generate = counting_generate
+    return backend
+
+
+def explain(client, session_id, phrase):
+    response = client.post(f"/chat/{session_id}/explain-phrase", json={"phrase": phrase})
+    assert response.status_code == 200
+    return response.get_json()["explanation"]
+
+
+def test_explanation_is_cached_per_phrase_and_context(chat, backend):
+    client, session_id = chat
+    first = explain(client, session_id, "cemas")
+    assert not first.startswith(FALLBACK_MARKER)
+    assert explain(client, session_id, "Cemas ") == first
+    assert backend.calls == 1
+
+    explain(client, session_id, "aku")
+    assert backend.calls == 2
+
+    # Pesan baru -> konteks lain -> key lain
+    send(client, session_id, "aku takut dia pergi")
+    explain(client, session_id, "cemas")
+    assert backend.calls == 3
+
+
+def test_fallback_explanation_is_not_cached(chat, backend):
+    client, session_id = chat
+    backend.failing = True
+    assert explain(client, session_id, "cemas").startswith(FALLBACK_MARKER)
+
+    backend.failing = False
+    explanation = explain(client, session_id, "cemas")
+    assert not explanation.startswith(FALLBACK_MARKER)
+    assert explain(client, session_id, "cemas") == explanation
+    assert backend.calls == 2
+
+
+def test_identical_requests_share_one_generate_call(app):
+    from app.explanation_cache import explanation_cache
+
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.2)
+        return "penjelasan"
+
+    fields = dict(phrase="cemas", attachment_style="anxious", context_fingerprint="fp", model="stub")
+    key = explanation_cache.make_key(**fields)
+    results = []
+
+    def request():
+        with app.app_context():
+            results.append(explanation_cache.get_or_generate(key, generate, **fields))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == ["penjelasan"] * 4
+    assert len(calls) == 1
+    with app.app_context():
+        assert explanation_cache.get(key) == "penjelasan"
@@ -0,0 +1,20 @@
+from collections import namedtuple
+
+from app.fingerprint import extend_fingerprint, messages_fingerprint
+
+Message = namedtuple("Message", ["id", "content"])
+
+
+def test_fingerprint_extends_incrementally():
+    messages = [Message(i, f"pesan {i}") for i in range(1, 6)]
+    full = messages_fingerprint(messages)
+    assert extend_fingerprint(messages_fingerprint(messages[:3]), messages[3:]) == full
+    assert messages_fingerprint(messages[:3]) != full
+
+
+def test_fingerprint_detects_edits():
+    messages = [Message(i, f"pesan {i}") for i in range(1, 4)]
+    edited = messages[:1] + [Message(2, "diedit")] + messages[2:]
+    renumbered = [Message(m.id + 10, m.content) for m in messages]
+    assert messages_fingerprint(edited) != messages_fingerprint(messages)
+    assert messages_fingerprint(renumbered) != messages_fingerprint(messages)
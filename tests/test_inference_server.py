@@ -0,0 +1,80 @@
+import os
+import secrets
+import stat
+import threading
+from multiprocessing.connection import AuthenticationError, Client
+
+import pytest
+
+from app.inference_server import (
+    InsecureSocketError,
+    RemoteChatbotService,
+    check_socket_dir,
+    private_listener,
+    require_authkey,
+)
+from app.text_preprocessor import extract_phrases
+
+AUTHKEY = secrets.token_hex(16)
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "run" / "inference.sock")
+
+
+@pytest.mark.parametrize("authkey", [None, "", "reflectbot"])
+def test_missing_or_weak_authkey_is_refused(authkey, socket_path):
+    with pytest.raises(ValueError):
+        require_authkey(authkey)
+    with pytest.raises(ValueError):
+        RemoteChatbotService(socket_path, authkey)
+
+
+def test_socket_dir_must_be_private(socket_path):
+    check_socket_dir(socket_path, create=True)
+    directory = os.path.dirname(socket_path)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+    os.chmod(directory, 0o755)
+    with pytest.raises(InsecureSocketError):
+        check_socket_dir(socket_path)
+
+
+def test_listener_socket_is_owner_only_and_authenticated(socket_path):
+    with private_listener(socket_path, require_authkey(AUTHKEY)) as listener:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+
+        def accept():
+            try:
+                with listener.accept() as conn:
+                    conn.send(conn.recv())
+            except AuthenticationError:
+                pass
+
+        server = threading.Thread(target=accept, daemon=True)
+        server.start()
+        with pytest.raises(AuthenticationError):
+            Client(socket_path, family="AF_UNIX", authkey=b"x" * 32)
+        server.join(timeout=5)
+
+        server = threading.Thread(target=accept, daemon=True)
+        server.start()
+        with Client(socket_path, family="AF_UNIX", authkey=require_authkey(AUTHKEY)) as conn:
+            conn.send("ping")
+            assert conn.recv() == "ping"
+        server.join(timeout=5)
+
+
+def test_remote_service_refuses_socket_in_shared_directory(socket_path):
+    check_socket_dir(socket_path, create=True)
+    os.chmod(os.path.dirname(socket_path), 0o777)
+    service = RemoteChatbotService(socket_path, AUTHKEY, fallback=lambda: pytest.fail("fallback dipakai"))
+    with pytest.raises(InsecureSocketError):
+        service.predict("aku cemas")
+
+
+def test_remote_service_extracts_phrases_locally(socket_path):
+    service = RemoteChatbotService(socket_path, AUTHKEY)
+    text = "aku merasa sangat cemas kalau dia tidak membalas pesan"
+    assert service.extract_phrases(text) == extract_phrases(text)
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from app.genai_analyzer import is_unavailable_text
+from conftest import add_session, analyze, create_test_app, login, summary_messages
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path, ANALYSIS_ASYNC="0", GEMINI_STREAMING="1")
+
+
+@pytest.fixture
+def chat(app):
+    user_id, session_id = add_session(app)
+    return login(app, user_id), session_id
+
+
+def sse_events(response):
+    assert response.mimetype == "text/event-stream"
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_streamed_insights_are_saved_once(app, chat):
+    client, session_id = chat
+    _, data = analyze(client, session_id)
+    assert data["ai_insights"] is None
+    assert data["insights_pending"] is True
+    assert data["summary_sent_to_chat"] is False
+    assert summary_messages(app, session_id) == 0
+
+    events = sse_events(client.get(f"/chat/{session_id}/analyze/insights/stream"))
+    chunks = [payload["text"] for event, payload in events if event == "chunk"]
+    event, done = events[-1]
+    assert event == "done"
+    assert len(chunks) > 1
+    assert done["ai_insights"] == "".join(chunks).strip()
+    assert done["summary_sent_to_chat"] is True
+    assert not is_unavailable_text(done["ai_insights"])
+
+    # Stream berikutnya membaca insights tersimpan
+    events = sse_events(client.get(f"/chat/{session_id}/analyze/insights/stream"))
+    assert events == [("done", {"ai_insights": done["ai_insights"]})]
+
+    _, cached = analyze(client, session_id)
+    assert cached["cached"] is True
+    assert cached["insights_pending"] is False
+    assert cached["ai_insights"] == done["ai_insights"]
+    assert summary_messages(app, session_id) == 1
+
+
+def test_insights_stream_waits_for_finished_analysis(app, chat):
+    from app import db
+    from app.models import SessionAnalysis
+
+    client, session_id = chat
+    assert client.get(f"/chat/{session_id}/analyze/insights/stream").status_code == 404
+
+    with app.app_context():
+        db.session.add(SessionAnalysis(session_id=session_id, status="running"))
+        db.session.commit()
+    assert client.get(f"/chat/{session_id}/analyze/insights/stream").status_code == 409
+
+
+def test_explain_phrase_stream(app, chat):
+    client, session_id = chat
+    url = f"/chat/{session_id}/explain-phrase/stream"
+
+    events = sse_events(client.get(url, query_string={"phrase": "cemas"}))
+    assert events[0] == ("meta", {"phrase": "cemas", "attachment_style": "anxious"})
+    assert events[-1] == ("done", {})
+    chunks = [payload["text"] for event, payload in events if event == "chunk"]
+    assert len(chunks) > 1
+
+    # Penjelasan yang sama dari cache, sekaligus satu chunk
+    events = sse_events(client.get(url, query_string={"phrase": "cemas"}))
+    assert [payload["text"] for event, payload in events if event == "chunk"] == ["".join(chunks).strip()]
+
+    assert client.get(url).status_code == 400
@@ -0,0 +1,59 @@
+import os
+import re
+
+import pytest
+
+import app.intent_classifier as intent_classifier
+from app.intent_classifier import IntentClassifier
+
+CORPUS = os.path.join(os.path.dirname(__file__), "..", "scripts", "data", "preprocess_corpus.txt")
+
+
+def messages():
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return [(line, turn) for line in lines for turn in (0, 2, 5, 8)]
+
+
+def expected_intent(classifier, text, turn_count):
+    """Cara lama: re.search semua pattern urut priority"""
+    text_lower = text.lower()
+    for name in classifier.priority:
+        intent = classifier.intents[name]
+        if turn_count < intent.required_turns:
+            continue
+        if any(re.search(pattern, text_lower) for pattern in intent.patterns):
+            return name
+    return "general"
+
+
+@pytest.mark.parametrize("prefix_index", [True, False])
+def test_classification_matches_full_pattern_scan(prefix_index, monkeypatch):
+    if prefix_index and not intent_classifier.PREFIX_INDEX:
+        pytest.skip("re parser internal tidak tersedia di Python ini")
+    monkeypatch.setattr(intent_classifier, "PREFIX_INDEX", prefix_index)
+    classifier = IntentClassifier()
+
+    results = [classifier.classify(text, turn) for text, turn in messages()]
+    assert results == [expected_intent(classifier, text, turn) for text, turn in messages()]
+    assert len(set(results)) > 2
+
+
+def test_fallback_runs_every_pattern(monkeypatch):
+    monkeypatch.setattr(intent_classifier, "PREFIX_INDEX", False)
+    matcher = IntentClassifier()._matcher_for(10)
+    assert matcher.by_key == {}
+    assert matcher.always == list(range(len(matcher.patterns)))
+
+
+def test_prefix_index_and_fallback_agree(monkeypatch):
+    indexed = [IntentClassifier().classify(text, turn) for text, turn in messages()]
+    monkeypatch.setattr(intent_classifier, "PREFIX_INDEX", False)
+    assert [IntentClassifier().classify(text, turn) for text, turn in messages()] == indexed
+
+
+def test_word_start_keys_from_parser():
+    if not intent_classifier.PREFIX_INDEX:
+        pytest.skip("re parser internal tidak tersedia di Python ini")
+    assert intent_classifier.word_start_keys(r"\b(takut|khawatir)\s+ditinggal") == {"ta", "kh"}
+    assert intent_classifier.word_start_keys(r"(takut|khawatir)") is None
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from app.model_registry import ModelRegistry, configured_model_version
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    (tmp_path / "model_best.pkl").write_bytes(b"model")
+    return f"{tmp_path}/"
+
+
+def version(model_path, **config):
+    return configured_model_version({"MODEL_PATH": model_path, **config})
+
+
+def test_model_version_follows_artifacts(model_path, tmp_path):
+    before = version(model_path)
+    assert version(model_path) == before
+
+    (tmp_path / "model_best.pkl").write_bytes(b"retrained")
+    assert version(model_path) != before
+    assert version(model_path, MODEL_VERSION="v7") == "v7"
+
+
+def test_chunk_settings_only_count_in_chunked_mode(model_path):
+    truncate = version(model_path, BERT_ENCODE_MODE="truncate")
+    assert version(model_path, BERT_ENCODE_MODE="truncate", BERT_MAX_WINDOWS=2) == truncate
+    assert version(model_path, BERT_ENCODE_MODE="truncate", BERT_CHUNK_POOLING="max") == truncate
+    assert version(model_path, BERT_BACKEND="onnx") != truncate
+
+    chunked = version(model_path, BERT_ENCODE_MODE="chunked")
+    assert chunked != truncate
+    assert version(model_path, BERT_ENCODE_MODE="chunked", BERT_MAX_WINDOWS=2) != chunked
+    assert version(model_path, BERT_ENCODE_MODE="chunked", BERT_CHUNK_POOLING="max") != chunked
+
+
+def test_failed_component_is_retried_after_backoff():
+    registry = ModelRegistry()
+    registry.config = {"MODEL_RETRY_BACKOFF": 0.05, "MODEL_RETRY_MAX_BACKOFF": 1}
+    attempts = []
+
+    def build():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise OSError("model belum ada")
+        return "service"
+
+    registry._build_chatbot_service = build
+
+    with pytest.raises(OSError):
+        registry.chatbot_service
+    assert registry.status()["chatbot_service"]["failures"] == 1
+    assert registry.retry_in("chatbot_service") > 0
+
+    # Masih dalam backoff: error lama, tanpa load ulang
+    with pytest.raises(OSError):
+        registry.chatbot_service
+    assert len(attempts) == 1
+
+    time.sleep(0.06)
+    assert registry.chatbot_service == "service"
+    status = registry.status()["chatbot_service"]
+    assert status["state"] == "ready"
+    assert "failures" not in status and "error" not in status
@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import add_session, create_test_app, login, send
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path)
+
+
+def read(client, session_id, headers=None, **params):
+    return client.get(f"/chat/{session_id}/read", query_string=params, headers=headers)
+
+
+def ids(response):
+    return [message["id"] for message in response.get_json()["messages"]]
+
+
+def test_pages_walk_backwards_with_before_id(app):
+    user_id, session_id = add_session(app, n_messages=5)
+    client = login(app, user_id)
+
+    latest = read(client, session_id, limit=4)
+    data = latest.get_json()
+    assert data["total"] == 10
+    assert data["user_count"] == 5
+    assert data["has_more"] is True
+    assert ids(latest) == sorted(ids(latest))
+    assert ids(latest)[-1] == data["last_id"]
+
+    seen = ids(latest)
+    while True:
+        page = read(client, session_id, limit=4, before_id=seen[0])
+        seen = ids(page) + seen
+        if not page.get_json()["has_more"]:
+            break
+    assert len(seen) == 10
+    assert seen == sorted(set(seen))
+
+
+def test_after_id_returns_new_messages(app):
+    user_id, session_id = add_session(app, n_messages=3)
+    client = login(app, user_id)
+    last_id = read(client, session_id).get_json()["last_id"]
+
+    assert ids(read(client, session_id, after_id=last_id)) == []
+
+    send(client, session_id, "halo lagi")
+    data = read(client, session_id, after_id=last_id).get_json()
+    assert [m["sender"] for m in data["messages"]] == ["user", "bot"]
+    assert data["messages"][0]["content"] == "halo lagi"
+    assert data["has_more"] is False
+
+
+def test_etag_returns_304_until_session_changes(app):
+    user_id, session_id = add_session(app, n_messages=3)
+    client = login(app, user_id)
+
+    response = read(client, session_id, limit=10)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    response = read(client, session_id, headers={"If-None-Match": etag}, limit=10)
+    assert response.status_code == 304
+
+    # Parameter halaman lain -> ETag lain
+    assert read(client, session_id, headers={"If-None-Match": etag}, limit=5).status_code == 200
+
+    send(client, session_id, "pesan baru")
+    response = read(client, session_id, headers={"If-None-Match": etag}, limit=10)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_other_users_session_is_not_found(app):
+    _, session_id = add_session(app, n_messages=1)
+    other_user, _ = add_session(app, n_messages=1)
+    assert read(login(app, other_user), session_id).status_code == 404
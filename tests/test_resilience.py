@@ -0,0 +1,264 @@
+import time
+
+import pytest
+
+from app.genai_analyzer import FALLBACK_MARKER, GeminiAnalyzer
+from app.llm_backends import BackendError, LatencyModel, StubBackend
+from app.model_registry import model_registry
+from app.resilience import CircuitBreaker, Deadline, DeadlineExceeded, retry_call
+from conftest import add_session, analyze, create_test_app, login, summary_messages
+
+
+SUMMARY_ARGS = dict(
+    conversation_text="aku takut ditinggal",
+    key_phrases=["takut"],
+    rule_scores={"secure": 0.2, "anxious": 0.7, "avoidant": 0.1},
+)
+
+
+class FlakyBackend(StubBackend):
+    """StubBackend yang gagal (503) selama `failing` True"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.failing = False
+        self.calls = 0
+
+    def _wait(self, timeout):
+        self.calls += 1
+        if self.failing:
+            raise BackendError("upstream error", code=503)
+        super()._wait(timeout)
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+# Deadline & retry
+
+def test_deadline_timeout_is_capped_and_raises_when_expired():
+    deadline = Deadline(10)
+    assert deadline.timeout(cap=1) == 1
+    assert 9 < deadline.timeout() <= 10
+
+    expired = Deadline(0)
+    assert expired.expired()
+    with pytest.raises(DeadlineExceeded):
+        expired.timeout()
+
+
+def test_retry_call_retries_until_success():
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise ConnectionError("reset")
+        return "ok"
+
+    assert retry_call(fn, Deadline(5), attempts=3, timeout_cap=1, base_delay=0.001, max_delay=0.001) == "ok"
+    assert len(calls) == 3
+    assert all(timeout <= 1 for timeout in calls)
+
+
+def test_retry_call_stops_on_non_retryable_error():
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        retry_call(fn, Deadline(5), attempts=3, base_delay=0.001, retryable=lambda e: False)
+    assert len(calls) == 1
+
+
+def test_retry_call_never_sleeps_past_deadline():
+    def fn(timeout):
+        raise ConnectionError("reset")
+
+    start = time.monotonic()
+    with pytest.raises(ConnectionError):
+        retry_call(fn, Deadline(0.05), attempts=10, base_delay=10, max_delay=10)
+    assert time.monotonic() - start < 1
+
+
+# Circuit breaker
+
+def test_breaker_opens_after_threshold_and_half_open_allows_one_trial():
+    states = []
+    breaker = CircuitBreaker(
+        "test", failure_threshold=2, reset_timeout=0.05,
+        on_state_change=lambda b, state: states.append(state)
+    )
+    open_breaker(breaker)
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Satu percobaan saja selama half_open
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert states == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN, CircuitBreaker.CLOSED]
+
+
+def test_breaker_failed_trial_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_release_frees_trial_without_changing_state():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+# GeminiAnalyzer: deadline, retry, breaker
+
+def test_analyzer_success_keeps_breaker_closed():
+    analyzer = GeminiAnalyzer(backend=StubBackend(), timeout=1, retries=0)
+    text = analyzer.summarize_conversation(**SUMMARY_ARGS)
+    assert text and not text.startswith(FALLBACK_MARKER)
+    assert analyzer.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_analyzer_upstream_errors_open_breaker_and_fall_back():
+    backend = FlakyBackend()
+    backend.failing = True
+    analyzer = GeminiAnalyzer(backend=backend, timeout=1, retries=0, breaker_threshold=2, breaker_reset=60)
+
+    for _ in range(2):
+        assert analyzer.summarize_conversation(**SUMMARY_ARGS).startswith(FALLBACK_MARKER)
+    assert analyzer.breaker.state == CircuitBreaker.OPEN
+
+    # Breaker terbuka -> fallback lokal tanpa memanggil backend
+    calls = backend.calls
+    assert analyzer.summarize_conversation(**SUMMARY_ARGS).startswith(FALLBACK_MARKER)
+    assert backend.calls == calls
+
+
+def test_analyzer_upstream_timeout_counts_as_failure():
+    backend = StubBackend(latency=LatencyModel(mean_ms=200))
+    analyzer = GeminiAnalyzer(backend=backend, timeout=0.02, retries=0, breaker_threshold=1)
+    analyzer.summarize_conversation(**SUMMARY_ARGS, deadline=Deadline(5))
+    assert analyzer.breaker.state == CircuitBreaker.OPEN
+
+
+def test_analyzer_caller_deadline_does_not_open_breaker():
+    backend = StubBackend(latency=LatencyModel(mean_ms=200))
+    analyzer = GeminiAnalyzer(backend=backend, timeout=5, retries=0, breaker_threshold=1)
+
+    text = analyzer.summarize_conversation(**SUMMARY_ARGS, deadline=Deadline(0.02))
+    assert text.startswith(FALLBACK_MARKER)
+    assert analyzer.breaker.state == CircuitBreaker.CLOSED
+
+    analyzer.summarize_conversation(**SUMMARY_ARGS, deadline=Deadline(0))
+    assert analyzer.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_closed_during_half_open_trial_releases_breaker():
+    backend = FlakyBackend(chunks=4)
+    analyzer = GeminiAnalyzer(backend=backend, timeout=1, retries=0, breaker_threshold=1, breaker_reset=0.05)
+    backend.failing = True
+    analyzer.summarize_conversation(**SUMMARY_ARGS)
+    assert analyzer.breaker.state == CircuitBreaker.OPEN
+
+    backend.failing = False
+    time.sleep(0.06)
+    stream = analyzer.summarize_conversation_stream(**SUMMARY_ARGS)
+    next(stream)
+    assert analyzer.breaker.state == CircuitBreaker.HALF_OPEN
+    # Client SSE putus di tengah stream
+    stream.close()
+
+    text = analyzer.summarize_conversation(**SUMMARY_ARGS)
+    assert not text.startswith(FALLBACK_MARKER)
+    assert analyzer.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_yields_full_text_and_records_success():
+    analyzer = GeminiAnalyzer(backend=StubBackend(chunks=4), timeout=1, retries=0)
+    chunks = list(analyzer.summarize_conversation_stream(**SUMMARY_ARGS))
+    assert len(chunks) > 1
+    assert "".join(chunks) == analyzer.summarize_conversation(**SUMMARY_ARGS)
+    assert analyzer.breaker.state == CircuitBreaker.CLOSED
+
+
+# Fallback di pipeline analisis: ditampilkan, tidak disimpan
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    return create_test_app(monkeypatch, tmp_path, GEMINI_RETRIES="0", GEMINI_BREAKER_THRESHOLD="1")
+
+
+@pytest.fixture
+def chat(app):
+    user_id, session_id = add_session(app)
+    return login(app, user_id), session_id
+
+
+def failing_backend():
+    backend = FlakyBackend()
+    backend.failing = True
+    model_registry._instances["gemini_analyzer"] = GeminiAnalyzer(
+        backend=backend, timeout=1, retries=0, breaker_threshold=1, breaker_reset=60
+    )
+    return backend
+
+
+def test_fallback_insights_are_not_saved(app, chat):
+    client, session_id = chat
+    backend = failing_backend()
+
+    _, data = analyze(client, session_id)
+    assert data["ai_insights"] is None
+    assert data["insights_pending"] is True
+    assert data["summary_sent_to_chat"] is False
+    assert data["ai_insights_fallback"].startswith(FALLBACK_MARKER)
+    assert summary_messages(app, session_id) == 0
+
+    # Hasil tersimpan tetap menunggu insights, stream SSE mencoba lagi
+    _, cached = analyze(client, session_id)
+    assert cached["cached"] is True
+    assert cached["insights_pending"] is True
+
+    backend.failing = False
+    model_registry.gemini_analyzer.breaker.record_success()
+    body = client.get(f"/chat/{session_id}/analyze/insights/stream").get_data(as_text=True)
+    assert '"summary_sent_to_chat": true' in body
+
+    _, cached = analyze(client, session_id)
+    assert cached["insights_pending"] is False
+    assert not cached["ai_insights"].startswith(FALLBACK_MARKER)
+    assert summary_messages(app, session_id) == 1
+
+
+def test_insights_error_is_not_saved(app, chat):
+    client, session_id = chat
+
+    class BrokenAnalyzer:
+        def summarize_conversation(self, **kwargs):
+            raise RuntimeError("analyzer rusak")
+
+    model_registry._instances["gemini_analyzer"] = BrokenAnalyzer()
+    _, data = analyze(client, session_id)
+    assert data["ai_insights"] is None
+    assert data["ai_insights_fallback"].startswith("Gagal generate AI insights")
+    assert summary_messages(app, session_id) == 0
@@ -0,0 +1,39 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.stage_graph import StageGraph
+
+
+def test_stage_graph_passes_dependency_results_and_runs_independent_stages_together():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def independent(value):
+        # Kedua stage harus jalan bersamaan supaya barrier lewat
+        barrier.wait()
+        return value
+
+    graph = StageGraph(ThreadPoolExecutor(max_workers=4))
+    graph.add("a", lambda: independent(1))
+    graph.add("b", lambda: independent(2))
+    graph.add("total", lambda a, b: a + b, deps=["a", "b"])
+    results = graph.run()
+
+    assert results == {"a": 1, "b": 2, "total": 3}
+    assert set(graph.timings) == {"a", "b", "total", "total_ms"}
+    assert graph.timings["total"]["start_ms"] >= graph.timings["a"]["start_ms"]
+
+
+def test_stage_graph_rejects_unknown_dependency_and_propagates_errors():
+    graph = StageGraph(ThreadPoolExecutor(max_workers=2))
+    with pytest.raises(ValueError):
+        graph.add("b", lambda a: a, deps=["a"])
+
+    def fail():
+        raise RuntimeError("stage gagal")
+
+    graph.add("a", fail)
+    graph.add("b", lambda a: a, deps=["a"])
+    with pytest.raises(RuntimeError):
+        graph.run()